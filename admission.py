@@ -0,0 +1,107 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from task_queue import TaskQueue
+
+ADMISSION_POLICIES = ('reject', 'block', 'drop_oldest', 'token_bucket')
+
+
+class TokenBucket:
+    """Ограничение темпа: rate задач в секунду, всплеск до burst"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+class AdmissionController:
+    """
+    Решает, пускать ли задачу в очередь, когда она полна или поток задач слишком плотный:
+    - reject - сразу отказываем, продюсер не ждёт ни секунды
+    - block - ждём места не дольше timeout (0 - сколько нужно, обратное давление)
+    - drop_oldest - выкидываем самую старую задачу самого низкого класса, новую берём
+    - token_bucket - не больше rate задач в секунду, остальным отказ; место в очереди не ждём
+    """
+
+    def __init__(self, task_queue: TaskQueue, policy: str = 'block', timeout: float = 0.0,
+                 rate: float = 0.0, burst: int = 1,
+                 on_shed: Optional[Callable[[Any], None]] = None):
+        self.task_queue = task_queue
+        self.policy = policy if policy in ADMISSION_POLICIES else 'block'
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate, burst) if self.policy == 'token_bucket' and rate > 0 else None
+        # Что сделать с выкинутой задачей (отменить Future и т.п.)
+        self.on_shed = on_shed
+
+        self.accepted = 0
+        self.rejected = 0
+        self.rate_limited = 0
+        self.shed = 0
+        self.stall_time = 0.0
+        self._lock = threading.Lock()
+
+    def admit(self, item: Any, timeout: Optional[float] = None) -> bool:
+        """Пытаемся поставить задачу; timeout переопределяет ожидание политики block"""
+        started = time.monotonic()
+        accepted = False
+        shed_item = None
+        rate_limited = False
+
+        try:
+            if self.policy == 'block':
+                wait = self.timeout if timeout is None else timeout
+                self.task_queue.put(item, timeout=wait or None)
+                accepted = True
+            elif self.policy == 'drop_oldest':
+                shed_item = self.task_queue.put_drop_oldest(item)
+                accepted = True
+            elif self.bucket is not None and not self.bucket.try_acquire():
+                rate_limited = True
+            else:
+                self.task_queue.put_nowait(item)
+                accepted = True
+        except queue.Full:
+            pass
+
+        with self._lock:
+            self.stall_time += time.monotonic() - started
+            if accepted:
+                self.accepted += 1
+            elif rate_limited:
+                self.rate_limited += 1
+            else:
+                self.rejected += 1
+            if shed_item is not None:
+                self.shed += 1
+
+        if shed_item is not None and self.on_shed is not None:
+            self.on_shed(shed_item)
+        return accepted
+
+    def stats(self) -> Dict[str, Any]:
+        """Сколько пустили, сколько отказали и сколько продюсер простоял"""
+        with self._lock:
+            return {
+                'policy': self.policy,
+                'capacity': self.task_queue.maxsize,
+                'accepted': self.accepted,
+                'rejected': self.rejected,
+                'rate_limited': self.rate_limited,
+                'shed': self.shed,
+                'producer_stall_time': round(self.stall_time, 4),
+            }
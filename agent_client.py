@@ -0,0 +1,121 @@
+"""
+Тонкий клиент демона (python main.py --daemon).
+Не грузит ни диспетчер, ни сборщики - только сокет и протокол, поэтому стартует быстро.
+
+    python agent_client.py inventory
+    python agent_client.py -n 100 inventory        # 100 команд одной пачкой по одному соединению
+    python agent_client.py --socket /run/agent.sock stats
+"""
+import itertools
+import socket
+import sys
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from socket_protocol import ProtocolError, encode_message, read_message
+
+
+class AgentClient:
+    """Соединение с демоном; запросы можно слать пачкой и забирать ответы потом"""
+
+    def __init__(self, socket_path: str, timeout: Optional[float] = None):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(socket_path)
+        self._reader = self.sock.makefile('rb')
+        self._ids = itertools.count(1)
+
+    def send(self, command: str, **fields) -> int:
+        """Отправляем запрос, не дожидаясь ответа; возвращаем его id"""
+        request_id = next(self._ids)
+        self.sock.sendall(encode_message({'id': request_id, 'command': command, **fields}))
+        return request_id
+
+    def receive(self) -> Dict[str, Any]:
+        response = read_message(self._reader)
+        if response is None:
+            raise ProtocolError("Демон закрыл соединение")
+        return response
+
+    def request(self, command: str, **fields) -> Dict[str, Any]:
+        """Один запрос - один ответ"""
+        self.send(command, **fields)
+        return self.receive()
+
+    def pipeline(self, commands: Iterable[str], **fields) -> List[Dict[str, Any]]:
+        """
+        Все команды одним потоком байт, потом все ответы. Ответы приходят по готовности,
+        возвращаем их в порядке команд.
+        """
+        data = bytearray()
+        ids = []
+        for command in commands:
+            request_id = next(self._ids)
+            ids.append(request_id)
+            data += encode_message({'id': request_id, 'command': command, **fields})
+        self.sock.sendall(data)
+
+        responses = {}
+        while len(responses) < len(ids):
+            response = self.receive()
+            responses[response.get('id')] = response
+        return [responses[request_id] for request_id in ids]
+
+    def close(self):
+        self._reader.close()
+        self.sock.close()
+
+    def __enter__(self) -> 'AgentClient':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def default_socket_path() -> str:
+    """Тот же путь, что возьмёт демон: из config.ini или agent.sock в папке логов"""
+    from config_loader import ConfigLoader
+    return ConfigLoader.load_config().daemon.socket_path
+
+
+def parse_arguments():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Клиент демона сбора информации об ОС')
+    parser.add_argument('commands', nargs='+', metavar='command', help='inventory, ping, stats')
+    parser.add_argument('--socket', metavar='PATH', help='сокет демона (по умолчанию - из config.ini)')
+    parser.add_argument('-n', '--repeat', type=int, default=1, help='повторить команды N раз одной пачкой')
+    parser.add_argument('--priority', choices=('high', 'normal', 'low'))
+    parser.add_argument('--ttl', type=float, help='сколько секунд задача может ждать в очереди')
+    parser.add_argument('--timeout', type=float, default=30.0, help='сколько ждать ответа, сек')
+    parser.add_argument('--quiet', '-q', action='store_true', help='не печатать ответы, только итог')
+    return parser.parse_args()
+
+
+def main() -> int:
+    import json
+
+    args = parse_arguments()
+    fields = {key: value for key, value in (('priority', args.priority), ('ttl', args.ttl)) if value is not None}
+    commands = list(args.commands) * max(1, args.repeat)
+
+    try:
+        with AgentClient(args.socket or default_socket_path(), timeout=args.timeout) as client:
+            started = time.perf_counter()
+            responses = client.pipeline(commands, **fields)
+            elapsed = time.perf_counter() - started
+    except (OSError, ProtocolError) as e:
+        print(f"❌ Демон недоступен: {e}", file=sys.stderr)
+        return 2
+
+    if not args.quiet:
+        for response in responses:
+            print(json.dumps(response, ensure_ascii=False))
+    failed = sum(1 for response in responses if not response.get('ok'))
+    print(f"{len(responses)} ответов за {elapsed * 1000:.2f} мс "
+          f"({elapsed / len(responses) * 1e6:.0f} мкс/команда), ошибок: {failed}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+import contextlib
+import os
+import queue
+import socket
+import socketserver
+import stat
+import threading
+from concurrent.futures import CancelledError, Future
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from interfaces import BaseLogService
+from socket_protocol import ProtocolError, encode_message, read_message
+from task_queue import DEFAULT_PRIORITY
+
+# Маркер конца ответов для потока-писателя соединения
+_CLOSE = None
+
+
+class AgentDaemon:
+    """
+    Постоянный агент: диспетчер и сервис инвентаризации прогреты один раз,
+    команды приходят через Unix-сокет (протокол - socket_protocol).
+
+    На каждое соединение - читатель (поток socketserver) и писатель. Читатель сразу
+    ставит задачу через dispatcher.submit() и берёт следующий запрос, ответ по готовности
+    Future уходит писателю - так клиент может гнать много команд по одному соединению.
+    """
+
+    def __init__(self, dispatcher, socket_path: str, logger: BaseLogService, socket_mode: int = 0o600):
+        self.dispatcher = dispatcher
+        self.socket_path = Path(socket_path)
+        self.logger = logger
+        self.socket_mode = socket_mode
+        self._server: Optional[socketserver.ThreadingUnixStreamServer] = None
+
+        self.connections = 0
+        self.requests = 0
+        self.tasks = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def serve_forever(self):
+        """Слушаем сокет, пока не позовут stop() или не прилетит Ctrl+C/SIGTERM"""
+        self._prepare_socket_path()
+        daemon = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                daemon._serve_connection(self.request)
+
+        server = socketserver.ThreadingUnixStreamServer(str(self.socket_path), Handler, bind_and_activate=False)
+        server.daemon_threads = True
+        try:
+            server.server_bind()
+            # Права ставим до listen - до этого подключиться никто не успеет
+            os.chmod(self.socket_path, self.socket_mode)
+            server.server_activate()
+        except OSError:
+            server.server_close()
+            raise
+        self._server = server
+        self.logger.info("🔌 Демон слушает %s", self.socket_path)
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            self._server = None
+            with contextlib.suppress(FileNotFoundError):
+                self.socket_path.unlink()
+
+    def stop(self):
+        """Вызывать из другого потока: serve_forever() вернётся после текущего опроса"""
+        if self._server is not None:
+            self._server.shutdown()
+
+    def _prepare_socket_path(self):
+        """Старый сокет от упавшего демона убираем, живой - не трогаем"""
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if not self.socket_path.exists() and not self.socket_path.is_symlink():
+            return
+        if not stat.S_ISSOCK(self.socket_path.lstat().st_mode):
+            raise RuntimeError(f"{self.socket_path} существует и это не сокет")
+
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(self.socket_path))
+        except (ConnectionRefusedError, FileNotFoundError):
+            self.logger.warning("Удаляем брошенный сокет %s", self.socket_path)
+            with contextlib.suppress(FileNotFoundError):
+                self.socket_path.unlink()
+            return
+        finally:
+            probe.close()
+        raise RuntimeError(f"Демон уже слушает {self.socket_path}")
+
+    def _serve_connection(self, sock: socket.socket):
+        with self._lock:
+            self.connections += 1
+        replies: queue.SimpleQueue = queue.SimpleQueue()
+        writer = threading.Thread(target=self._write_replies, args=(sock, replies),
+                                  name="DaemonWriter", daemon=True)
+        writer.start()
+
+        # Ответы ещё не готовых задач: пока они не ушли, писателя не закрываем
+        pending = [0]
+        drained = threading.Condition()
+
+        def reply(response: Dict[str, Any]):
+            replies.put(response)
+
+        def reply_later(request_id: Any, future: Future):
+            def done(f: Future):
+                replies.put(self._future_response(request_id, f))
+                with drained:
+                    pending[0] -= 1
+                    drained.notify_all()
+            with drained:
+                pending[0] += 1
+            future.add_done_callback(done)
+
+        reader = sock.makefile('rb')
+        try:
+            while True:
+                try:
+                    request = read_message(reader)
+                except ProtocolError as e:
+                    self.logger.warning("Битый запрос в сокете: %s", e)
+                    reply({'id': None, 'ok': False, 'error': str(e)})
+                    break
+                except OSError:
+                    break
+                if request is None:
+                    break
+                self._handle_request(request, reply, reply_later)
+        finally:
+            with drained:
+                drained.wait_for(lambda: pending[0] == 0)
+            replies.put(_CLOSE)
+            writer.join()
+            reader.close()
+
+    def _handle_request(self, request: Dict[str, Any], reply, reply_later):
+        with self._lock:
+            self.requests += 1
+        request_id = request.get('id')
+        command = request.get('command')
+
+        # ping и stats демон отвечает сам, в очередь они не идут
+        if command == 'ping':
+            reply({'id': request_id, 'ok': True, 'result': 'pong'})
+            return
+        if command == 'stats':
+            stats = self.dispatcher.get_stats()
+            stats['daemon'] = self.stats
+            reply({'id': request_id, 'ok': True, 'result': stats})
+            return
+        if not isinstance(command, str):
+            reply({'id': request_id, 'ok': False, 'error': "Нет поля command"})
+            return
+
+        try:
+            ttl = request.get('ttl')
+            future = self.dispatcher.submit(
+                command,
+                priority=request.get('priority', DEFAULT_PRIORITY),
+                ttl=float(ttl) if ttl is not None else None
+            )
+        except (TypeError, ValueError) as e:
+            reply({'id': request_id, 'ok': False, 'error': str(e)})
+            return
+        reply_later(request_id, future)
+
+    def _future_response(self, request_id: Any, future: Future) -> Dict[str, Any]:
+        try:
+            result = future.result()
+            with self._lock:
+                self.tasks += 1
+            return {'id': request_id, 'ok': True, 'result': result}
+        except CancelledError:
+            error = "Задача отменена"
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        with self._lock:
+            self.errors += 1
+        return {'id': request_id, 'ok': False, 'error': error}
+
+    def _write_replies(self, sock: socket.socket, replies: queue.SimpleQueue):
+        """Один писатель на соединение: воркеры диспетчера не ждут медленного клиента"""
+        broken = False
+        while True:
+            response = replies.get()
+            if response is _CLOSE:
+                return
+            if broken:
+                continue
+            data = self._encode(response)
+            try:
+                # Всё, что уже накопилось, отправляем одним send
+                while True:
+                    try:
+                        extra = replies.get_nowait()
+                    except queue.Empty:
+                        break
+                    if extra is _CLOSE:
+                        sock.sendall(data)
+                        return
+                    data += self._encode(extra)
+                sock.sendall(data)
+            except OSError:
+                # Клиент ушёл - остальные ответы просто выбрасываем
+                broken = True
+
+    @staticmethod
+    def _encode(response: Dict[str, Any]) -> bytes:
+        try:
+            return encode_message(response)
+        except (ProtocolError, TypeError, ValueError) as e:
+            # Результат не лезет в кадр или не сериализуется - отдаём ошибку, а не рвём соединение
+            return encode_message({'id': response.get('id'), 'ok': False, 'error': str(e)})
+    
+    @property
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'connections': self.connections, 'requests': self.requests,
+                    'tasks': self.tasks, 'errors': self.errors}
+
@@ -0,0 +1,261 @@
+import asyncio
+import queue
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from interfaces import BaseLogService, BaseInventoryService, BaseResultSink
+from datacls_models import WorkersConfig, ResultsConfig, Task
+from dispatcher import (MAX_QUEUE_SIZE, SHUTDOWN_CANCEL, SHUTDOWN_DRAIN, SHUTDOWN_TIMEOUT,
+                        TASKS_TOTAL, is_allowed_command, next_task_id)
+from result_sink import MemoryResultSink, ResultSinkService
+from coalescing import AsyncSingleFlight
+from cancellation import CancellationToken, bind
+
+# Маркер остановки для корутин-воркеров
+_SHUTDOWN = None
+
+
+class AsyncDispatcherService:
+    """
+    Диспетчер на asyncio: один поток, асинхронная ограниченная очередь
+    и max_concurrency корутин-воркеров вместо потоков.
+
+    Сбор идёт через collect_os_info_async - подпроцессы-запасные варианты
+    запускаются через asyncio и не занимают поток. Синхронные части
+    (execute_task, публикация результата) уходят в пул потоков.
+    """
+
+    def __init__(self, workers_config: WorkersConfig, logger: BaseLogService,
+                 inventory_service: BaseInventoryService,
+                 result_sink: Optional[BaseResultSink] = None,
+                 results_config: Optional[ResultsConfig] = None,
+                 max_concurrency: Optional[int] = None,
+                 queue_size: Optional[int] = None):
+        self.logger = logger
+        self.workers_config = workers_config
+        self.max_concurrency = max(1, max_concurrency or workers_config.async_concurrency)
+        self.queue_size = queue_size or workers_config.queue_capacity
+
+        self.inventory_service = inventory_service
+        self.result_sink_backend = result_sink or MemoryResultSink(max_records=MAX_QUEUE_SIZE)
+        self.results_config = results_config or ResultsConfig()
+
+        # Очереди asyncio привязываются к loop - создаём их в start_workers()
+        self.task_queue: Optional[asyncio.Queue] = None
+        self.result_sink: Optional[ResultSinkService] = None
+
+        # Одинаковые inventory собираем один раз и делим результат
+        self.single_flight = AsyncSingleFlight(workers_config.coalesce_window)
+
+        self.inventory_workers: List[asyncio.Task] = []
+        self._in_flight: Dict[str, Dict[str, Any]] = {}
+        self.tasks_timed_out = 0
+        self.tasks_failed = 0
+        # Идёт остановка: CancelledError в воркере - это отмена самого воркера, а не задачи
+        self._stopping = False
+
+    async def start_workers(self):
+        """Запускаем корутины-воркеры в текущем event loop"""
+        self.logger.info("Запускаем %s корутин-воркеров (asyncio)", self.max_concurrency)
+        self.task_queue = asyncio.Queue(maxsize=self.queue_size)
+
+        # Выгрузка результатов - тот же поток-вычерпыватель, что и у синхронного диспетчера
+        result_queue = queue.Queue(maxsize=MAX_QUEUE_SIZE)
+        self.inventory_service.result_queue = result_queue
+        self.result_sink = ResultSinkService(
+            result_queue,
+            self.result_sink_backend,
+            self.logger,
+            batch_size=self.results_config.batch_size,
+            flush_interval=self.results_config.flush_interval
+        )
+        self.result_sink.start()
+
+        for i in range(self.max_concurrency):
+            name = f"AsyncWorker-{i+1}"
+            self.inventory_workers.append(asyncio.create_task(self._worker_loop(name), name=name))
+
+    async def _worker_loop(self, name: str):
+        """Корутина ждёт задачу на очереди и выходит по маркеру остановки"""
+        while True:
+            task_data = await self.task_queue.get()
+            if task_data is _SHUTDOWN:
+                self.task_queue.task_done()
+                return
+
+            self._in_flight[name] = task_data
+            task_data['started_at'] = datetime.now().isoformat()
+            # wait_for отменяет только корутину - поток с execute_task узнаёт о таймауте по токену
+            token = CancellationToken(self.workers_config.task_timeout or None)
+            try:
+                self.logger.debug("Воркер %s взял задачу", name)
+                # Зависшая задача отменяется, корутина-воркер остаётся жива
+                await asyncio.wait_for(self._run_task(task_data, token), self.workers_config.task_timeout or None)
+                TASKS_TOTAL.inc(status='success')
+            except asyncio.TimeoutError:
+                if not token.cancel('timeout'):
+                    # Поток уже прошёл finish_task() и публикует успех - отказ был бы вторым итогом задачи
+                    TASKS_TOTAL.inc(status='success')
+                    self.logger.warning("Задача %s закончилась на границе таймаута, засчитываем успех",
+                                        task_data.get('id'))
+                    continue
+                self.tasks_timed_out += 1
+                TASKS_TOTAL.inc(status='timeout')
+                self.logger.error("⏱️ Задача %s не уложилась в %s с", task_data.get('id'),
+                                  self.workers_config.task_timeout)
+                await asyncio.to_thread(self.inventory_service.publish_failure, task_data, 'timeout',
+                                        f"Превышен таймаут {self.workers_config.task_timeout} с")
+            except asyncio.CancelledError:
+                # Отменяют саму корутину-воркера (остановка) - выходим.
+                # Флаг, а не Task.cancelling(): тот появился только в Python 3.11
+                if self._stopping:
+                    raise
+                # Отмена прилетела изнутри задачи - это отказ задачи, воркер живёт дальше
+                self.tasks_failed += 1
+                TASKS_TOTAL.inc(status='error')
+                self.logger.error("Задача %s отменена изнутри", task_data.get('id'))
+                await asyncio.to_thread(self.inventory_service.publish_failure, task_data, 'error',
+                                        "Задача отменена")
+            except Exception as e:
+                self.tasks_failed += 1
+                TASKS_TOTAL.inc(status='error')
+                self.logger.error("Ошибка в воркере: %s", e)
+            finally:
+                self._in_flight.pop(name, None)
+                self.task_queue.task_done()
+
+    async def _run_task(self, task_data: Dict[str, Any], token: CancellationToken):
+        """Выполняем одну задачу"""
+        if not self.validate_command(task_data.get('command', '')):
+            self.logger.warning("Блокируем нелегитимную команду: %s", task_data.get('command'))
+            return
+        if task_data['command'] != 'inventory':
+            self.logger.warning("Хм, команда %s не реализована", task_data['command'])
+            return
+
+        os_info, shared = await self.single_flight.do(
+            task_data['command'], self.inventory_service.collect_os_info_async
+        )
+        # execute_task синхронный (очередь результатов, payload) - через пул потоков
+        await asyncio.to_thread(self._execute_task, token, task_data, os_info, shared)
+
+    def _execute_task(self, token: CancellationToken, task_data: Dict[str, Any], os_info: Any, shared: bool):
+        """В потоке пула: с токеном задачи finish_task() не даст опубликовать успех после таймаута"""
+        with bind(token):
+            self.inventory_service.execute_task(task_data, os_info, shared)
+
+    def failed_tasks(self) -> int:
+        """Сколько задач закончилось ошибкой или таймаутом"""
+        return self.tasks_failed + self.tasks_timed_out
+    
+    def validate_command(self, command: str) -> bool:
+        """Проверяем команду по белому списку"""
+        return is_allowed_command(command)
+
+    async def add_task(self, command: str, timeout: Optional[float] = None) -> bool:
+        """
+        Добавляем задачу в очередь.
+        timeout=None - ждём места в очереди сколько нужно (обратное давление на читателя команд)
+        """
+        if not self.validate_command(command):
+            self.logger.warning("Попытка добавить запрещённую команду: %s", command)
+            return False
+
+        task = Task(
+            command=command,
+            timestamp=datetime.now().isoformat(),
+            id=next_task_id()
+        )
+
+        try:
+            await asyncio.wait_for(self.task_queue.put(task.to_dict()), timeout)
+            self.logger.debug("Задача %s добавлена в очередь. В очереди: %s", command, self.task_queue.qsize)
+            return True
+        except asyncio.TimeoutError:
+            self.logger.error("Очередь задач переполнена! Задача отклонена.")
+            return False
+
+    async def join(self):
+        """Ждём, пока очередь опустеет и все взятые задачи выполнятся"""
+        await self.task_queue.join()
+
+    async def shutdown(self, mode: str = SHUTDOWN_DRAIN,
+                       timeout: Optional[float] = SHUTDOWN_TIMEOUT) -> Dict[str, Any]:
+        """
+        Останавливаемся так же, как синхронный диспетчер: drain доделывает очередь,
+        cancel выкидывает её. Воркеры, не успевшие к дедлайну, отменяем.
+        Возвращаем отчёт о недоделанных задачах.
+        """
+        self.logger.info("Останавливаем диспетчер (%s)...", mode)
+        started = time.monotonic()
+        self._stopping = True
+
+        cancelled = []
+        if mode == SHUTDOWN_CANCEL:
+            cancelled.extend(self._drop_queued())
+
+        async def stop_workers():
+            for _ in self.inventory_workers:
+                await self.task_queue.put(_SHUTDOWN)
+            # wait, а не gather: по таймауту gather сам отменил бы воркеров, и отчёт о задачах в работе был бы пуст
+            if self.inventory_workers:
+                await asyncio.wait(self.inventory_workers)
+
+        in_flight = []
+        try:
+            await asyncio.wait_for(stop_workers(), timeout)
+        except asyncio.TimeoutError:
+            in_flight = [task.get('id') for task in self._in_flight.values()]
+            cancelled.extend(self._drop_queued())
+            for worker in self.inventory_workers:
+                worker.cancel()
+            await asyncio.gather(*self.inventory_workers, return_exceptions=True)
+        self.inventory_workers = []
+
+        report = {
+            'mode': mode,
+            'cancelled': cancelled,
+            'in_flight': in_flight,
+            'workers_alive': [],
+            'elapsed': round(time.monotonic() - started, 4),
+        }
+        if cancelled or in_flight:
+            self.logger.warning("Не выполнено задач: в очереди %s, в работе %s", len(cancelled), len(in_flight))
+
+        # Остановка выгрузки и payload блокирующие - не держим ими event loop
+        await asyncio.to_thread(self.result_sink.stop)
+        await asyncio.to_thread(self.inventory_service.close)
+        self.logger.info("Статистика результатов: %s", self.get_stats)
+
+        self.logger.info("Диспетчер остановлен")
+        log_stats = self.logger.stats()
+        if log_stats:
+            self.logger.info("Статистика логов: %s", log_stats)
+        await asyncio.to_thread(self.logger.flush)
+
+        return report
+
+    def _drop_queued(self) -> List[str]:
+        """Выкидываем всё, что ещё ждёт в очереди, и возвращаем id выкинутых задач"""
+        dropped = []
+        while True:
+            try:
+                task_data = self.task_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return dropped
+            if task_data is not _SHUTDOWN:
+                dropped.append(task_data.get('id'))
+            self.task_queue.task_done()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Те же метрики, что у синхронного диспетчера"""
+        stats = self.result_sink.stats() if self.result_sink else {}
+        stats['queue_blocked_time'] = round(self.inventory_service.queue_blocked_time, 4)
+        stats['results_dropped'] = self.inventory_service.results_dropped
+        stats['coalescing'] = self.single_flight.stats()
+        stats['concurrency'] = self.max_concurrency
+        stats['timeouts'] = {'timed_out': self.tasks_timed_out}
+        if self.inventory_service.payload_writer is not None:
+            stats['payload'] = self.inventory_service.payload_writer.stats()
+        return stats
@@ -0,0 +1,213 @@
+import copy
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, TextIO
+
+# Служебные маркеры для потока-писателя
+_STOP = object()
+
+
+class _FlushRequest:
+    """Просим писателя сбросить всё накопленное и отметиться"""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class AsyncLogHandler(logging.Handler):
+    """
+    Неблокирующий хендлер: воркеры только кладут запись в ограниченную очередь,
+    а форматирует и пишет на диск/в консоль один фоновый поток.
+    Пишем пачками - по размеру или по времени, файл ротируем по размеру и по времени.
+    Если очередь переполнена, запись выкидываем и считаем её в dropped.
+    """
+
+    def __init__(self, log_file: Path, stream: Optional[TextIO] = None,
+                 queue_size: int = 10000, batch_size: int = 256, flush_interval: float = 0.5,
+                 max_bytes: int = 10 * 1024 * 1024, rotate_interval: float = 0,
+                 backup_count: int = 5):
+        super().__init__()
+        self.log_file = Path(log_file)
+        self.stream = stream if stream is not None else sys.stderr
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+
+        self.queued = 0
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+        # Счётчики трогают многие потоки-продюсеры - под своей короткой блокировкой, не self.lock
+        self._stats_lock = threading.Lock()
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._file = None
+        self._opened_at = 0.0
+        self._open_file()
+
+        self._thread = threading.Thread(target=self._writer_loop, name="AsyncLogWriter", daemon=True)
+        self._thread.start()
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # Без self.lock - очередь сама потокобезопасная, воркеры не толкаются на блокировке
+        rv = self.filter(record)
+        if rv:
+            self.emit(record)
+        return rv
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Как QueueHandler.prepare: текст сообщения и трассировку собираем сразу, в потоке воркера.
+        Писатель отформатирует запись позже - к тому времени изменяемые аргументы уже другие
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = (self.formatter or logging.Formatter()).formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            record = self.prepare(record)
+        except Exception:
+            self.handleError(record)
+            return
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+        else:
+            with self._stats_lock:
+                self.queued += 1
+
+    def flush(self, timeout: float = 5):
+        """Ждём, пока писатель допишет всё, что уже в очереди"""
+        if not self._thread.is_alive():
+            return
+        request = _FlushRequest()
+        try:
+            self._queue.put(request, timeout=timeout)
+        except queue.Full:
+            return
+        request.done.wait(timeout)
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout=5)
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+        super().close()
+
+    def stats(self) -> Dict[str, int]:
+        """Счётчики очереди логов"""
+        with self._stats_lock:
+            return {
+                'queued': self.queued,
+                'written': self.written,
+                'dropped': self.dropped,
+                'pending': self._queue.qsize(),
+                'rotations': self.rotations,
+            }
+
+    def _writer_loop(self):
+        """Копим пачку до batch_size или flush_interval, потом пишем разом"""
+        batch: List[str] = []
+        deadline = 0.0
+
+        while True:
+            try:
+                if batch:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                else:
+                    item = self._queue.get()
+            except queue.Empty:
+                self._write_batch(batch)
+                batch = []
+                continue
+
+            if item is _STOP:
+                self._write_batch(batch)
+                return
+
+            if isinstance(item, _FlushRequest):
+                self._write_batch(batch)
+                batch = []
+                item.done.set()
+                continue
+
+            try:
+                line = self.format(item)
+            except Exception:
+                with self._stats_lock:
+                    self.dropped += 1
+                continue
+
+            if not batch:
+                deadline = time.monotonic() + self.flush_interval
+            batch.append(line)
+
+            if len(batch) >= self.batch_size:
+                self._write_batch(batch)
+                batch = []
+
+    def _write_batch(self, batch: List[str]):
+        if not batch:
+            return
+
+        text = '\n'.join(batch) + '\n'
+        try:
+            self._maybe_rotate(len(text.encode('utf-8')))
+            self._file.write(text)
+            self._file.flush()
+        except Exception as e:
+            print(f"Не смогли записать лог: {e}", file=sys.stderr)
+
+        try:
+            self.stream.write(text)
+            self.stream.flush()
+        except Exception:
+            pass
+
+        with self._stats_lock:
+            self.written += len(batch)
+
+    def _open_file(self):
+        self._file = open(self.log_file, 'a', encoding='utf-8')
+        self._opened_at = time.monotonic()
+
+    def _maybe_rotate(self, incoming: int):
+        """Ротация: log.txt -> log.txt.1 -> ... -> log.txt.N"""
+        by_size = self.max_bytes > 0 and self._file.tell() + incoming > self.max_bytes
+        by_time = self.rotate_interval > 0 and time.monotonic() - self._opened_at >= self.rotate_interval
+        if not (by_size or by_time) or self._file.tell() == 0:
+            return
+
+        self._file.close()
+        try:
+            if self.backup_count > 0:
+                for i in range(self.backup_count - 1, 0, -1):
+                    src = self.log_file.with_name(f"{self.log_file.name}.{i}")
+                    if src.exists():
+                        os.replace(src, self.log_file.with_name(f"{self.log_file.name}.{i + 1}"))
+                os.replace(self.log_file, self.log_file.with_name(f"{self.log_file.name}.1"))
+            else:
+                self.log_file.unlink()
+        except OSError as e:
+            # Файл держит другой процесс или нет прав - пишем дальше в тот же файл
+            print(f"Не смогли ротировать лог {self.log_file}: {e}", file=sys.stderr)
+        else:
+            with self._stats_lock:
+                self.rotations += 1
+        finally:
+            self._open_file()
@@ -0,0 +1,199 @@
+"""
+Замеры производительности агента.
+Запуск: python benchmark.py <сценарий> [параметры]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from datacls_models import InventoryConfig, LogConfig
+
+# Бюджет холодного импорта main (мс): бенчмарк importtime падает, если его превысили.
+# Замер: медиана ~50 мс (разброс медиан между запусками 43-57 мс), бюджет - замер плюс 50% запаса
+IMPORT_BUDGET_MS = 75
+
+
+def _quiet_logger():
+    """Логгер уровня warning в temp-папке - чтобы не мерить вывод в консоль"""
+    from service_factory import ServiceFactory
+    return ServiceFactory.create_log_service(LogConfig(level='warning', log_path=tempfile.gettempdir()))
+
+
+def bench_collect(args):
+    """Стоимость одной задачи inventory: сбор + payload с диагностикой"""
+    from service_factory import ServiceFactory
+
+    logger = _quiet_logger()
+    for mode in ('full', 'fast'):
+        service = ServiceFactory.create_inventory_service(logger, InventoryConfig(collector_mode=mode))
+        build_payload = getattr(service, '_build_payload', lambda info: info.to_dict())
+
+        # Прогрев - заполняем кэши
+        build_payload(service.collect_os_info())
+
+        started = time.perf_counter()
+        for _ in range(args.iterations):
+            build_payload(service.collect_os_info())
+        elapsed = time.perf_counter() - started
+
+        print(f"{mode:>5}: {elapsed / args.iterations * 1e6:8.1f} мкс/задача ({args.iterations} задач)")
+
+
+def bench_logging(args):
+    """Накладные расходы логирования в цикле воркера при level = warning"""
+    import threading
+
+    logger = _quiet_logger()
+    thread_name = threading.current_thread
+    queue_size = lambda: 0
+
+    def eager():
+        # Как было: f-строки собираются, даже если уровень выключен
+        logger.info(f"Воркер {thread_name().name} взял задачу")
+        logger.info(f"Задача inventory добавлена в очередь. В очереди: {queue_size()}")
+        logger.debug(f"Файл /etc/os-release: владелец={'root'}, группа={'root'}, права={'644'}")
+
+    def lazy():
+        logger.info("Воркер %s взял задачу", lambda: thread_name().name)
+        logger.info("Задача %s добавлена в очередь. В очереди: %s", 'inventory', queue_size)
+        if logger.is_enabled('debug'):
+            logger.debug("Файл %s: владелец=%s, группа=%s, права=%s", '/etc/os-release', 'root', 'root', '644')
+
+    for name, fn in (('eager', eager), ('lazy', lazy)):
+        started = time.perf_counter()
+        for _ in range(args.iterations):
+            fn()
+        elapsed = time.perf_counter() - started
+        print(f"{name:>5}: {elapsed / args.iterations * 1e9:8.0f} нс/итерация воркера ({args.iterations} итераций)")
+
+
+def bench_backends(args):
+    """Пропускная способность сбора: потоки против прогретых процессов"""
+    from concurrent.futures import ThreadPoolExecutor
+    from process_backend import ProcessPoolBackend
+    from service_factory import ServiceFactory
+
+    logger = _quiet_logger()
+    inventory_config = InventoryConfig(collector_mode=args.mode)
+    service = ServiceFactory.create_inventory_service(logger, inventory_config)
+
+    backend = ProcessPoolBackend(LogConfig(level='warning', log_path=tempfile.gettempdir()), inventory_config)
+    backend.start(args.workers)
+
+    try:
+        for name, collect in (('threads', service.collect_os_info), ('processes', backend.collect)):
+            # Один и тот же пул потоков-воркеров, разница только в том, где идёт сбор
+            with ThreadPoolExecutor(max_workers=args.workers) as pool:
+                list(pool.map(lambda _: collect(), range(args.workers)))  # прогрев
+                started = time.perf_counter()
+                list(pool.map(lambda _: collect(), range(args.iterations)))
+                elapsed = time.perf_counter() - started
+            print(f"{name:>9}: {args.iterations / elapsed:10.0f} задач/с ({args.workers} воркеров, {args.iterations} задач)")
+    finally:
+        backend.close()
+
+
+def _import_times(module: str):
+    """Один холодный запуск python -X importtime: {модуль: (self, cumulative)} в мкс"""
+    import subprocess
+
+    # Как в проде: с байткодом в __pycache__, иначе меряем компиляцию исходников
+    env = {k: v for k, v in os.environ.items() if k != 'PYTHONDONTWRITEBYTECODE'}
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True, env=env
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def bench_importtime(args):
+    """Время импорта модуля на холодном старте; выход 1, если медиана выше бюджета"""
+    import statistics
+
+    # Прогрев: первый запуск пишет .pyc, в замер он не идёт
+    _import_times(args.module)
+    runs = [_import_times(args.module) for _ in range(args.runs)]
+    totals = [run[args.module][1] / 1000 for run in runs if args.module in run]
+    if not totals:
+        print(f"{args.module}: не нашли в выводе -X importtime")
+        return 2
+
+    # Кто дороже всего сам по себе - по медиане между прогонами
+    names = set().union(*runs)
+    self_times = {name: statistics.median(run.get(name, (0, 0))[0] for run in runs) / 1000 for name in names}
+    for name, ms in sorted(self_times.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{ms:8.2f} мс  {name}")
+
+    median = statistics.median(totals)
+    print(f"import {args.module}: медиана {median:.1f} мс, мин {min(totals):.1f} мс "
+          f"({args.runs} прогонов, бюджет {args.budget:.0f} мс)")
+    if median > args.budget:
+        print(f"❌ Старт медленнее бюджета на {median - args.budget:.1f} мс")
+        return 1
+    return 0
+
+
+def bench_daemon(args):
+    """Задержка запрос-ответ к запущенному демону (python main.py --daemon), по одной команде"""
+    import statistics
+    from agent_client import AgentClient, default_socket_path
+
+    with AgentClient(args.socket or default_socket_path()) as client:
+        for command in ('ping', 'inventory'):
+            client.request(command)  # прогрев: первый inventory заполняет кэши
+            latencies = []
+            for _ in range(args.iterations):
+                started = time.perf_counter()
+                client.request(command)
+                latencies.append(time.perf_counter() - started)
+            latencies.sort()
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            print(f"{command:>9}: p50 {statistics.median(latencies) * 1e6:7.0f} мкс, "
+                  f"p99 {p99 * 1e6:7.0f} мкс ({args.iterations} запросов)")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Замеры производительности агента')
+    subparsers = parser.add_subparsers(dest='scenario', required=True)
+
+    collect = subparsers.add_parser('collect', help='стоимость задачи inventory: full против fast')
+    collect.add_argument('-n', '--iterations', type=int, default=1000)
+    collect.set_defaults(func=bench_collect)
+
+    logging_ = subparsers.add_parser('logging', help='логирование в цикле воркера при level = warning')
+    logging_.add_argument('-n', '--iterations', type=int, default=100000)
+    logging_.set_defaults(func=bench_logging)
+
+    backends = subparsers.add_parser('backends', help='пропускная способность: threads против processes')
+    backends.add_argument('-n', '--iterations', type=int, default=5000)
+    backends.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1)
+    backends.add_argument('--mode', choices=('full', 'fast'), default='full')
+    backends.set_defaults(func=bench_backends)
+
+    daemon = subparsers.add_parser('daemon', help='задержка запрос-ответ к запущенному демону')
+    daemon.add_argument('-n', '--iterations', type=int, default=1000)
+    daemon.add_argument('--socket', help='сокет демона (по умолчанию - из config.ini)')
+    daemon.set_defaults(func=bench_daemon)
+
+    importtime = subparsers.add_parser('importtime', help='холодный старт по python -X importtime, с бюджетом')
+    importtime.add_argument('-n', '--runs', type=int, default=5)
+    importtime.add_argument('--module', default='main')
+    importtime.add_argument('--budget', type=float, default=IMPORT_BUDGET_MS, help='бюджет на импорт, мс')
+    importtime.add_argument('--top', type=int, default=15, help='сколько самых дорогих модулей показать')
+    importtime.set_defaults(func=bench_importtime)
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    sys.exit(args.func(args))
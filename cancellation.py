@@ -0,0 +1,105 @@
+"""
+Кооперативная отмена задач.
+Воркер привязывает к своему потоку токен задачи, сборщики между шагами зовут
+check_cancelled() и урезают таймауты подпроцессов до оставшегося времени задачи.
+"""
+import contextlib
+import threading
+import time
+from typing import Iterator, Optional
+
+
+class TaskCancelled(BaseException):
+    """
+    Задачу отменили (истёк таймаут). Наследуемся от BaseException, как asyncio.CancelledError:
+    сборщики ловят Exception и не должны проглатывать отмену.
+    """
+
+
+class CancellationToken:
+    """
+    Флаг отмены одной задачи плюс её дедлайн (time.monotonic).
+    Отмена и публикация результата взаимоисключающие: кто первый - cancel() или finish(),
+    тот и решает судьбу задачи.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.reason = ''
+        self._event = threading.Event()
+        self._finished = False
+        self._lock = threading.Lock()
+
+    def cancel(self, reason: str = 'cancelled') -> bool:
+        """False - задача уже публикует результат, отменять поздно"""
+        with self._lock:
+            if self._finished:
+                return False
+            self.reason = reason
+            self._event.set()
+            return True
+
+    def finish(self) -> bool:
+        """Точка невозврата перед публикацией; False - задачу уже отменили, публиковать нельзя"""
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self._finished = True
+            return True
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def remaining(self) -> Optional[float]:
+        """Сколько осталось до дедлайна (None - без ограничения)"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise TaskCancelled(self.reason)
+
+
+_local = threading.local()
+
+
+def current_token() -> Optional[CancellationToken]:
+    """Токен задачи, которую сейчас выполняет этот поток"""
+    return getattr(_local, 'token', None)
+
+
+@contextlib.contextmanager
+def bind(token: CancellationToken) -> Iterator[CancellationToken]:
+    """Привязываем токен к текущему потоку на время задачи"""
+    previous = current_token()
+    _local.token = token
+    try:
+        yield token
+    finally:
+        _local.token = previous
+
+
+def check_cancelled():
+    """Точка отмены для сборщиков: вне задачи ничего не делает"""
+    token = current_token()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+def finish_task():
+    """Зовём прямо перед публикацией результата: дальше задача не отменяется, отменённая - TaskCancelled"""
+    token = current_token()
+    if token is not None and not token.finish():
+        raise TaskCancelled(token.reason)
+
+
+def effective_timeout(timeout: float) -> float:
+    """Таймаут подпроцесса или чтения, урезанный до остатка времени задачи"""
+    token = current_token()
+    if token is None:
+        return timeout
+    token.raise_if_cancelled()
+    remaining = token.remaining()
+    return timeout if remaining is None else min(timeout, remaining)
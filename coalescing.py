@@ -0,0 +1,180 @@
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+if TYPE_CHECKING:
+    import asyncio
+
+
+class CallAbandoned(TimeoutError):
+    """Общий сбор завис и брошен - дубликаты, ждавшие его, не дождутся результата"""
+
+
+class _Call:
+    """Один запуск сбора, результат которого делят между задачами"""
+
+    __slots__ = ('done', 'result', 'error', 'finished_at')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.finished_at = 0.0
+
+
+class SingleFlight:
+    """
+    Склеиваем одинаковые задачи:
+    - пока сбор идёт, дубликаты ждут его и получают тот же результат
+    - после завершения результат считается свежим ещё fresh_window секунд
+    """
+
+    def __init__(self, fresh_window: float = 0.0):
+        self.fresh_window = fresh_window
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+        self.executed = 0
+        self.shared_inflight = 0
+        self.shared_recent = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Возвращает (результат, был_ли_он_общим)"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None and call.done.is_set():
+                if call.error is None and time.monotonic() - call.finished_at <= self.fresh_window:
+                    self.shared_recent += 1
+                    return call.result, True
+                # Протух - собираем заново
+                call = None
+
+            if call is not None:
+                self.shared_inflight += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, call, error=e)
+            raise
+        self._finish(key, call, result=result)
+        return result, False
+
+    def _finish(self, key: Hashable, call: _Call, result: Any = None, error: Optional[BaseException] = None):
+        """Лидер отдаёт итог дубликатам - если abandon() не успел раньше"""
+        with self._lock:
+            if call.done.is_set():
+                # Дубликаты уже получили ошибку от abandon() - она окончательная
+                return
+            call.result = result
+            call.error = error
+            call.finished_at = time.monotonic()
+            if error is not None or self.fresh_window <= 0:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+
+    def abandon(self, key: Hashable, error: CallAbandoned):
+        """
+        Сбор по ключу завис: ждущие его дубликаты получают error, а следующий
+        вызов начнёт сбор заново, не дожидаясь зависшего. Вернувшийся позже лидер итог не меняет
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None or call.done.is_set():
+                return
+            del self._calls[key]
+            call.error = error
+            call.finished_at = time.monotonic()
+            call.done.set()
+
+    def forget(self, key: Optional[Hashable] = None):
+        """Сбрасываем запомненный результат (или все сразу)"""
+        with self._lock:
+            if key is None:
+                self._calls = {k: c for k, c in self._calls.items() if not c.done.is_set()}
+            elif key in self._calls and self._calls[key].done.is_set():
+                del self._calls[key]
+
+    def stats(self) -> Dict[str, int]:
+        """Сколько раз реально собирали и сколько раз поделились результатом"""
+        return {
+            'executed': self.executed,
+            'shared_inflight': self.shared_inflight,
+            'shared_recent': self.shared_recent,
+        }
+
+
+class AsyncSingleFlight:
+    """
+    То же склеивание для asyncio: дубликаты ждут общий Future, а не Event.
+    Живёт в одном event loop, поэтому обходится без блокировок.
+    """
+
+    def __init__(self, fresh_window: float = 0.0):
+        self.fresh_window = fresh_window
+        self._calls: Dict[Hashable, Tuple[asyncio.Future, float]] = {}
+
+        self.executed = 0
+        self.shared_inflight = 0
+        self.shared_recent = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Возвращает (результат, был_ли_он_общим)"""
+        import asyncio
+        
+        call = self._calls.get(key)
+        if call is not None:
+            future, finished_at = call
+            if not future.done():
+                self.shared_inflight += 1
+                return await asyncio.shield(future), True
+            if future.exception() is None and time.monotonic() - finished_at <= self.fresh_window:
+                self.shared_recent += 1
+                return future.result(), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = (future, 0.0)
+        self.executed += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # Отменили лидера (обычно таймаут задачи). Дубликатам - обычная ошибка, а не отмена:
+            # CancelledError в чужой корутине выглядел бы как отмена её самой
+            future.set_exception(TimeoutError(f"Сбор {key!r} отменён, общий результат не получен"))
+            future.exception()
+            self._calls.pop(key, None)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Ошибку никто может не забрать - помечаем её прочитанной
+            future.exception()
+            self._calls.pop(key, None)
+            raise
+
+        future.set_result(result)
+        if self.fresh_window > 0:
+            self._calls[key] = (future, time.monotonic())
+        else:
+            self._calls.pop(key, None)
+        return result, False
+
+    def stats(self) -> Dict[str, int]:
+        """Сколько раз реально собирали и сколько раз поделились результатом"""
+        return {
+            'executed': self.executed,
+            'shared_inflight': self.shared_inflight,
+            'shared_recent': self.shared_recent,
+        }
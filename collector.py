@@ -0,0 +1,80 @@
+"""
+Встраиваемый API: информация об ОС прямо в своём процессе, без запуска main.py.
+
+    from collector import collect
+    info = collect()                                          # InventoryResult
+    info = collect(InventoryConfig(collector_mode='fast'))
+
+Без побочных эффектов: payload.json не пишется, logging.basicConfig не вызывается,
+в stdout ничего не печатается. Сообщения сборщика уходят в логгер 'os_collector' -
+куда их выводить, решает приложение.
+Сборщик прогревается один раз на набор настроек (права на файлы, кэш проб) и дальше
+переиспользуется; collect() можно звать из многих потоков сразу.
+"""
+import dataclasses
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from datacls_models import InventoryConfig, InventoryResult
+from interfaces import BaseInventoryService, BaseLogService
+from service_factory import ServiceFactory
+
+LIBRARY_LOGGER = 'os_collector'
+
+
+class LibraryLogService(BaseLogService):
+    """Логгер для встраивания: ни файлов, ни basicConfig - только logging.getLogger('os_collector')"""
+
+    def _setup_logging(self):
+        self.logger = logging.getLogger(LIBRARY_LOGGER)
+        # Если у приложения логирование не настроено, logging не будет сыпать предупреждения в stderr
+        if not any(isinstance(handler, logging.NullHandler) for handler in self.logger.handlers):
+            self.logger.addHandler(logging.NullHandler())
+
+
+class Collector:
+    """Прогретый сборщик под один набор настроек"""
+
+    def __init__(self, config: Optional[InventoryConfig] = None, logger: Optional[BaseLogService] = None):
+        # Библиотека ничего не пишет на диск, что бы ни было в настройках
+        self.config = dataclasses.replace(config or InventoryConfig(), write_payload=False, cache_file="")
+        self.service: BaseInventoryService = ServiceFactory.create_inventory_service(
+            logger or LibraryLogService(), self.config
+        )
+
+    def collect(self) -> InventoryResult:
+        return self.service.collect_os_info()
+
+    async def collect_async(self) -> InventoryResult:
+        return await self.service.collect_os_info_async()
+
+    def payload(self, os_info: Optional[InventoryResult] = None) -> Dict[str, Any]:
+        """То, что CLI записал бы в payload.json: результат плюс диагностика прав"""
+        return self.service._build_payload(os_info or self.collect())
+
+
+_collectors: Dict[Tuple, Collector] = {}
+_collectors_lock = threading.Lock()
+
+
+def get_collector(config: Optional[InventoryConfig] = None) -> Collector:
+    """Общий сборщик под эти настройки: создаётся при первом вызове"""
+    key = dataclasses.astuple(config or InventoryConfig())
+    collector = _collectors.get(key)
+    if collector is None:
+        with _collectors_lock:
+            collector = _collectors.get(key)
+            if collector is None:
+                collector = _collectors[key] = Collector(config)
+    return collector
+
+
+def collect(config: Optional[InventoryConfig] = None) -> InventoryResult:
+    """Собираем информацию об ОС в текущем процессе"""
+    return get_collector(config).collect()
+
+
+async def collect_async(config: Optional[InventoryConfig] = None) -> InventoryResult:
+    """То же из asyncio-кода: подпроцессы не блокируют event loop"""
+    return await get_collector(config).collect_async()
@@ -1,21 +1,34 @@
 import configparser
 import contextlib
+import logging
 from pathlib import Path
-import platform
 
-from datacls_models import LogConfig, WorkersConfig
+from datacls_models import (AppConfig, DaemonConfig, InventoryConfig, LogConfig, MetricsConfig,
+                            ResultsConfig, WorkersConfig)
 
-CURRENT_OS = platform.system().lower()
+
+RESULT_SINKS = ('jsonl', 'memory')
+COLLECTOR_MODES = ('full', 'fast')
+WORKER_BACKENDS = ('threads', 'processes', 'asyncio')
+
+# Конфиг читается до настройки логирования: пишем в logging, а не в stdout.
+# Пока обработчиков нет, logging сам покажет только предупреждения (в stderr)
+_log = logging.getLogger('os_collector.config')
 
 class ConfigLoader:
     """Загружаем конфиг, если он есть"""
     
     @staticmethod
-    def load_config() -> tuple[LogConfig, WorkersConfig]:
+    def load_config() -> AppConfig:
+        # Импорты здесь, а не наверху модуля: config_loader грузится первым, и каждый лишний
+        # модуль на верхнем уровне - это время холодного старта (см. benchmark.py importtime)
+        from service_factory import CURRENT_OS
+
         config_path = Path(__file__).parent / "config.ini"
 
-        log_config = LogConfig()
-        workers_config = WorkersConfig()
+        app_config = AppConfig()
+        log_config = app_config.logging
+        workers_config = app_config.workers
 
         # Пути по умолчанию для разных ОС
         if CURRENT_OS == 'windows':
@@ -24,9 +37,13 @@ class ConfigLoader:
             log_config.log_path = str(Path.home() / ".cache" / "os-collector")
 
         if not config_path.exists():
-            print(f"Конфиг {config_path} не найден, используем значения по умолчанию")
-            return log_config, workers_config
+            _log.info("Конфиг %s не найден, используем значения по умолчанию", config_path)
+            ConfigLoader._apply_worker_bounds(workers_config)
+            ConfigLoader._apply_daemon_defaults(app_config)
+            return app_config
 
+        # Тёплый кэш - только по явному cache_file: без него каждый запуск собирает заново, как раньше
+        cache_file = ''
         try:
             config = configparser.ConfigParser()
             config.read(config_path, encoding='utf-8')
@@ -39,13 +56,198 @@ class ConfigLoader:
 
                 if 'log_path' in config['logging']:
                     log_config.log_path = config['logging']['log_path']
+
+                ConfigLoader._load_async_logging(config['logging'], log_config)
             
             if 'workers' in config and 'InventoryWorkers' in config['workers']:
                 with contextlib.suppress(ValueError):
-                    workers = int(config['workers']['InventoryWorkers'])
-                    # Ограничиваем разумными пределами
-                    workers_config.inventory_workers = max(1, min(workers, 10))
+                    workers_config.inventory_workers = max(1, int(config['workers']['InventoryWorkers']))
+
+            if 'workers' in config:
+                ConfigLoader._load_autoscale(config['workers'], workers_config)
+                ConfigLoader._load_admission(config['workers'], workers_config)
+                ConfigLoader._load_pipeline(config['workers'], workers_config)
+
+            if 'workers' in config and 'CoalesceWindow' in config['workers']:
+                with contextlib.suppress(ValueError):
+                    workers_config.coalesce_window = max(0.0, float(config['workers']['CoalesceWindow']))
+
+            if 'workers' in config and 'Backend' in config['workers']:
+                backend = config['workers']['Backend'].lower()
+                if backend in WORKER_BACKENDS:
+                    workers_config.backend = backend
+
+            if 'workers' in config and 'AsyncConcurrency' in config['workers']:
+                with contextlib.suppress(ValueError):
+                    workers_config.async_concurrency = max(1, int(config['workers']['AsyncConcurrency']))
+
+            if 'results' in config:
+                ConfigLoader._load_results(config['results'], app_config.results)
+
+            if 'metrics' in config:
+                ConfigLoader._load_metrics(config['metrics'], app_config.metrics)
+
+            if 'daemon' in config:
+                ConfigLoader._load_daemon(config['daemon'], app_config.daemon)
+
+            if 'inventory' in config:
+                mode = config['inventory'].get('mode', '').lower()
+                if mode in COLLECTOR_MODES:
+                    app_config.inventory.collector_mode = mode
+                from payload_writer import PAYLOAD_FORMATS
+                payload_format = config['inventory'].get('payload_format', '').lower()
+                if payload_format in PAYLOAD_FORMATS:
+                    app_config.inventory.payload_format = payload_format
+                cache_file = config['inventory'].get('cache_file', cache_file).strip()
         except Exception as e:
-            print(f"Ошибка при чтении конфига: {e}")
+            _log.warning("Ошибка при чтении конфига %s: %s", config_path, e)
+
+        ConfigLoader._apply_worker_bounds(workers_config)
+        ConfigLoader._apply_daemon_defaults(app_config)
+        ConfigLoader._apply_cache_file(app_config, cache_file)
+        return app_config
+
+    @staticmethod
+    def _load_autoscale(section, workers_config: WorkersConfig):
+        """Границы и период автомасштабирования пула"""
+        with contextlib.suppress(ValueError):
+            workers_config.autoscale = section.getboolean('Autoscale', workers_config.autoscale)
+        with contextlib.suppress(ValueError):
+            workers_config.min_workers = max(1, int(section.get('MinWorkers', workers_config.min_workers)))
+        with contextlib.suppress(ValueError):
+            workers_config.max_workers = max(0, int(section.get('MaxWorkers', workers_config.max_workers)))
+        with contextlib.suppress(ValueError):
+            workers_config.worker_limit = max(1, int(section.get('WorkerLimit', workers_config.worker_limit)))
+        with contextlib.suppress(ValueError):
+            workers_config.scale_interval = max(0.1, float(section.get('ScaleInterval', workers_config.scale_interval)))
+        with contextlib.suppress(ValueError):
+            workers_config.task_ttl = max(0.0, float(section.get('TaskTTL', workers_config.task_ttl)))
+        with contextlib.suppress(ValueError):
+            workers_config.task_timeout = max(0.0, float(section.get('TaskTimeout', workers_config.task_timeout)))
+
+    @staticmethod
+    def _load_admission(section, workers_config: WorkersConfig):
+        """Ёмкость очереди задач и политика допуска"""
+        from admission import ADMISSION_POLICIES
+
+        with contextlib.suppress(ValueError):
+            workers_config.queue_capacity = max(1, int(section.get('QueueCapacity', workers_config.queue_capacity)))
+        admission = section.get('Admission', workers_config.admission).lower()
+        if admission in ADMISSION_POLICIES:
+            workers_config.admission = admission
+        with contextlib.suppress(ValueError):
+            workers_config.admission_timeout = max(0.0, float(section.get('AdmissionTimeout', workers_config.admission_timeout)))
+        with contextlib.suppress(ValueError):
+            workers_config.rate_limit = max(0.0, float(section.get('RateLimit', workers_config.rate_limit)))
+        with contextlib.suppress(ValueError):
+            workers_config.rate_burst = max(1, int(section.get('RateBurst', workers_config.rate_burst)))
+
+    @staticmethod
+    def _load_metrics(section, metrics_config: MetricsConfig):
+        """Куда и как часто выгружать метрики"""
+        metrics_config.textfile = section.get('textfile', metrics_config.textfile).strip()
+        with contextlib.suppress(ValueError):
+            metrics_config.export_interval = max(0.0, float(section.get('export_interval', metrics_config.export_interval)))
+        with contextlib.suppress(ValueError):
+            port = int(section.get('http_port', metrics_config.http_port))
+            if 0 <= port <= 65535:
+                metrics_config.http_port = port
+
+    @staticmethod
+    def _load_daemon(section, daemon_config: DaemonConfig):
+        """Сокет демона и права на него"""
+        daemon_config.socket_path = section.get('socket_path', daemon_config.socket_path).strip()
+        with contextlib.suppress(ValueError):
+            # Права пишем как в chmod: 600, 660
+            daemon_config.socket_mode = int(section.get('socket_mode', oct(daemon_config.socket_mode)[2:]), 8) & 0o777
+
+    @staticmethod
+    def _apply_daemon_defaults(app_config: AppConfig):
+        """Сокет по умолчанию лежит в папке логов"""
+        if not app_config.daemon.socket_path:
+            app_config.daemon.socket_path = str(Path(app_config.logging.log_path) / "agent.sock")
+
+    @staticmethod
+    def _apply_cache_file(app_config: AppConfig, cache_file: str):
+        """Тёплый кэш: относительный путь - от папки логов, пусто - выключен"""
+        if cache_file:
+            app_config.inventory.cache_file = str(Path(app_config.logging.log_path) / cache_file)
+
+    @staticmethod
+    def _load_pipeline(section, workers_config: WorkersConfig):
+        """Стадии конвейера и их пулы"""
+        with contextlib.suppress(ValueError):
+            workers_config.pipeline = section.getboolean('Pipeline', workers_config.pipeline)
+        with contextlib.suppress(ValueError):
+            workers_config.serialize_workers = max(1, int(section.get('SerializeWorkers', workers_config.serialize_workers)))
+        with contextlib.suppress(ValueError):
+            workers_config.persist_workers = max(1, int(section.get('PersistWorkers', workers_config.persist_workers)))
+        with contextlib.suppress(ValueError):
+            workers_config.stage_queue_size = max(1, int(section.get('StageQueueSize', workers_config.stage_queue_size)))
+
+    @staticmethod
+    def _apply_worker_bounds(workers_config: WorkersConfig):
+        """
+        Потолок по CPU - только для автомасштабирования. Фиксированный пул берём как задан:
+        воркеры почти всё время ждут I/O, и 3 воркера на 1 CPU - нормально.
+        Выше WorkerLimit не поднимаемся ни в каком режиме.
+        """
+        limit = workers_config.worker_limit
+        if workers_config.inventory_workers > limit:
+            _log.warning("InventoryWorkers = %s больше WorkerLimit, стартуем с %s",
+                         workers_config.inventory_workers, limit)
+            workers_config.inventory_workers = limit
+        if workers_config.max_workers > limit:
+            _log.warning("MaxWorkers = %s больше WorkerLimit, масштабируемся до %s",
+                         workers_config.max_workers, limit)
+            workers_config.max_workers = limit
+        workers_config.min_workers = min(workers_config.min_workers, limit)
+        if workers_config.max_workers <= 0:
+            from utils import available_cpus
+            workers_config.max_workers = min(limit, max(workers_config.min_workers, available_cpus()))
+        workers_config.max_workers = max(workers_config.min_workers, workers_config.max_workers)
+        if not workers_config.autoscale:
+            # Границы в статистике не должны противоречить реальному размеру пула
+            workers_config.max_workers = max(workers_config.max_workers, workers_config.inventory_workers)
+            return
+
+        bounded = max(workers_config.min_workers, min(workers_config.inventory_workers, workers_config.max_workers))
+        if bounded != workers_config.inventory_workers:
+            _log.warning("InventoryWorkers = %s вне MinWorkers..MaxWorkers (%s..%s), стартуем с %s",
+                         workers_config.inventory_workers, workers_config.min_workers,
+                         workers_config.max_workers, bounded)
+            workers_config.inventory_workers = bounded
+
+    @staticmethod
+    def _load_async_logging(section: configparser.SectionProxy, log_config: LogConfig):
+        """Параметры асинхронного логирования из секции [logging]"""
+        with contextlib.suppress(ValueError):
+            log_config.async_mode = section.getboolean('async', log_config.async_mode)
+        with contextlib.suppress(ValueError):
+            log_config.queue_size = max(1, section.getint('queue_size', log_config.queue_size))
+        with contextlib.suppress(ValueError):
+            log_config.batch_size = max(1, section.getint('batch_size', log_config.batch_size))
+        with contextlib.suppress(ValueError):
+            log_config.flush_interval = max(0.01, section.getfloat('flush_interval', log_config.flush_interval))
+        with contextlib.suppress(ValueError):
+            log_config.max_bytes = max(0, section.getint('max_bytes', log_config.max_bytes))
+        with contextlib.suppress(ValueError):
+            log_config.rotate_interval = max(0.0, section.getfloat('rotate_interval', log_config.rotate_interval))
+        with contextlib.suppress(ValueError):
+            log_config.backup_count = max(0, section.getint('backup_count', log_config.backup_count))
+
+    @staticmethod
+    def _load_results(section: configparser.SectionProxy, results_config: ResultsConfig):
+        """Секция [results] - куда и как выгружаем результаты"""
+        sink = section.get('sink', results_config.sink).lower()
+        if sink in RESULT_SINKS:
+            results_config.sink = sink
+
+        if 'file_name' in section:
+            # Только имя файла - пишем всегда в папку логов
+            results_config.file_name = Path(section['file_name']).name
 
-        return log_config, workers_config
+        with contextlib.suppress(ValueError):
+            results_config.batch_size = max(1, section.getint('batch_size', results_config.batch_size))
+        with contextlib.suppress(ValueError):
+            results_config.flush_interval = max(0.05, section.getfloat('flush_interval', results_config.flush_interval))
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Dict, Optional
 
 @dataclass
@@ -36,6 +36,8 @@ class LinuxInventoryResult(InventoryResult):
     """Расширение для Linux - версия ядра и дистрибутив"""
     KernelVersion: str = ""
     Distribution: str = ""
+    # NAME из os-release - только для диагностики payload, в запись результата не попадает
+    DistributionName: str = ""
     
     def to_dict(self) -> Dict:
         data = super().to_dict()
@@ -48,11 +50,87 @@ class LogConfig:
     """Настройки логирования"""
     level: str = "info"
     log_path: str = "."
+    # Асинхронная запись: воркеры не ждут диск и консоль
+    async_mode: bool = False
+    queue_size: int = 10000
+    batch_size: int = 256
+    flush_interval: float = 0.5
+    max_bytes: int = 10 * 1024 * 1024
+    rotate_interval: float = 0  # секунды, 0 - не ротируем по времени
+    backup_count: int = 5
     
 @dataclass
 class WorkersConfig:
     """Настройки воркеров"""
     inventory_workers: int = 1
+    # Сколько секунд результат inventory считается свежим для дубликатов
+    coalesce_window: float = 1.0
+    # Где выполняется сбор: threads - в потоках-воркерах, processes - в прогретых процессах,
+    # asyncio - корутины в одном потоке
+    backend: str = "threads"
+    # Сколько задач одновременно выполняет asyncio-диспетчер
+    async_concurrency: int = 64
+    # Автомасштабирование пула по глубине очереди и времени задачи
+    autoscale: bool = False
+    min_workers: int = 1
+    max_workers: int = 0  # 0 - по числу доступных CPU (affinity и квота cgroup)
+    scale_interval: float = 1.0
+    # Жёсткий потолок пула в любом режиме - от опечатки вроде InventoryWorkers = 5000
+    worker_limit: int = 64
+    # Срок жизни задачи в очереди по умолчанию (сек), 0 - без срока
+    task_ttl: float = 0.0
+    # Сколько секунд задача может выполняться, 0 - без сторожа
+    task_timeout: float = 0.0
+    # Допуск в очередь: ёмкость и политика на переполнение/всплеск
+    queue_capacity: int = 100
+    admission: str = "block"  # reject | block | drop_oldest | token_bucket
+    admission_timeout: float = 0.0  # для block: 0 - ждём места сколько нужно
+    rate_limit: float = 0.0  # для token_bucket: задач в секунду
+    rate_burst: int = 10
+    # Конвейер collect -> serialize -> persist со своими пулами и очередями между стадиями
+    pipeline: bool = False
+    serialize_workers: int = 1
+    persist_workers: int = 1
+    stage_queue_size: int = 100
+
+@dataclass
+class ResultsConfig:
+    """Настройки выгрузки результатов"""
+    sink: str = "jsonl"  # jsonl | memory
+    file_name: str = "results.jsonl"
+    batch_size: int = 50
+    flush_interval: float = 1.0
+
+@dataclass
+class InventoryConfig:
+    """Настройки сборщика"""
+    collector_mode: str = "full"  # full | fast
+    payload_format: str = "pretty"  # pretty | compact | jsonl
+    write_payload: bool = True  # False - execute_task не пишет payload.json (библиотечный режим)
+    cache_file: str = ""  # тёплый кэш между запусками; пусто - без кэша
+
+@dataclass
+class MetricsConfig:
+    """Выгрузка метрик"""
+    textfile: str = "metrics.prom"  # в папке логов, пусто - не пишем
+    export_interval: float = 10.0
+    http_port: int = 0  # 0 - без HTTP, иначе /metrics на 127.0.0.1
+
+@dataclass
+class DaemonConfig:
+    """Режим демона (--daemon)"""
+    socket_path: str = ""  # пусто - agent.sock в папке логов
+    socket_mode: int = 0o600
+
+@dataclass
+class AppConfig:
+    """Все настройки агента разом"""
+    logging: LogConfig = field(default_factory=LogConfig)
+    workers: WorkersConfig = field(default_factory=WorkersConfig)
+    results: ResultsConfig = field(default_factory=ResultsConfig)
+    inventory: InventoryConfig = field(default_factory=InventoryConfig)
+    metrics: MetricsConfig = field(default_factory=MetricsConfig)
+    daemon: DaemonConfig = field(default_factory=DaemonConfig)
 
 @dataclass
 class Task:
@@ -60,12 +138,18 @@ class Task:
     command: str
     timestamp: str
     id: str
+    priority: str = "normal"  # high | normal | low
+    deadline: Optional[float] = None  # time.time(), после которого задачу уже не выполняем
     
     def to_dict(self) -> Dict:
         return {
             'command': self.command,
             'timestamp': self.timestamp,
-            'id': self.id
+            'id': self.id,
+            # Когда задача встала в очередь; started_at допишет воркер
+            'enqueued_at': self.timestamp,
+            'priority': self.priority,
+            'deadline': self.deadline
         }
 
 @dataclass
@@ -75,11 +159,21 @@ class TaskResult:
     data: Dict
     timestamp: str
     os: str
+    task_id: str = ""
+    enqueued_at: str = ""
+    started_at: str = ""
+    finished_at: str = ""
+    coalesced: bool = False
     
     def to_dict(self) -> Dict:
         return {
             'status': self.status,
             'data': self.data,
             'timestamp': self.timestamp,
-            'os': self.os
+            'os': self.os,
+            'task_id': self.task_id,
+            'enqueued_at': self.enqueued_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'coalesced': self.coalesced
         }
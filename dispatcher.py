@@ -1,106 +1,744 @@
+import contextlib
+import functools
+import itertools
+import math
+import os
 import queue
 import threading
 import time
+from concurrent.futures import Future
 from datetime import datetime
-from typing import Dict, Any
+from typing import TYPE_CHECKING, Dict, Any, Iterable, Iterator, List, Optional
 
-from interfaces import BaseLogService, BaseInventoryService, DispatcherInterface
-from datacls_models import WorkersConfig, Task
+from interfaces import BaseLogService, BaseInventoryService, BaseResultSink, DispatcherInterface
+from datacls_models import WorkersConfig, ResultsConfig, Task
+from result_sink import MemoryResultSink, ResultSinkService
+from coalescing import CallAbandoned, SingleFlight
+from task_queue import DEFAULT_PRIORITY, PRIORITIES, TaskQueue
+from admission import AdmissionController
+from pipeline import Pipeline, Stage, StageStats
+from cancellation import CancellationToken, TaskCancelled, bind, check_cancelled, current_token
+from metrics import REGISTRY
+
+if TYPE_CHECKING:
+    # Нужны только для аннотаций: multiprocessing и cProfile грузим, когда они включены
+    from process_backend import ProcessPoolBackend
+    from profiling import TaskProfiler
 
 # Константы безопасности
 ALLOWED_COMMANDS = {'inventory'}
 MAX_QUEUE_SIZE = 100
-QUEUE_GET_TIMEOUT = 1
+SHUTDOWN_TIMEOUT = 5
+
+SHUTDOWN_DRAIN = 'drain'
+SHUTDOWN_CANCEL = 'cancel'
+
+# Маркер остановки: воркер, достав его из очереди, завершается
+_SHUTDOWN = None
+# Маркер сокращения пула: его достаёт и завершается ровно один воркер
+_RETIRE = object()
+# Задача ушла в стадии конвейера - Future закроет стадия persist
+_HANDED_OFF = object()
+
+# Автомасштабирование: расширяемся, если очередь не разгребётся за период опроса,
+# сжимаемся, если столько периодов подряд очередь пуста и есть простаивающие воркеры
+SCALE_DOWN_IDLE_TICKS = 3
+LATENCY_EWMA_ALPHA = 0.2
+
+# Как часто сторож проверяет выполняющиеся задачи (не реже)
+WATCHDOG_INTERVAL = 0.5
+
+# Итог каждой задачи: success, error, timeout, expired, cancelled, shed, rejected
+TASKS_TOTAL = REGISTRY.counter('collector_tasks_total', 'Задачи по итогу выполнения')
+FAILED_STATUSES = ('error', 'timeout')
+
+
+_task_counter = itertools.count(1)
+_task_counter_lock = threading.Lock()
+
+
+def next_task_id() -> str:
+    """
+    Уникальный id задачи: pid плюс монотонный счётчик.
+    Не повторяется ни между потоками, ни в пределах одной секунды.
+    """
+    with _task_counter_lock:
+        return f"{os.getpid()}-{next(_task_counter)}"
+
+
+def is_allowed_command(command: str) -> bool:
+    """Проверяем команду по белому списку"""
+    # Оставляем только буквы - защита от инъекций
+    command = ''.join(c for c in command if c.isalpha())
+    return command in ALLOWED_COMMANDS
+
+
+class _RunningTask:
+    """Задача в работе у воркера - то, что нужно сторожу"""
+    
+    __slots__ = ('task_data', 'future', 'token', 'thread', 'abandoned')
+    
+    def __init__(self, task_data: Dict[str, Any], future: Optional[Future],
+                 token: CancellationToken, thread: threading.Thread):
+        self.task_data = task_data
+        self.future = future
+        self.token = token
+        self.thread = thread
+        # Сторож уже отчитался за задачу и заменил воркера
+        self.abandoned = False
+
 
 class DispatcherService(DispatcherInterface):
     """Сервис-диспетчер - распределяет задачи по воркерам"""
     
     def __init__(self, workers_config: WorkersConfig, logger: BaseLogService, 
-                 inventory_service: BaseInventoryService):
+                 inventory_service: BaseInventoryService,
+                 result_sink: Optional[BaseResultSink] = None,
+                 results_config: Optional[ResultsConfig] = None,
+                 process_backend: Optional['ProcessPoolBackend'] = None,
+                 profiler: Optional['TaskProfiler'] = None):
         self.logger = logger
         self.workers_config = workers_config
         
         # Очереди с ограничением размера - защита от переполнения
-        self.task_queue = queue.Queue(maxsize=MAX_QUEUE_SIZE)
+        # Задачи - по классам приоритета, результаты - FIFO
+        self.task_queue = TaskQueue(maxsize=workers_config.queue_capacity)
         self.result_queue = queue.Queue(maxsize=MAX_QUEUE_SIZE)
         
+        # Что делать, когда очередь полна или задачи идут слишком плотно
+        self.admission = AdmissionController(
+            self.task_queue,
+            policy=workers_config.admission,
+            timeout=workers_config.admission_timeout,
+            rate=workers_config.rate_limit,
+            burst=workers_config.rate_burst,
+            on_shed=self._on_shed
+        )
+        
         self.inventory_service = inventory_service
         self.inventory_service.result_queue = self.result_queue
         
+        # Отдельный поток вычерпывает результаты, чтобы воркеры не стояли на put()
+        results_config = results_config or ResultsConfig()
+        self.result_sink = ResultSinkService(
+            self.result_queue,
+            result_sink or MemoryResultSink(max_records=MAX_QUEUE_SIZE),
+            logger,
+            batch_size=results_config.batch_size,
+            flush_interval=results_config.flush_interval
+        )
+        
+        # Сбор в прогретых процессах вместо потоков (если backend = processes).
+        # У детей тёплого кэша нет - сверяемся с ним и обновляем его здесь, в родителе
+        self.process_backend = process_backend
+        if process_backend is not None:
+            self._collect = functools.partial(inventory_service.collect_with, process_backend.collect)
+        else:
+            self._collect = inventory_service.collect_os_info
+        
+        # cProfile на задачах воркеров (--profile)
+        self.profiler = profiler
+        
+        # Одинаковые inventory собираем один раз и делим результат
+        self.single_flight = SingleFlight(workers_config.coalesce_window)
+        
         self.is_running = threading.Event()
         self.is_running.set()
         
         self.inventory_workers = []
+        self._workers_lock = threading.Lock()
+        self._worker_seq = 0
+        
+        # Что сейчас выполняет каждый воркер - для отчёта о недоделанном при остановке
+        self._in_flight: Dict[str, Dict[str, Any]] = {}
+        self._in_flight_lock = threading.Lock()
+        
+        # Сторож таймаутов: задачи дольше TaskTimeout отменяем, воркера заменяем
+        self._running: Dict[str, _RunningTask] = {}
+        self._watchdog: Optional[threading.Thread] = None
+        self._watchdog_stop = threading.Event()
+        self.tasks_timed_out = 0
+        self.workers_replaced = 0
+        self._status_counts: Dict[str, int] = {}
+        self._status_lock = threading.Lock()
+        
+        # Конвейер: воркеры только собирают, сериализация и запись - в своих пулах
+        self.collect_stats = StageStats('collect')
+        self.pipeline: Optional[Pipeline] = None
+        if workers_config.pipeline:
+            self.pipeline = Pipeline([
+                Stage('serialize', self._serialize_stage, logger, workers_config.serialize_workers,
+                      workers_config.stage_queue_size, on_error=self._stage_failed),
+                Stage('persist', self._persist_stage, logger, workers_config.persist_workers,
+                      workers_config.stage_queue_size, on_error=self._stage_failed),
+            ])
+        
+        # Future на каждую задачу, поставленную через submit()
+        self._futures: Dict[str, Future] = {}
+        self._futures_lock = threading.Lock()
+        
+        # Автомасштабирование
+        self._scaler: Optional[threading.Thread] = None
+        self._scaler_stop = threading.Event()
+        self._latency_avg = 0.0
+        self._retiring = 0
+        self.scale_ups = 0
+        self.scale_downs = 0
+        self.peak_workers = 0
+        self.last_scale_decision = ''
+        
+        self._register_gauges()
+    
+    def _register_gauges(self):
+        """Шкалы, которые считаются в момент выгрузки метрик"""
+        REGISTRY.gauge('collector_queue_depth', 'Задач в очереди').set_function(self.task_queue.qsize)
+        REGISTRY.gauge('collector_workers', 'Воркеров в пуле').set_function(lambda: len(self.inventory_workers))
+        REGISTRY.gauge('collector_workers_busy', 'Воркеров, занятых задачей').set_function(lambda: len(self._running))
+        REGISTRY.gauge('collector_worker_utilization', 'Доля занятых воркеров').set_function(self._utilization)
+        admission = REGISTRY.counter('collector_admission_total', 'Решения контроля допуска')
+        for decision in ('accepted', 'rejected', 'rate_limited', 'shed'):
+            admission.set_function(lambda d=decision: getattr(self.admission, d), decision=decision)
+    
+    def _utilization(self) -> float:
+        workers = len(self.inventory_workers)
+        return len(self._running) / workers if workers else 0.0
+    
+    def _count(self, status: str):
+        TASKS_TOTAL.inc(status=status)
+        with self._status_lock:
+            self._status_counts[status] = self._status_counts.get(status, 0) + 1
+    
+    def failed_tasks(self) -> int:
+        """Сколько задач закончилось ошибкой или таймаутом"""
+        with self._status_lock:
+            return sum(self._status_counts.get(status, 0) for status in FAILED_STATUSES)
     
     def start_workers(self):
         """Запускаем воркеров"""
-        self.logger.info(f"Запускаем {self.workers_config.inventory_workers} воркеров")
+        self.logger.info("Запускаем %s воркеров", self.workers_config.inventory_workers)
+        self.result_sink.start()
+        if self.pipeline is not None:
+            self.pipeline.start()
+        
+        if self.process_backend is not None:
+            self.logger.info("Поднимаем %s процессов-сборщиков", self.workers_config.inventory_workers)
+            self.process_backend.start(self.workers_config.inventory_workers)
         
-        for i in range(self.workers_config.inventory_workers):
+        for _ in range(self.workers_config.inventory_workers):
+            self._spawn_worker()
+        
+        if self.workers_config.autoscale:
+            self.logger.info(
+                "Автомасштабирование: от %s до %s воркеров, опрос раз в %s с",
+                self.workers_config.min_workers, self.workers_config.max_workers,
+                self.workers_config.scale_interval
+            )
+            self._scaler = threading.Thread(target=self._scale_loop, name="Autoscaler", daemon=True)
+            self._scaler.start()
+        
+        if self.workers_config.task_timeout > 0:
+            self._watchdog = threading.Thread(target=self._watchdog_loop, name="Watchdog", daemon=True)
+            self._watchdog.start()
+    
+    def _spawn_worker(self):
+        """Поднимаем ещё одного воркера"""
+        with self._workers_lock:
+            self._worker_seq += 1
             worker = threading.Thread(
                 target=self._inventory_worker_loop,
-                name=f"Worker-{i+1}",
+                name=f"Worker-{self._worker_seq}",
                 daemon=True
             )
-            worker.start()
             self.inventory_workers.append(worker)
+            self.peak_workers = max(self.peak_workers, len(self.inventory_workers))
+        worker.start()
     
     def _inventory_worker_loop(self):
-        """Воркер крутится в цикле и ждёт задачи"""
-        while self.is_running.is_set():
-            try:
-                task_data = self.task_queue.get(timeout=QUEUE_GET_TIMEOUT)
-                self.logger.info(f"Воркер {threading.current_thread().name} взял задачу")
-                
-                # Валидация - только белый список!
-                if self.validate_command(task_data.get('command', '')):
-                    if task_data['command'] == 'inventory':
-                        self.inventory_service.execute_task(task_data)
-                    else:
-                        self.logger.warning(f"Хм, команда {task_data['command']} не реализована")
-                else:
-                    self.logger.warning(f"Блокируем нелегитимную команду: {task_data.get('command')}")
-                
+        """Воркер спит на очереди без таймаута и просыпается только от задачи или маркера остановки"""
+        name = threading.current_thread().name
+        
+        while True:
+            task_data = self.task_queue.get()
+            if task_data is _SHUTDOWN:
+                self.task_queue.task_done()
+                return
+            if task_data is _RETIRE:
+                with self._workers_lock:
+                    self._retiring -= 1
+                    if threading.current_thread() in self.inventory_workers:
+                        self.inventory_workers.remove(threading.current_thread())
+                self.task_queue.task_done()
+                return
+            
+            with self._futures_lock:
+                future = self._futures.pop(task_data.get('id'), None)
+            if future is not None and not future.set_running_or_notify_cancel():
+                # Вызывающий уже отменил задачу
+                self._count('cancelled')
+                self.task_queue.task_done()
+                continue
+            
+            deadline = task_data.get('deadline')
+            if deadline is not None and time.time() > deadline:
+                # Результат уже никому не нужен - не тратим на него сбор
+                self.task_queue.record_expired(task_data)
+                self._count('expired')
+                self.logger.warning("Задача %s просрочена в очереди, пропускаем", task_data.get('id'))
+                if future is not None:
+                    future.set_exception(TimeoutError(f"Срок задачи {task_data.get('id')} истёк в очереди"))
                 self.task_queue.task_done()
-                
-            except queue.Empty:
-                # Нет задач - идём дальше
                 continue
+            
+            token = CancellationToken(self.workers_config.task_timeout or None)
+            with self._in_flight_lock:
+                self._in_flight[name] = task_data
+                self._running[name] = _RunningTask(task_data, future, token, threading.current_thread())
+            started = time.monotonic()
+            task_data['started_at'] = datetime.now().isoformat()
+            record = None
+            error: Optional[BaseException] = None
+            try:
+                self.logger.info("Воркер %s взял задачу", name)
+                with bind(token), self.profiler.task() if self.profiler else contextlib.nullcontext():
+                    record = self._run_task(task_data, future)
+            except TaskCancelled:
+                error = TimeoutError(f"Задача {task_data.get('id')} отменена: {token.reason}")
             except Exception as e:
-                self.logger.error(f"Ошибка в воркере: {e}")
+                error = e
+                self.logger.error("Ошибка в воркере: %s", e)
+            
+            elapsed = time.monotonic() - started
+            with self._in_flight_lock:
+                self._in_flight.pop(name, None)
+                running = self._running.pop(name, None)
+                abandoned = running is None or running.abandoned
+                if not abandoned:
+                    self._latency_avg += LATENCY_EWMA_ALPHA * (elapsed - self._latency_avg)
+            self.collect_stats.record(elapsed, failed=error is not None or abandoned)
+            
+            if abandoned:
+                # Сторож уже выдал отказ, закрыл задачу в очереди и поднял замену
+                self.logger.warning("Воркер %s вернулся через %.1f с после таймаута и завершается", name, elapsed)
+                return
+            
+            if isinstance(error, CallAbandoned):
+                # Дубликат зависшего сбора - такой же таймаут, как у лидера, и со своей записью
+                self._timed_out(task_data, str(error))
+            elif error is not None:
+                self._count('error')
+            elif record is not _HANDED_OFF:
+                # В конвейере успех засчитает стадия persist
+                self._count('success')
+            if future is not None:
+                if error is not None:
+                    future.set_exception(error)
+                elif record is not _HANDED_OFF:
+                    future.set_result(record)
+            self.task_queue.task_done()
+    
+    def _watchdog_loop(self):
+        """Следим за дедлайнами выполняющихся задач"""
+        interval = min(WATCHDOG_INTERVAL, self.workers_config.task_timeout / 4)
+        while not self._watchdog_stop.wait(interval):
+            now = time.monotonic()
+            expired = []
+            with self._in_flight_lock:
+                for name, running in list(self._running.items()):
+                    deadline = running.token.deadline
+                    # Задача, уже публикующая результат, не отменяется - она вот-вот закончится
+                    if deadline is not None and now >= deadline and running.token.cancel('timeout'):
+                        running.abandoned = True
+                        del self._running[name]
+                        self._in_flight.pop(name, None)
+                        expired.append(running)
+            for running in expired:
+                self._on_task_timeout(running)
+    
+    def _on_task_timeout(self, running: _RunningTask):
+        """Задача зависла: отменяем, отдаём отказ и ставим вместо воркера нового"""
+        task_id = running.task_data.get('id')
+        # Дубликаты не должны висеть на зависшем сборе
+        self.single_flight.abandon(running.task_data.get('command'),
+                                   CallAbandoned(f"Сбор для задачи {task_id} завис"))
+        self.logger.error("⏱️ Задача %s не уложилась в %s с, воркер %s заменён",
+                          task_id, self.workers_config.task_timeout, running.thread.name)
+        
+        self._timed_out(running.task_data, f"Превышен таймаут {self.workers_config.task_timeout} с")
+        if running.future is not None and not running.future.done():
+            running.future.set_exception(TimeoutError(f"Задача {task_id} превысила таймаут"))
+        
+        with self._workers_lock:
+            if running.thread in self.inventory_workers:
+                self.inventory_workers.remove(running.thread)
+        self.workers_replaced += 1
+        # При остановке замена заберёт маркер, предназначенный зависшему
+        self._spawn_worker()
+        self.task_queue.task_done()
+    
+    def _timed_out(self, task_data: Dict[str, Any], error: str):
+        """Считаем таймаут и публикуем запись-отказ"""
+        with self._status_lock:
+            self.tasks_timed_out += 1
+        self._count('timeout')
+        self.inventory_service.publish_failure(task_data, 'timeout', error)
+    
+    def _scale_loop(self):
+        """Раз в scale_interval смотрим на очередь и решаем, менять ли размер пула"""
+        idle_ticks = 0
+        while not self._scaler_stop.wait(self.workers_config.scale_interval):
+            depth = self.task_queue.qsize()
+            with self._in_flight_lock:
+                busy = len(self._in_flight)
+                latency = self._latency_avg
+            with self._workers_lock:
+                workers = len(self.inventory_workers) - self._retiring
+            
+            # За сколько текущий пул разгребёт очередь при нынешнем времени задачи
+            drain_time = depth * latency / max(1, workers)
+            if depth and drain_time > self.workers_config.scale_interval and workers < self.workers_config.max_workers:
+                idle_ticks = 0
+                wanted = math.ceil(depth * latency / self.workers_config.scale_interval)
+                add = max(1, min(wanted, self.workers_config.max_workers) - workers)
+                self._scale(workers, workers + add, depth, latency)
+            elif depth == 0 and busy < workers and workers > self.workers_config.min_workers:
+                idle_ticks += 1
+                if idle_ticks >= SCALE_DOWN_IDLE_TICKS:
+                    idle_ticks = 0
+                    self._scale(workers, workers - 1, depth, latency)
+            else:
+                idle_ticks = 0
+    
+    def _scale(self, current: int, target: int, depth: int, latency: float):
+        """Меняем размер пула и записываем решение"""
+        self.last_scale_decision = (
+            f"{current} -> {target} (очередь {depth}, задача {latency * 1000:.1f} мс)"
+        )
+        self.logger.info("⚖️ Пул воркеров: %s", self.last_scale_decision)
+        
+        if target > current:
+            self.scale_ups += 1
+            if self.process_backend is not None:
+                self.process_backend.start(target - current)
+            for _ in range(target - current):
+                self._spawn_worker()
+        else:
+            self.scale_downs += 1
+            for _ in range(current - target):
+                with self._workers_lock:
+                    self._retiring += 1
+                try:
+                    self.task_queue.put_nowait(_RETIRE)
+                except queue.Full:
+                    with self._workers_lock:
+                        self._retiring -= 1
+                    return
+                if self.process_backend is not None:
+                    self.process_backend.shrink(1)
+    
+    def _run_task(self, task_data: Dict[str, Any], future: Optional[Future] = None) -> Any:
+        """Выполняем одну задачу и возвращаем запись результата (или _HANDED_OFF для конвейера)"""
+        # Валидация - только белый список!
+        if self.validate_command(task_data.get('command', '')):
+            if task_data['command'] == 'inventory':
+                os_info, shared = self.single_flight.do(task_data['command'], self._collect)
+                # Пока собирали, задачу могли отменить - тогда результат уже не публикуем
+                check_cancelled()
+                if self.pipeline is not None:
+                    # На забитой стадии serialize воркер ждёт - обратное давление до очереди задач
+                    # Токен едет с элементом: стадии выкинут задачу, за которую сторож уже отчитался
+                    self.pipeline.submit({'task': task_data, 'os_info': os_info, 'coalesced': shared,
+                                          'future': future, 'token': current_token()})
+                    return _HANDED_OFF
+                return self.inventory_service.execute_task(task_data, os_info=os_info, coalesced=shared)
+            else:
+                self.logger.warning("Хм, команда %s не реализована", task_data['command'])
+        else:
+            self.logger.warning("Блокируем нелегитимную команду: %s", task_data.get('command'))
+        return None
+    
+    def _serialize_stage(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Запись результата, диагностика и json.dumps payload"""
+        if item['token'] is not None and item['token'].cancelled:
+            item['result'] = item['payload'] = None
+            return item
+        item['result'], item['payload'] = self.inventory_service.prepare_task(
+            item['task'], item['os_info'], item['coalesced']
+        )
+        return item
+    
+    def _persist_stage(self, item: Dict[str, Any]):
+        """Публикация результата и запись payload на диск"""
+        if item['token'] is not None and not item['token'].finish():
+            self.logger.warning("Задача %s уже отменена сторожем, результат не публикуем",
+                                item['task'].get('id'))
+            return
+        self.inventory_service.persist_task(item['result'], item['payload'])
+        self._count('success')
+        if item['future'] is not None and not item['future'].done():
+            item['future'].set_result(item['result'])
+    
+    def _stage_failed(self, item: Dict[str, Any], error: BaseException):
+        self._count('error')
+        if item['future'] is not None and not item['future'].done():
+            item['future'].set_exception(error)
     
     def validate_command(self, command: str) -> bool:
         """Проверяем команду по белому списку"""
-        # Оставляем только буквы - защита от инъекций
-        command = ''.join(c for c in command if c.isalpha())
-        return command in ALLOWED_COMMANDS
+        return is_allowed_command(command)
+    
+    def join(self):
+        """Ждём, пока очередь опустеет и все задачи пройдут все стадии"""
+        self.task_queue.join()
+        if self.pipeline is not None:
+            self.pipeline.join()
+    
+    def add_task(self, command: str, timeout: Optional[float] = None,
+                 priority: str = DEFAULT_PRIORITY, ttl: Optional[float] = None) -> bool:
+        """
+        Добавляем задачу в очередь по политике допуска из конфига.
+        timeout - для политики block: сколько ждать места (None - AdmissionTimeout из конфига)
+        priority - high/normal/low; ttl - сколько секунд задача может ждать в очереди
+        (None - TaskTTL из конфига)
+        """
+        return self._enqueue(command, timeout, priority=priority, ttl=ttl) is not None
+    
+    def submit(self, command: str, timeout: Optional[float] = None,
+               priority: str = DEFAULT_PRIORITY, ttl: Optional[float] = None) -> Future:
+        """
+        Ставим задачу и сразу получаем Future.
+        Результат Future - запись результата (task_id, enqueued_at/started_at/finished_at, data).
+        Если задачу не приняли, Future уже содержит исключение.
+        """
+        future: Future = Future()
+        if not self.validate_command(command):
+            self.logger.warning("Попытка добавить запрещённую команду: %s", command)
+            future.set_exception(ValueError(f"Команда {command!r} не из белого списка"))
+            return future
+        if priority not in PRIORITIES:
+            future.set_exception(ValueError(f"Неизвестный приоритет {priority!r}"))
+            return future
+        task_id = self._enqueue(command, timeout, future, priority, ttl)
+        if task_id is None and not future.done():
+            future.set_exception(RuntimeError(f"Задача {command!r} не принята в очередь"))
+        return future
+    
+    def map(self, commands: Iterable[str], timeout: Optional[float] = None,
+            priority: str = DEFAULT_PRIORITY) -> Iterator[Optional[Dict[str, Any]]]:
+        """
+        Ставим пачку задач и отдаём результаты в порядке команд.
+        timeout - общий дедлайн ожидания результатов (как у Executor.map).
+        """
+        futures = [self.submit(command, priority=priority) for command in commands]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        
+        def results():
+            try:
+                for future in futures:
+                    yield future.result(self._remaining(deadline))
+            finally:
+                for future in futures:
+                    future.cancel()
+        
+        return results()
     
-    def add_task(self, command: str) -> bool:
-        """Добавляем задачу в очередь"""
+    def _enqueue(self, command: str, timeout: Optional[float],
+                 future: Optional[Future] = None, priority: str = DEFAULT_PRIORITY,
+                 ttl: Optional[float] = None) -> Optional[str]:
+        """Ставим задачу в очередь; возвращаем её id или None, если не приняли"""
         if not self.validate_command(command):
-            self.logger.warning(f"Попытка добавить запрещённую команду: {command}")
-            return False
+            self.logger.warning("Попытка добавить запрещённую команду: %s", command)
+            return None
+        if priority not in PRIORITIES:
+            self.logger.warning("Неизвестный приоритет %s, задача отклонена", priority)
+            return None
         
+        if ttl is None:
+            ttl = self.workers_config.task_ttl or None
         task = Task(
             command=command,
             timestamp=datetime.now().isoformat(),
-            id=f"{int(time.time())}_{threading.get_ident()}"
+            id=next_task_id(),
+            priority=priority,
+            deadline=time.time() + ttl if ttl else None
         )
         
-        try:
-            self.task_queue.put(task.to_dict(), timeout=QUEUE_GET_TIMEOUT)
-            self.logger.info(f"Задача {command} добавлена в очередь. В очереди: {self.task_queue.qsize()}")
-            return True
-        except queue.Full:
-            self.logger.error("Очередь задач переполнена! Задача отклонена.")
-            return False
-    
-    def shutdown(self):
-        """Корректно завершаем работу"""
-        self.logger.info("Останавливаем диспетчер...")
+        # Future регистрируем до put - воркер может взять задачу мгновенно
+        if future is not None:
+            with self._futures_lock:
+                self._futures[task.id] = future
+        
+        if self.admission.admit(task.to_dict(), timeout):
+            self.collect_stats.observe_depth(self.task_queue.qsize())
+            self.logger.info("Задача %s добавлена в очередь. В очереди: %s", command, self.task_queue.qsize)
+            return task.id
+        
+        if future is not None:
+            with self._futures_lock:
+                self._futures.pop(task.id, None)
+        self._count('rejected')
+        self.logger.error("Очередь задач переполнена! Задача отклонена (%s).", self.admission.policy)
+        return None
+    
+    def _on_shed(self, task_data: Dict[str, Any]):
+        """Задачу выкинули из очереди ради новой (drop_oldest)"""
+        self.logger.warning("Очередь полна, выкинули задачу %s", task_data.get('id'))
+        self._count('shed')
+        with self._futures_lock:
+            future = self._futures.pop(task_data.get('id'), None)
+        if future is not None:
+            future.cancel()
+    
+    def shutdown(self, mode: str = SHUTDOWN_DRAIN,
+                 timeout: Optional[float] = SHUTDOWN_TIMEOUT) -> Dict[str, Any]:
+        """
+        Корректно завершаем работу.
+        drain - доделываем всё, что уже в очереди; cancel - выкидываем очередь,
+        ждём только задачи, которые уже выполняются.
+        timeout - общий дедлайн остановки (None - ждём сколько нужно).
+        Возвращаем отчёт о недоделанных задачах.
+        """
+        self.logger.info("Останавливаем диспетчер (%s)...", mode)
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
         self.is_running.clear()
         
-        for worker in self.inventory_workers:
-            worker.join(timeout=5)
+        # Сначала останавливаем масштабирование, чтобы пул не менялся под ногами
+        self._scaler_stop.set()
+        if self._scaler is not None:
+            self._scaler.join(timeout=self._remaining(deadline))
+        
+        cancelled = []
+        if mode == SHUTDOWN_CANCEL:
+            cancelled.extend(self._drop_queued())
+        
+        with self._workers_lock:
+            workers = list(self.inventory_workers)
+        
+        # По маркеру на воркера: в режиме drain они встают в очередь после всех задач
+        for _ in workers:
+            try:
+                self.task_queue.put(_SHUTDOWN, timeout=self._remaining(deadline))
+            except queue.Full:
+                # Не успели дождаться места - остаток очереди уже не выполнить
+                cancelled.extend(self._drop_queued())
+                self.task_queue.put(_SHUTDOWN)
+        
+        for worker in workers:
+            # Брошенных сторожем не ждём - они вернутся, когда отвиснут
+            if worker in self.inventory_workers:
+                worker.join(timeout=self._remaining(deadline))
+        
+        self._watchdog_stop.set()
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=self._remaining(deadline))
+        
+        with self._in_flight_lock:
+            in_flight = [task.get('id') for task in self._in_flight.values()]
+        alive = [worker.name for worker in workers if worker.is_alive()]
+        with self._workers_lock:
+            self.inventory_workers = [worker for worker in self.inventory_workers if worker.is_alive()]
+        
+        report = {
+            'mode': mode,
+            'cancelled': cancelled,
+            'in_flight': in_flight,
+            'workers_alive': alive,
+            'timed_out': self.tasks_timed_out,
+            'elapsed': round(time.monotonic() - started, 4),
+        }
+        if cancelled or in_flight:
+            self.logger.warning("Не выполнено задач: в очереди %s, в работе %s", len(cancelled), len(in_flight))
+        
+        # Собранное воркерами дописываем через стадии до конца
+        if self.pipeline is not None:
+            self.pipeline.stop(timeout=self._remaining(deadline))
+        
+        if self.process_backend is not None:
+            self.process_backend.close()
+        
+        # Воркеры остановлены - дописываем хвост результатов и payload
+        self.result_sink.stop()
+        self.inventory_service.close()
+        self.logger.info("Статистика результатов: %s", self.get_stats)
         
         self.logger.info("Диспетчер остановлен")
+        log_stats = self.logger.stats()
+        if log_stats:
+            self.logger.info("Статистика логов: %s", log_stats)
+        # Гарантируем, что всё залогированное до остановки уже на диске
+        self.logger.flush()
+        
+        return report
+    
+    @staticmethod
+    def _remaining(deadline: Optional[float]) -> Optional[float]:
+        """Сколько осталось до дедлайна (None - без ограничения)"""
+        if deadline is None:
+            return None
+        return max(0.0, deadline - time.monotonic())
+    
+    def _drop_queued(self) -> List[str]:
+        """Выкидываем всё, что ещё ждёт в очереди, и возвращаем id выкинутых задач"""
+        dropped = []
+        while True:
+            try:
+                task_data = self.task_queue.get_nowait()
+            except queue.Empty:
+                return dropped
+            if task_data is _RETIRE:
+                with self._workers_lock:
+                    self._retiring -= 1
+            elif task_data is not _SHUTDOWN:
+                dropped.append(task_data.get('id'))
+                self._count('cancelled')
+                with self._futures_lock:
+                    future = self._futures.pop(task_data.get('id'), None)
+                if future is not None:
+                    future.cancel()
+            self.task_queue.task_done()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Пропускная способность выгрузки и простой воркеров на очереди результатов"""
+        stats = self.result_sink.stats()
+        stats['queue_blocked_time'] = round(self.inventory_service.queue_blocked_time, 4)
+        stats['results_dropped'] = self.inventory_service.results_dropped
+        stats['coalescing'] = self.single_flight.stats()
+        stats['scaling'] = self.scaling_stats()
+        stats['queue_wait'] = self.task_queue.stats()
+        stats['admission'] = self.admission.stats()
+        stats['stages'] = self.stage_stats()
+        stats['timeouts'] = {'timed_out': self.tasks_timed_out, 'workers_replaced': self.workers_replaced}
+        if self.process_backend is not None:
+            stats['timeouts']['processes_killed'] = self.process_backend.processes_killed
+        with self._status_lock:
+            stats['tasks'] = dict(self._status_counts)
+        if self.inventory_service.payload_writer is not None:
+            stats['payload'] = self.inventory_service.payload_writer.stats()
+        if self.inventory_service.warm_cache is not None:
+            stats['warm_cache'] = self.inventory_service.warm_cache.stats()
+        return stats
+    
+    def scaling_stats(self) -> Dict[str, Any]:
+        """Размер пула и решения автомасштабирования"""
+        with self._workers_lock:
+            workers = len(self.inventory_workers)
+        return {
+            'autoscale': self.workers_config.autoscale,
+            'workers': workers,
+            'min_workers': self.workers_config.min_workers,
+            'max_workers': self.workers_config.max_workers,
+            'peak_workers': self.peak_workers,
+            'scale_ups': self.scale_ups,
+            'scale_downs': self.scale_downs,
+            'task_latency_avg': round(self._latency_avg, 4),
+            'last_decision': self.last_scale_decision,
+        }
+    
+    def stage_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Задержка и глубина очереди по стадиям: collect и, если включён конвейер, остальные"""
+        with self._workers_lock:
+            workers = len(self.inventory_workers)
+        stages = {'collect': self.collect_stats.snapshot(self.task_queue.qsize(), workers)}
+        if self.pipeline is not None:
+            stages.update(self.pipeline.stats())
+        return stages
@@ -0,0 +1,115 @@
+"""Минимальная обёртка над inotify через ctypes - без сторонних зависимостей"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+from typing import List, NamedTuple, Optional
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# struct inotify_event { int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[]; }
+_EVENT_HEADER = struct.Struct('iIII')
+_READ_SIZE = 64 * 1024
+
+
+class InotifyEvent(NamedTuple):
+    wd: int
+    mask: int
+    cookie: int
+    name: str
+
+
+class Inotify:
+    """
+    inotify-дескриптор плюс pipe для пробуждения:
+    read_events() спит в select без таймаута, пока не придёт событие или wake()
+    """
+
+    def __init__(self):
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotify есть только в Linux")
+
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._libc = libc
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+
+    def add_watch(self, path: str, mask: int) -> int:
+        """Подписываемся на события пути, возвращаем watch descriptor"""
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), ctypes.c_uint32(mask))
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), path)
+        return wd
+
+    def read_events(self, timeout: Optional[float] = None) -> List[InotifyEvent]:
+        """
+        Ждём события. Пустой список - истёк timeout или нас разбудили через wake().
+        timeout=None - ждём без ограничения, процесс при этом не просыпается вообще.
+        """
+        ready, _, _ = select.select([self._fd, self._wake_r], [], [], timeout)
+        if self._wake_r in ready:
+            try:
+                os.read(self._wake_r, 1024)
+            except BlockingIOError:
+                pass
+        if self._fd not in ready:
+            return []
+
+        try:
+            data = os.read(self._fd, _READ_SIZE)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'replace')
+            offset += length
+            events.append(InotifyEvent(wd, mask, cookie, name))
+        return events
+
+    def wake(self):
+        """Будим поток, который спит в read_events()"""
+        try:
+            os.write(self._wake_w, b'\0')
+        except OSError:
+            pass
+
+    def close(self):
+        for fd in (self._fd, self._wake_r, self._wake_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def inotify_available() -> bool:
+    """Можно ли пользоваться inotify в этой системе"""
+    try:
+        Inotify().close()
+        return True
+    except (OSError, AttributeError):
+        return False
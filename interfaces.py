@@ -1,11 +1,33 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+import dataclasses
+from typing import Callable, Dict, Any, List, Optional, Tuple
+import logging
+import queue
 import threading
+import time
+from datetime import datetime
 
-from datacls_models import InventoryResult, LogConfig
+from datacls_models import InventoryResult, LogConfig, TaskResult
+from metrics import REGISTRY
+
+LOG_LEVELS = {
+    'debug': logging.DEBUG,
+    'info': logging.INFO,
+    'warning': logging.WARNING,
+    'error': logging.ERROR
+}
 
 class BaseLogService(ABC):
-    """Базовый класс для логирования - синглтон"""
+    """
+    Базовый класс для логирования - синглтон.
+    Сообщения форматируются лениво: logger.info("Воркер %s", name) собирает строку,
+    только если уровень включён. Аргумент-callable (или само сообщение-callable)
+    вызывается тоже только при включённом уровне - для дорогих вычислений.
+    """
+    
+    logger: logging.Logger
+    # Фоновый писатель, если включён async_mode
+    async_handler = None
     
     _instance = None
     _lock = threading.Lock()
@@ -27,41 +49,260 @@ class BaseLogService(ABC):
     
     @abstractmethod
     def _setup_logging(self):
-        """Тут каждая ОС настраивает логирование по-своему"""
+        """Тут каждая ОС настраивает логирование по-своему (и заводит self.logger)"""
         pass
     
-    @abstractmethod
-    def debug(self, msg: str):
-        pass
+    def _install_handlers(self, log_file, log_level: int):
+        """Общая для ОС часть: файл плюс консоль - синхронно или через один фоновый писатель"""
+        if self.config.async_mode:
+            from async_log_handler import AsyncLogHandler
+            
+            # Один фоновый писатель вместо FileHandler + StreamHandler в каждом воркере
+            self.async_handler = AsyncLogHandler(
+                log_file,
+                queue_size=self.config.queue_size,
+                batch_size=self.config.batch_size,
+                flush_interval=self.config.flush_interval,
+                max_bytes=self.config.max_bytes,
+                rotate_interval=self.config.rotate_interval,
+                backup_count=self.config.backup_count
+            )
+            handlers = [self.async_handler]
+        else:
+            handlers = [
+                logging.FileHandler(log_file, encoding='utf-8', mode='a'),
+                logging.StreamHandler()
+            ]
+        
+        logging.basicConfig(
+            level=log_level,
+            format='%(asctime)s.%(msecs)03d [%(levelname)s] %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S',
+            handlers=handlers
+        )
     
-    @abstractmethod
-    def info(self, msg: str):
-        pass
+    def is_enabled(self, level: str) -> bool:
+        """Пишется ли вообще этот уровень - чтобы не готовить данные для лога зря"""
+        return self.logger.isEnabledFor(LOG_LEVELS.get(level, logging.INFO))
     
-    @abstractmethod
-    def warning(self, msg: str):
-        pass
+    def _log(self, level: int, msg, args: tuple):
+        if not self.logger.isEnabledFor(level):
+            return
+        if callable(msg):
+            msg = msg()
+        if args:
+            args = tuple(arg() if callable(arg) else arg for arg in args)
+        self.logger.log(level, msg, *args)
     
-    @abstractmethod
-    def error(self, msg: str):
-        pass
+    def debug(self, msg, *args):
+        self._log(logging.DEBUG, msg, args)
+    
+    def info(self, msg, *args):
+        self._log(logging.INFO, msg, args)
+    
+    def warning(self, msg, *args):
+        self._log(logging.WARNING, msg, args)
+    
+    def error(self, msg, *args):
+        self._log(logging.ERROR, msg, args)
+    
+    def flush(self):
+        """Дожидаемся записи всех накопленных сообщений"""
+        if self.async_handler is not None:
+            self.async_handler.flush()
+    
+    def stats(self) -> Dict[str, int]:
+        """Счётчики очереди логов (если запись асинхронная)"""
+        if self.async_handler is not None:
+            return self.async_handler.stats()
+        return {}
+
+
+PROBE_SECONDS = REGISTRY.histogram('collector_probe_seconds', 'Время отдельных проб сборщика')
 
 
 class BaseInventoryService(ABC):
     """Базовый класс для сбора информации об ОС"""
     
+    # Значение поля os в записи результата
+    OS_NAME = ''
+    # Класс результата - из него собираем запись тёплого кэша
+    RESULT_CLASS = InventoryResult
+    
     def __init__(self, logger: BaseLogService):
         self.logger = logger
         self.result_queue = None
+        # Единственный писатель payload-файла (заводят наследники)
+        self.payload_writer = None
+        # Тёплый кэш на диске между запусками (заводят наследники, если задан cache_file)
+        self.warm_cache = None
+        
+        # Сколько воркеры простояли на заполненной очереди результатов
+        self.queue_blocked_time = 0.0
+        self.results_published = 0
+        self.results_dropped = 0
+        self._stats_lock = threading.Lock()
     
     @abstractmethod
     def collect_os_info(self) -> InventoryResult:
         """Тут каждая ОС собирает информацию по-своему"""
         pass
     
+    async def collect_os_info_async(self) -> InventoryResult:
+        """
+        Асинхронный сбор. По умолчанию - прокладка: синхронный сбор в пуле потоков,
+        наследники переопределяют, чтобы не блокировать event loop на подпроцессах
+        """
+        import asyncio
+        
+        return await asyncio.to_thread(self.collect_os_info)
+    
+    @abstractmethod
+    def execute_task(self, task_data: Dict[str, Any], os_info: Optional[InventoryResult] = None,
+                     coalesced: bool = False) -> Dict[str, Any]:
+        """
+        Выполнение задачи инвентаризации.
+        Если os_info уже собран (склеенные дубликаты) - сбор пропускаем,
+        coalesced=True значит результат общий и payload уже сохранён.
+        Возвращает запись результата (та же уходит в result_queue).
+        """
+        pass
+    
+    @staticmethod
+    def _make_result(task_data: Dict[str, Any], os_info: InventoryResult, os_name: str,
+                     coalesced: bool) -> Dict[str, Any]:
+        """Запись результата с id задачи и временем постановки, начала и конца"""
+        now = datetime.now().isoformat()
+        return TaskResult(
+            status='success',
+            data=os_info.to_dict(),
+            timestamp=now,
+            os=os_name,
+            task_id=task_data.get('id', ''),
+            enqueued_at=task_data.get('enqueued_at', ''),
+            started_at=task_data.get('started_at', ''),
+            finished_at=now,
+            coalesced=coalesced
+        ).to_dict()
+    
+    def _source_fingerprints(self) -> Any:
+        """Отпечатки источников результата для тёплого кэша; None - кэш не используем"""
+        return None
+    
+    def watched_paths(self) -> List[str]:
+        """Файлы, изменение которых меняет результат (для --watch); пусто - только пересбор по таймеру"""
+        return []
+    
+    def _warm_lookup(self) -> Tuple[Any, Optional[InventoryResult]]:
+        """(отпечатки, результат из кэша или None)"""
+        if self.warm_cache is None:
+            return None, None
+        fingerprints = self._source_fingerprints()
+        if fingerprints is None:
+            return None, None
+        return fingerprints, self.warm_cache.lookup(self.OS_NAME, fingerprints,
+                                                    lambda data: self.RESULT_CLASS(**data))
+    
+    def _warm_store(self, fingerprints: Any, result: InventoryResult):
+        """Отпечатки сняты до сбора: если источник поменялся во время сбора, следующий запуск промахнётся"""
+        if self.warm_cache is not None and fingerprints is not None:
+            self.warm_cache.store(self.OS_NAME, fingerprints, dataclasses.asdict(result))
+    
+    def collect_fresh(self) -> InventoryResult:
+        """Сбор мимо тёплого кэша; свежий результат заменит запись в нём"""
+        if self.warm_cache is not None:
+            self.warm_cache.forget()
+        return self.collect_os_info()
+    
+    def collect_with(self, collect: Callable[[], InventoryResult]) -> InventoryResult:
+        """Сбор чужими руками (прогретым процессом) через тёплый кэш этого сервиса"""
+        fingerprints, cached = self._warm_lookup()
+        if cached is not None:
+            return cached
+        result = collect()
+        self._warm_store(fingerprints, result)
+        return result
+    
+    def _probe(self, name: str):
+        """Замер одной пробы: with self._probe('kernel'): ..."""
+        return PROBE_SECONDS.time(os=self.OS_NAME, probe=name)
+    
+    def prepare_task(self, task_data: Dict[str, Any], os_info: InventoryResult,
+                     coalesced: bool = False) -> Tuple[Dict[str, Any], Any]:
+        """
+        Стадия serialize конвейера: запись результата и сериализованный payload.
+        Для склеенного дубликата payload не нужен - его сохранила задача-лидер.
+        """
+        result = self._make_result(task_data, os_info, self.OS_NAME, coalesced)
+        payload = None
+        if not coalesced and self.payload_writer is not None:
+            payload = self.payload_writer.encode(self._build_payload(os_info))
+        return result, payload
+    
+    def persist_task(self, result: Dict[str, Any], payload: Any = None):
+        """Стадия persist конвейера: публикуем результат и пишем payload на диск"""
+        if self.result_queue is not None and not self._publish_result(result):
+            self.logger.error("Очередь забита!")
+        if payload is not None:
+            self.payload_writer.write_encoded(payload)
+    
+    def publish_failure(self, task_data: Dict[str, Any], status: str, error: str) -> Dict[str, Any]:
+        """Запись-отказ для задачи, которая не выполнилась (таймаут и т.п.)"""
+        now = datetime.now().isoformat()
+        result = TaskResult(
+            status=status,
+            data={'error': error},
+            timestamp=now,
+            os=self.OS_NAME,
+            task_id=task_data.get('id', ''),
+            enqueued_at=task_data.get('enqueued_at', ''),
+            started_at=task_data.get('started_at', ''),
+            finished_at=now
+        ).to_dict()
+        self._publish_result(result)
+        return result
+    
+    def _build_payload(self, os_info: InventoryResult) -> Dict[str, Any]:
+        """Содержимое payload-файла; наследники добавляют диагностику"""
+        return os_info.to_dict()
+    
+    def close(self):
+        """Дописываем payload и останавливаем писателя"""
+        if self.payload_writer is not None:
+            self.payload_writer.close()
+    
+    def _publish_result(self, result: Dict[str, Any]) -> bool:
+        """Кладём результат в очередь и считаем, сколько на ней простояли"""
+        if self.result_queue is None:
+            return False
+        
+        started = time.monotonic()
+        try:
+            self.result_queue.put(result, timeout=1)
+            published = True
+        except queue.Full:
+            published = False
+        
+        with self._stats_lock:
+            self.queue_blocked_time += time.monotonic() - started
+            if published:
+                self.results_published += 1
+            else:
+                self.results_dropped += 1
+        
+        return published
+
+
+class BaseResultSink(ABC):
+    """Куда складываем результаты задач"""
+    
     @abstractmethod
-    def execute_task(self, task_data: Dict[str, Any]):
-        """Выполнение задачи инвентаризации"""
+    def write_batch(self, records: List[Dict[str, Any]]):
+        """Записываем пачку результатов"""
+        pass
+    
+    def close(self):
+        """Освобождаем ресурсы, если они есть"""
         pass
 
 
@@ -79,11 +320,16 @@ class DispatcherInterface(ABC):
         pass
     
     @abstractmethod
-    def add_task(self, command: str) -> bool:
+    def add_task(self, command: str, timeout: Optional[float] = None) -> bool:
         """Добавляем задачу в очередь"""
         pass
     
     @abstractmethod
-    def shutdown(self):
-        """Корректно завершаем работу"""
+    def join(self):
+        """Ждём выполнения всех поставленных задач"""
+        pass
+    
+    @abstractmethod
+    def shutdown(self, mode: str = 'drain', timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Корректно завершаем работу: drain - доделать очередь, cancel - выкинуть её"""
         pass
@@ -4,27 +4,55 @@
 """
 import os
 import platform
-import subprocess
 import re
-import json
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from datetime import datetime
-import queue
 import sys
-import pwd
-import grp
-import shutil
 
 from interfaces import BaseInventoryService, BaseLogService
-from datacls_models import LinuxInventoryResult
+from datacls_models import InventoryConfig, InventoryResult, LinuxInventoryResult
+from probe_cache import ProbeCache
+from warm_cache import WarmCache
+from payload_writer import PayloadWriter
+from cancellation import check_cancelled, effective_timeout, finish_task
 
 SUBPROCESS_TIMEOUT = 3
+PROC_VERSION_PATH = "/proc/version"
+
+
+def _parse_key_value(content: str) -> Dict[str, str]:
+    """Разбор файлов формата KEY=value (os-release, lsb-release)"""
+    result = {}
+    for line in content.splitlines():
+        line = line.strip()
+        if line and '=' in line and not line.startswith('#'):
+            key, value = line.split('=', 1)
+            result[key] = value.strip('"\'')
+    return result
+
+
+def _parse_version_number(content: str) -> Dict[str, str]:
+    """Текст релиза целиком + первая похожая на версию подстрока"""
+    content = content.strip()
+    result = {'PRETTY_NAME': content}
+    version_match = re.search(r'(\d+\.?\d*)', content)
+    if version_match:
+        result['VERSION_ID'] = version_match.group(1)
+    return result
+
+
+def _parse_proc_version(content: str) -> str:
+    """Версия ядра из /proc/version"""
+    version_match = re.search(r'version\s+([^\s]+)', content.strip())
+    return version_match.group(1) if version_match else ""
 
 
 class LinuxInventoryService(BaseInventoryService):
     """Сбор информации о Linux с проверкой прав доступа к файлам"""
     
+    OS_NAME = 'linux'
+    RESULT_CLASS = LinuxInventoryResult
     OS_RELEASE_PATH = "/etc/os-release"
     DEBIAN_VERSION_PATH = "/etc/debian_version"
     ASTRA_RELEASE_PATH = "/etc/astra-release"
@@ -32,55 +60,103 @@ class LinuxInventoryService(BaseInventoryService):
     REDOS_RELEASE_PATH = "/etc/redos-release"
     LSB_RELEASE_PATH = "/etc/lsb-release"
     
-    def __init__(self, logger: BaseLogService):
+    def __init__(self, logger: BaseLogService, config: Optional[InventoryConfig] = None):
         super().__init__(logger)
         
+        # Быстрый режим: ядро из os.uname(), без uname/platform и без fork
+        self.config = config or InventoryConfig()
+        self.fast_mode = self.config.collector_mode == 'fast'
+        
+        # payload.json пишет один поток; если рядом с кодом нельзя - пишем в /tmp
+        if self.config.write_payload:
+            self.payload_writer = PayloadWriter(
+                Path(__file__).parent / "payload.json",
+                logger,
+                self.config.payload_format,
+                fallback_file=Path("/tmp") / "payload.json"
+            )
+        # Версия ядра не меняется до перезагрузки - спрашиваем один раз
+        self._uname_release = os.uname().release
+        # Кэш проб: пока файлы не менялись, не открываем и не разбираем их заново
+        self.probe_cache = ProbeCache()
+        # То же между запусками: результат и отпечатки файлов на диске
+        if self.config.cache_file:
+            self.warm_cache = WarmCache(self.config.cache_file, logger)
+        
         # Проверяем права на чтение системных файлов
         self.file_permissions = self._check_file_permissions()
-        self.logger.info(f"Доступ к системным файлам: {self._format_permissions()}")
+        self.logger.info("Доступ к системным файлам: %s", self._format_permissions)
     
     def _check_file_permissions(self) -> Dict[str, bool]:
         """
         Проверяет, есть ли у текущего пользователя доступ к системным файлам
         """
         permissions = {}
-        files_to_check = [
-            self.OS_RELEASE_PATH,
-            self.DEBIAN_VERSION_PATH,
-            self.ASTRA_RELEASE_PATH,
-            self.ASTRA_VERSION_PATH,
-            self.REDOS_RELEASE_PATH,
-            self.LSB_RELEASE_PATH,
-            "/proc/version",
-        ]
-        
-        for file_path in files_to_check:
-            if os.path.exists(file_path):
+        for file_path in self._source_paths():
+            stat = self.probe_cache.stat(file_path)
+            if stat is not None:
                 # Проверяем доступ на чтение
-                can_read = os.access(file_path, os.R_OK)
+                can_read = self.probe_cache.access(file_path, stat)
                 permissions[file_path] = can_read
                 
-                # Дополнительная информация о файле
-                try:
-                    stat = os.stat(file_path)
-                    file_owner = pwd.getpwuid(stat.st_uid).pw_name
-                    file_group = grp.getgrgid(stat.st_gid).gr_name
-                    file_mode = oct(stat.st_mode)[-3:]
-                    
-                    self.logger.debug(f"Файл {file_path}: владелец={file_owner}, группа={file_group}, права={file_mode}, доступ={'✅' if can_read else '❌'}")
-                except:
-                    pass
+                # Дополнительная информация о файле - только если debug реально пишется
+                if self.logger.is_enabled('debug'):
+                    try:
+                        file_owner = self.probe_cache.user_name(stat.st_uid)
+                        file_group = self.probe_cache.group_name(stat.st_gid)
+                        file_mode = oct(stat.st_mode)[-3:]
+                        
+                        self.logger.debug("Файл %s: владелец=%s, группа=%s, права=%s, доступ=%s", file_path, file_owner, file_group, file_mode, '✅' if can_read else '❌')
+                    except:
+                        pass
             else:
                 permissions[file_path] = False
         
         return permissions
     
+    def _source_paths(self) -> List[str]:
+        """Файлы, из которых собирается результат"""
+        return [
+            self.OS_RELEASE_PATH,
+            self.DEBIAN_VERSION_PATH,
+            self.ASTRA_RELEASE_PATH,
+            self.ASTRA_VERSION_PATH,
+            self.REDOS_RELEASE_PATH,
+            self.LSB_RELEASE_PATH,
+            PROC_VERSION_PATH,
+        ]
+    
+    def watched_paths(self) -> List[str]:
+        """Для --watch: всё, кроме /proc/version - ядро до перезагрузки не меняется"""
+        return [path for path in self._source_paths() if path != PROC_VERSION_PATH]
+    
+    def _source_fingerprints(self) -> Dict[str, Any]:
+        """
+        Отпечатки для тёплого кэша: stat каждого файла (без чтения), ядро и euid -
+        от euid зависят права на чтение, а значит и то, что мы вообще увидим.
+        Списки, а не кортежи: так отпечаток совпадёт с прочитанным из JSON.
+        """
+        files = {}
+        for path in self._source_paths():
+            st = self.probe_cache.stat(path)
+            files[path] = list(ProbeCache.fingerprint(st)) if st is not None else None
+        return {
+            'files': files,
+            'kernel': self._uname_release,
+            'euid': os.geteuid(),
+            'mode': self.config.collector_mode,
+        }
+    
     def _format_permissions(self) -> str:
         """Красиво форматирует статус прав доступа"""
         accessible = sum(1 for v in self.file_permissions.values() if v)
         total = len(self.file_permissions)
         return f"{accessible}/{total} файлов доступно"
     
+    def invalidate_cache(self, path: Optional[str] = None):
+        """Принудительно сбрасываем кэш проб (например, после обновления ОС)"""
+        self.probe_cache.invalidate(path)
+    
     def _check_root(self) -> bool:
         """Проверяет, запущен ли процесс от root"""
         try:
@@ -101,8 +177,8 @@ class LinuxInventoryService(BaseInventoryService):
                 'euid': euid,
                 'gid': gid,
                 'egid': egid,
-                'user': pwd.getpwuid(uid).pw_name,
-                'effective_user': pwd.getpwuid(euid).pw_name if euid != uid else 'same',
+                'user': self.probe_cache.user_name(uid),
+                'effective_user': self.probe_cache.user_name(euid) if euid != uid else 'same',
                 'is_root': self._check_root(),
             }
         except:
@@ -110,19 +186,66 @@ class LinuxInventoryService(BaseInventoryService):
     
     def collect_os_info(self) -> LinuxInventoryResult:
         """Определяем дистрибутив и собираем информацию"""
+        fingerprints, cached = self._warm_lookup()
+        if cached is not None:
+            return cached
+        result = self._collect_os_info()
+        self._warm_store(fingerprints, result)
+        return result
+    
+    async def collect_os_info_async(self) -> LinuxInventoryResult:
+        """
+        То же самое без блокировки event loop: stat, чтение файлов и запросы к NSS (pwd/grp)
+        уходят в пул потоков - зависшее чтение с NFS не останавливает остальные корутины.
+        Через asyncio.create_subprocess_exec запускаем только запасной uname
+        """
+        import asyncio
+        
+        fingerprints, cached = await asyncio.to_thread(self._warm_lookup)
+        if cached is not None:
+            return cached
+        
+        kernel_version = await asyncio.to_thread(self._check_kernel_fast)
+        if not kernel_version:
+            kernel_version = await self._run_uname_async()
+        
+        result = await asyncio.to_thread(self._collect_os_info, kernel_version, False)
+        await asyncio.to_thread(self._warm_store, fingerprints, result)
+        return result
+    
+    def _check_kernel_fast(self) -> str:
+        """Права на файлы и версия ядра без процессов - блокирующая часть перед uname"""
+        self.file_permissions = self._check_file_permissions()
+        return self._get_kernel_version_fast()
+    
+    def _collect_os_info(self, kernel_version: Optional[str] = None,
+                         refresh_permissions: bool = True) -> LinuxInventoryResult:
+        """Сбор информации; версию ядра можно передать уже готовой"""
         result = LinuxInventoryResult()
         
         try:
             # Обновляем информацию о правах
-            self.file_permissions = self._check_file_permissions()
+            if refresh_permissions:
+                with self._probe('permissions'):
+                    self.file_permissions = self._check_file_permissions()
             
             # Пробуем читать файлы в зависимости от прав
-            os_release_info = self._safe_read_os_release()
+            with self._probe('os_release'):
+                os_release_info = self._safe_read_os_release()
+            distribution_name = os_release_info.get('NAME', '')
             
             if not os_release_info or not self._is_supported_distro(os_release_info):
-                os_release_info = self._detect_specific_distro()
+                check_cancelled()
+                with self._probe('specific_distro'):
+                    os_release_info = self._detect_specific_distro()
+                distribution_name = os_release_info.get('NAME') or distribution_name
+            # Имя едет вместе с результатом: воркеры собирают параллельно, общее поле на self перепутало бы задачи
+            result.DistributionName = distribution_name
             
-            kernel_version = self._get_kernel_version()
+            check_cancelled()
+            if not kernel_version:
+                with self._probe('kernel'):
+                    kernel_version = self._get_kernel_version()
             result.KernelVersion = kernel_version
             result.CurrentBuild = kernel_version.split('-')[0] if kernel_version else ""
             
@@ -136,18 +259,19 @@ class LinuxInventoryService(BaseInventoryService):
                 if not result.CurrentBuild:
                     result.CurrentBuild = os_release_info.get('VERSION_ID', '')
             else:
-                result.ProductName = f"Linux {platform.release()}"
-                result.DisplayVersion = platform.release()
+                release = self._uname_release if self.fast_mode else platform.release()
+                result.ProductName = f"Linux {release}"
+                result.DisplayVersion = release
                 result.EditionID = "linux"
-                result.CurrentBuild = platform.release()
+                result.CurrentBuild = release
                 result.Distribution = "unknown"
                 self.logger.warning("Не удалось определить дистрибутив")
             
-            self.logger.info(f"Нашли ОС: {result.ProductName}")
-            self.logger.info(f"Ядро: {result.KernelVersion}")
+            self.logger.info("Нашли ОС: %s", result.ProductName)
+            self.logger.info("Ядро: %s", result.KernelVersion)
             
         except Exception as e:
-            self.logger.error(f"Ошибка при сборе информации: {e}")
+            self.logger.error("Ошибка при сборе информации: %s", e)
         
         return result
     
@@ -155,25 +279,20 @@ class LinuxInventoryService(BaseInventoryService):
         """Безопасно читает os-release с проверкой прав"""
         result = {}
         
-        if not os.path.exists(self.OS_RELEASE_PATH):
+        stat = self.probe_cache.stat(self.OS_RELEASE_PATH)
+        if stat is None:
             return result
         
         # Проверяем права на чтение
         if not self.file_permissions.get(self.OS_RELEASE_PATH, False):
-            self.logger.warning(f"Нет прав на чтение {self.OS_RELEASE_PATH}")
+            self.logger.warning("Нет прав на чтение %s", self.OS_RELEASE_PATH)
             return result
         
         try:
-            with open(self.OS_RELEASE_PATH, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and '=' in line and not line.startswith('#'):
-                        key, value = line.split('=', 1)
-                        value = value.strip('"\'')
-                        result[key] = value
-                        
+            # Копия - закэшированный словарь не должен меняться снаружи
+            result = dict(self.probe_cache.read(self.OS_RELEASE_PATH, _parse_key_value, 'key_value', stat))
         except Exception as e:
-            self.logger.error(f"Не смогли прочитать os-release: {e}")
+            self.logger.error("Не смогли прочитать os-release: %s", e)
         
         return result
     
@@ -222,19 +341,13 @@ class LinuxInventoryService(BaseInventoryService):
         
         try:
             if self.file_permissions.get(self.ASTRA_VERSION_PATH, False):
-                with open(self.ASTRA_VERSION_PATH, 'r', encoding='utf-8') as f:
-                    version = f.read().strip()
-                    result['VERSION_ID'] = version
-                    result['PRETTY_NAME'] = f"Astra Linux {version}"
+                version = self.probe_cache.read(self.ASTRA_VERSION_PATH, str.strip)
+                result['VERSION_ID'] = version
+                result['PRETTY_NAME'] = f"Astra Linux {version}"
             elif self.file_permissions.get(self.ASTRA_RELEASE_PATH, False):
-                with open(self.ASTRA_RELEASE_PATH, 'r', encoding='utf-8') as f:
-                    content = f.read().strip()
-                    result['PRETTY_NAME'] = content
-                    version_match = re.search(r'(\d+\.?\d*)', content)
-                    if version_match:
-                        result['VERSION_ID'] = version_match.group(1)
+                result.update(self.probe_cache.read(self.ASTRA_RELEASE_PATH, _parse_version_number, 'version'))
         except Exception as e:
-            self.logger.error(f"Ошибка при определении Astra Linux: {e}")
+            self.logger.error("Ошибка при определении Astra Linux: %s", e)
         
         return result
     
@@ -248,14 +361,9 @@ class LinuxInventoryService(BaseInventoryService):
         
         try:
             if self.file_permissions.get(self.REDOS_RELEASE_PATH, False):
-                with open(self.REDOS_RELEASE_PATH, 'r', encoding='utf-8') as f:
-                    content = f.read().strip()
-                    result['PRETTY_NAME'] = content
-                    version_match = re.search(r'(\d+\.?\d*)', content)
-                    if version_match:
-                        result['VERSION_ID'] = version_match.group(1)
+                result.update(self.probe_cache.read(self.REDOS_RELEASE_PATH, _parse_version_number, 'version'))
         except Exception as e:
-            self.logger.error(f"Ошибка при определении RedOS: {e}")
+            self.logger.error("Ошибка при определении RedOS: %s", e)
         
         return result
     
@@ -265,126 +373,172 @@ class LinuxInventoryService(BaseInventoryService):
         
         try:
             if self.file_permissions.get(self.LSB_RELEASE_PATH, False):
-                with open(self.LSB_RELEASE_PATH, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        line = line.strip()
-                        if '=' in line:
-                            key, value = line.split('=', 1)
-                            value = value.strip('"\'')
-                            if key == 'DISTRIB_ID':
-                                if 'ubuntu' in value.lower():
-                                    result['ID'] = 'ubuntu'
-                                    result['NAME'] = 'Ubuntu'
-                                else:
-                                    result['ID'] = 'debian'
-                                    result['NAME'] = 'Debian'
-                            elif key == 'DISTRIB_RELEASE':
-                                result['VERSION_ID'] = value
-                            elif key == 'DISTRIB_DESCRIPTION':
-                                result['PRETTY_NAME'] = value
+                lsb_release = self.probe_cache.read(self.LSB_RELEASE_PATH, _parse_key_value, 'key_value')
+                for key, value in lsb_release.items():
+                    if key == 'DISTRIB_ID':
+                        if 'ubuntu' in value.lower():
+                            result['ID'] = 'ubuntu'
+                            result['NAME'] = 'Ubuntu'
+                        else:
+                            result['ID'] = 'debian'
+                            result['NAME'] = 'Debian'
+                    elif key == 'DISTRIB_RELEASE':
+                        result['VERSION_ID'] = value
+                    elif key == 'DISTRIB_DESCRIPTION':
+                        result['PRETTY_NAME'] = value
             
             if not result and self.file_permissions.get(self.DEBIAN_VERSION_PATH, False):
-                with open(self.DEBIAN_VERSION_PATH, 'r', encoding='utf-8') as f:
-                    version = f.read().strip()
-                    result['ID'] = 'debian'
-                    result['NAME'] = 'Debian'
-                    result['VERSION_ID'] = version
-                    result['PRETTY_NAME'] = f"Debian GNU/Linux {version}"
+                version = self.probe_cache.read(self.DEBIAN_VERSION_PATH, str.strip)
+                result['ID'] = 'debian'
+                result['NAME'] = 'Debian'
+                result['VERSION_ID'] = version
+                result['PRETTY_NAME'] = f"Debian GNU/Linux {version}"
                     
         except Exception as e:
-            self.logger.error(f"Ошибка при определении Debian/Ubuntu: {e}")
+            self.logger.error("Ошибка при определении Debian/Ubuntu: %s", e)
         
         return result
     
     def _get_kernel_version(self) -> str:
         """Узнаёт версию ядра"""
-        # Пробуем /proc/version
-        if os.path.exists('/proc/version') and os.access('/proc/version', os.R_OK):
-            try:
-                with open('/proc/version', 'r', encoding='utf-8') as f:
-                    version_line = f.read().strip()
-                    version_match = re.search(r'version\s+([^\s]+)', version_line)
-                    if version_match:
-                        return version_match.group(1)
-            except Exception as e:
-                self.logger.error(f"Не смогли прочитать /proc/version: {e}")
+        kernel_version = self._get_kernel_version_fast()
+        if kernel_version:
+            return kernel_version
         
         # Пробуем uname
         try:
-            # В теории, возможна инъекция кода вместо uname, по этому закроем его на проверку 
-            uname_path = shutil.which('uname')
-            if uname_path and uname_path.startswith('/bin/'):
+            if self._uname_allowed():
+                import subprocess
+                
                 result = subprocess.run(['uname', '-r'], 
                                   capture_output=True, 
                                   text=True, 
-                                  timeout=SUBPROCESS_TIMEOUT,
+                                  timeout=effective_timeout(SUBPROCESS_TIMEOUT),
                                   check=False)
                 if result.returncode == 0:
                     return result.stdout.strip()
         except Exception as e:
-            self.logger.error(f"uname не работает: {e}")
+            self.logger.error("uname не работает: %s", e)
+        
+        return platform.release()
+    
+    def _get_kernel_version_fast(self) -> str:
+        """Версия ядра без запуска процессов; пустая строка - нужен uname"""
+        if self.fast_mode:
+            # Ядро само знает свою версию - ни файлов, ни процессов
+            return self._uname_release
+        
+        # Пробуем /proc/version
+        if self.file_permissions.get(PROC_VERSION_PATH, False):
+            try:
+                return self.probe_cache.read(PROC_VERSION_PATH, _parse_proc_version, 'kernel')
+            except Exception as e:
+                self.logger.error("Не смогли прочитать /proc/version: %s", e)
+        
+        return ""
+    
+    @staticmethod
+    def _uname_allowed() -> bool:
+        """В теории, возможна инъекция кода вместо uname, по этому закроем его на проверку"""
+        import shutil
+        
+        uname_path = shutil.which('uname')
+        return bool(uname_path and uname_path.startswith('/bin/'))
+    
+    async def _run_uname_async(self) -> str:
+        """uname -r без блокировки event loop"""
+        import asyncio
+        
+        try:
+            if self._uname_allowed():
+                process = await asyncio.create_subprocess_exec(
+                    'uname', '-r',
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.DEVNULL
+                )
+                try:
+                    stdout, _ = await asyncio.wait_for(process.communicate(), SUBPROCESS_TIMEOUT)
+                except asyncio.TimeoutError:
+                    process.kill()
+                    await process.wait()
+                    raise
+                if process.returncode == 0:
+                    return stdout.decode('utf-8', 'replace').strip()
+        except Exception as e:
+            self.logger.error("uname не работает: %r", e)
         
         return platform.release()
     
-    def execute_task(self, task_data: Dict[str, Any]):
+    def execute_task(self, task_data: Dict[str, Any], os_info: Optional[InventoryResult] = None,
+                     coalesced: bool = False) -> Dict[str, Any]:
         """Запускает сбор информации"""
-        self.logger.info("Собираем информацию о Linux...")
-        os_info = self.collect_os_info()
+        if os_info is None:
+            self.logger.info("Собираем информацию о Linux...")
+            os_info = self.collect_os_info()
         
+        result = self._make_result(task_data, os_info, self.OS_NAME, coalesced)
+        # Сторож мог уже выдать за задачу отказ - тогда успех не публикуем
+        finish_task()
         if self.result_queue:
-            try:
-                result = {
-                    'status': 'success',
-                    'data': os_info.to_dict(),
-                    'timestamp': datetime.now().isoformat(),
-                    'os': 'linux'
-                }
-                
-                self.result_queue.put(result, timeout=1)
+            if self._publish_result(result):
                 self.logger.info("Результат в очереди")
-            except queue.Full:
+            else:
                 self.logger.error("Очередь забита!")
         
+        if coalesced:
+            # Тот же результат уже сохранён задачей, которая его собирала
+            self.logger.info("Результат общий с дубликатом, повторно не сохраняем")
+            return result
+        
         self._save_to_file(os_info)
         self.logger.info("Информация о Linux собрана")
+        return result
+    
+    def _build_payload(self, os_info: LinuxInventoryResult) -> Dict[str, Any]:
+        """Собирает payload с диагностикой и информацией о правах доступа"""
+        payload = os_info.to_dict()
+        
+        # Информация о правах доступа
+        process_info = self._get_process_info()
+        
+        if self.fast_mode:
+            # Имя из os-release, разобранного при сборе этого результата, - без повторного чтения
+            linux_info = {
+                'distribution': os_info.DistributionName or 'unknown',
+                'kernel': self._uname_release
+            }
+        else:
+            linux_info = {
+                'distribution': platform.freedesktop_os_release().get('NAME', 'unknown') if hasattr(platform, 'freedesktop_os_release') else 'unknown',
+                'kernel': platform.release()
+            }
+        
+        payload['_diagnostic'] = {
+            'timestamp': datetime.now().isoformat(),
+            'python': {
+                'version': sys.version.split()[0],
+                'path': sys.executable
+            },
+            'linux': linux_info,
+            'collector_mode': self.config.collector_mode,
+            'permissions': {
+                'is_root': self._check_root(),
+                'process': process_info,
+                'file_access': self.file_permissions,  # Реальный доступ к файлам!
+                'accessible_files': self._format_permissions()
+            },
+            'probe_cache': self.probe_cache.stats()
+        }
+        if self.warm_cache is not None:
+            payload['_diagnostic']['warm_cache'] = self.warm_cache.stats()
+        
+        return payload
     
     def _save_to_file(self, os_info: LinuxInventoryResult):
-        """Сохраняет JSON с информацией о правах доступа"""
+        """Отдаёт JSON с информацией о правах доступа единственному писателю"""
+        if self.payload_writer is None:
+            return
         try:
-            payload = os_info.to_dict()
-            
-            # Информация о правах доступа
-            process_info = self._get_process_info()
-            
-            payload['_diagnostic'] = {
-                'timestamp': datetime.now().isoformat(),
-                'python': {
-                    'version': sys.version.split()[0],
-                    'path': sys.executable
-                },
-                'linux': {
-                    'distribution': platform.freedesktop_os_release().get('NAME', 'unknown') if hasattr(platform, 'freedesktop_os_release') else 'unknown',
-                    'kernel': platform.release()
-                },
-                'permissions': {
-                    'is_root': self._check_root(),
-                    'process': process_info,
-                    'file_access': self.file_permissions,  # Реальный доступ к файлам!
-                    'accessible_files': self._format_permissions()
-                }
-            }
-            
-            output_file = Path(__file__).parent / "payload.json"
-            
-            try:
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    json.dump(payload, f, ensure_ascii=False, indent=2)
-                self.logger.info(f"Результат сохранён в {output_file}")
-            except (PermissionError, OSError):
-                temp_file = Path("/tmp") / "payload.json"
-                with open(temp_file, 'w', encoding='utf-8') as f:
-                    json.dump(payload, f, ensure_ascii=False, indent=2)
-                self.logger.warning(f"Нет прав на запись, сохранили в {temp_file}")
-                    
+            self.payload_writer.submit(self._build_payload(os_info))
         except Exception as e:
-            self.logger.error(f"Ошибка при сохранении файла: {e}")
+            self.logger.error("Ошибка при сохранении файла: %s", e)
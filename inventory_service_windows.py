@@ -1,20 +1,23 @@
 import winreg
 import sys
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime
-import json
 from pathlib import Path
-import queue
 import platform
 
 from interfaces import BaseLogService, BaseInventoryService
-from datacls_models import WindowsInventoryResult
+from datacls_models import InventoryConfig, InventoryResult, WindowsInventoryResult
+from payload_writer import PayloadWriter
+from warm_cache import WarmCache
+from cancellation import check_cancelled, effective_timeout, finish_task
 
 REGISTRY_TIMEOUT = 5
 
 class WindowsInventoryService(BaseInventoryService):
     """Сбор информации о Windows из реестра"""
     
+    OS_NAME = 'windows'
+    RESULT_CLASS = WindowsInventoryResult
     REGISTRY_PATHS = [
         r"Software\Microsoft\Windows NT\CurrentVersion",
         r"SOFTWARE\Microsoft\Windows NT\CurrentVersion",
@@ -25,15 +28,28 @@ class WindowsInventoryService(BaseInventoryService):
         winreg.HKEY_CURRENT_USER,
     ]
     
-    def __init__(self, logger: BaseLogService):
+    def __init__(self, logger: BaseLogService, config: Optional[InventoryConfig] = None):
         super().__init__(logger)
+        self.config = config or InventoryConfig()
+        
+        # payload.json пишет один поток, воркеры его не ждут
+        if self.config.write_payload:
+            self.payload_writer = PayloadWriter(
+                Path(__file__).parent / "payload.json",
+                logger,
+                self.config.payload_format
+            )
+        # Результат прошлого запуска, пока ключ CurrentVersion не переписывали
+        if self.config.cache_file:
+            self.warm_cache = WarmCache(self.config.cache_file, logger)
+        
         import platform
         self.is_64bit = platform.machine().endswith('64')
-        self.logger.info(f"Python: {'64-битный' if self.is_64bit else '32-битный'}")
+        self.logger.info("Python: %s", '64-битный' if self.is_64bit else '32-битный')
         
         # Проверяем доступ к реестру при инициализации
         self.registry_access = self._check_registry_access()
-        self.logger.info(f"Доступ к реестру: {'✅' if self.registry_access else '❌'}")
+        self.logger.info("Доступ к реестру: %s", '✅' if self.registry_access else '❌')
     
     def _check_registry_access(self) -> bool:
         """
@@ -66,9 +82,26 @@ class WindowsInventoryService(BaseInventoryService):
             self.logger.debug("Ключ реестра не найден (странно для Windows)")
             return False
         except Exception as e:
-            self.logger.debug(f"Неожиданная ошибка при проверке реестра: {e}")
+            self.logger.debug("Неожиданная ошибка при проверке реестра: %s", e)
             return False
     
+    def _source_fingerprints(self) -> Optional[Dict[str, Any]]:
+        """
+        Отпечаток для тёплого кэша: время последней записи ключа CurrentVersion
+        (меняется при обновлении сборки). Ключ не открылся - кэш не используем.
+        """
+        try:
+            key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, self.REGISTRY_PATHS[0], 0, winreg.KEY_READ)
+        except OSError:
+            return None
+        try:
+            last_write = winreg.QueryInfoKey(key)[2]
+        except OSError:
+            return None
+        finally:
+            winreg.CloseKey(key)
+        return {'registry': last_write, 'bits': '64' if self.is_64bit else '32'}
+    
     def _check_admin(self) -> bool:
         """Проверка прав администратора (отдельно от доступа к реестру)"""
         try:
@@ -143,24 +176,55 @@ class WindowsInventoryService(BaseInventoryService):
         try:
             import subprocess
             cmd = 'wmic os get Caption,Version,BuildNumber /format:csv'
-            output = subprocess.check_output(cmd, shell=True, text=True, timeout=5)
-            
-            lines = output.strip().split('\n')
-            if len(lines) >= 2:
-                parts = lines[1].split(',')
-                if len(parts) >= 4:
-                    result['ProductName'] = parts[1].strip()
-                    result['CurrentBuild'] = parts[3].strip()
-                    version_parts = parts[2].strip().split('.')
-                    if len(version_parts) >= 2:
-                        result['DisplayVersion'] = f"{version_parts[0]}.{version_parts[1]}"
-                    
+            output = subprocess.check_output(cmd, shell=True, text=True, timeout=effective_timeout(REGISTRY_TIMEOUT))
+            result = self._parse_wmi_output(output)
             self.logger.info("✅ Получили данные через WMI")
         except Exception as e:
-            self.logger.debug(f"WMI не сработал: {e}")
+            self.logger.debug("WMI не сработал: %s", e)
         
         return result
     
+    async def _try_wmi_async(self) -> Dict[str, str]:
+        """WMI без блокировки event loop"""
+        import asyncio
+        
+        result = {}
+        
+        try:
+            process = await asyncio.create_subprocess_exec(
+                'wmic', 'os', 'get', 'Caption,Version,BuildNumber', '/format:csv',
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+            try:
+                stdout, _ = await asyncio.wait_for(process.communicate(), REGISTRY_TIMEOUT)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                raise
+            if process.returncode == 0:
+                result = self._parse_wmi_output(stdout.decode('utf-8', 'replace'))
+                self.logger.info("✅ Получили данные через WMI")
+        except Exception as e:
+            self.logger.debug("WMI не сработал: %r", e)
+        
+        return result
+    
+    @staticmethod
+    def _parse_wmi_output(output: str) -> Dict[str, str]:
+        """Разбор csv-вывода wmic"""
+        result = {}
+        lines = [line for line in output.strip().splitlines() if line.strip()]
+        if len(lines) >= 2:
+            parts = lines[1].split(',')
+            if len(parts) >= 4:
+                result['ProductName'] = parts[1].strip()
+                result['CurrentBuild'] = parts[3].strip()
+                version_parts = parts[2].strip().split('.')
+                if len(version_parts) >= 2:
+                    result['DisplayVersion'] = f"{version_parts[0]}.{version_parts[1]}"
+        return result
+    
     def _try_environment(self) -> Dict[str, str]:
         """Последний шанс: переменные окружения"""
         result = {}
@@ -183,110 +247,167 @@ class WindowsInventoryService(BaseInventoryService):
     
     def collect_os_info(self) -> WindowsInventoryResult:
         """Сбор информации с запасными вариантами"""
+        fingerprints, cached = self._warm_lookup()
+        if cached is not None:
+            return cached
+        
         result = WindowsInventoryResult()
         
         try:
-            # Обновляем статус доступа к реестру
-            self.registry_access = self._check_registry_access()
-            
             # Способ 1: Реестр
-            if self.registry_access:
-                self.logger.info("🔍 Пробуем прочитать реестр...")
-                registry_data = self._try_read_registry()
-                
-                if registry_data:
-                    result.ProductName = registry_data.get('ProductName', '')
-                    result.CurrentBuild = registry_data.get('CurrentBuild', '')
-                    result.DisplayVersion = registry_data.get('DisplayVersion', '')
-                    result.EditionID = registry_data.get('EditionID', '')
-                    result.UBR = registry_data.get('UBR', '')
-                    result.InstallDate = registry_data.get('InstallDate', '')
-                    self.logger.info("✅ Данные из реестра получены")
-            else:
-                self.logger.warning("⚠️ Нет доступа к реестру, пробуем другие источники")
+            self._fill_from_registry(result)
             
             # Способ 2: WMI
             if not result.ProductName:
+                check_cancelled()
                 self.logger.info("🔍 Пробуем WMI...")
-                wmi_data = self._try_wmi()
-                if wmi_data:
-                    result.ProductName = wmi_data.get('ProductName', result.ProductName)
-                    result.CurrentBuild = wmi_data.get('CurrentBuild', result.CurrentBuild)
-                    result.DisplayVersion = wmi_data.get('DisplayVersion', result.DisplayVersion)
+                with self._probe('wmi'):
+                    wmi_data = self._try_wmi()
+                self._fill_from_wmi(result, wmi_data)
             
-            # Способ 3: Окружение
-            if not result.ProductName:
-                self.logger.info("🔍 Пробуем переменные окружения...")
-                env_data = self._try_environment()
-                if env_data:
-                    result.ProductName = env_data.get('ProductName', result.ProductName)
-                    result.EditionID = env_data.get('EditionID', result.EditionID)
-                    result.CurrentBuild = env_data.get('CurrentBuild', result.CurrentBuild)
+            # Способы 3 и дальше
+            check_cancelled()
+            self._fill_fallbacks(result)
+            
+        except Exception as e:
+            self.logger.error("❌ Критическая ошибка: %s", e)
+        else:
+            # Неполный результат после ошибки в кэш не кладём - иначе он переживёт перезапуск
+            self._warm_store(fingerprints, result)
+        
+        return result
+    
+    async def collect_os_info_async(self) -> WindowsInventoryResult:
+        """То же самое, но wmic запускается через asyncio и не блокирует event loop"""
+        fingerprints, cached = self._warm_lookup()
+        if cached is not None:
+            return cached
+        
+        result = WindowsInventoryResult()
+        
+        try:
+            self._fill_from_registry(result)
             
-            # Финальное сообщение
             if not result.ProductName:
-                result.ProductName = "Windows (доступ запрещён)"
-                self.logger.error("❌ Не удалось получить данные ни из одного источника")
+                self.logger.info("🔍 Пробуем WMI...")
+                self._fill_from_wmi(result, await self._try_wmi_async())
+            
+            self._fill_fallbacks(result)
             
         except Exception as e:
-            self.logger.error(f"❌ Критическая ошибка: {e}")
+            self.logger.error("❌ Критическая ошибка: %s", e)
+        else:
+            self._warm_store(fingerprints, result)
         
         return result
     
-    def execute_task(self, task_data: Dict[str, Any]):
+    def _fill_from_registry(self, result: WindowsInventoryResult):
+        """Способ 1: Реестр"""
+        # Обновляем статус доступа к реестру
+        with self._probe('registry_access'):
+            self.registry_access = self._check_registry_access()
+        
+        if self.registry_access:
+            self.logger.info("🔍 Пробуем прочитать реестр...")
+            with self._probe('registry'):
+                registry_data = self._try_read_registry()
+            
+            if registry_data:
+                result.ProductName = registry_data.get('ProductName', '')
+                result.CurrentBuild = registry_data.get('CurrentBuild', '')
+                result.DisplayVersion = registry_data.get('DisplayVersion', '')
+                result.EditionID = registry_data.get('EditionID', '')
+                result.UBR = registry_data.get('UBR', '')
+                result.InstallDate = registry_data.get('InstallDate', '')
+                self.logger.info("✅ Данные из реестра получены")
+        else:
+            self.logger.warning("⚠️ Нет доступа к реестру, пробуем другие источники")
+    
+    @staticmethod
+    def _fill_from_wmi(result: WindowsInventoryResult, wmi_data: Dict[str, str]):
+        """Способ 2: WMI"""
+        if wmi_data:
+            result.ProductName = wmi_data.get('ProductName', result.ProductName)
+            result.CurrentBuild = wmi_data.get('CurrentBuild', result.CurrentBuild)
+            result.DisplayVersion = wmi_data.get('DisplayVersion', result.DisplayVersion)
+    
+    def _fill_fallbacks(self, result: WindowsInventoryResult):
+        """Способ 3: Окружение, и финальное сообщение"""
+        if not result.ProductName:
+            self.logger.info("🔍 Пробуем переменные окружения...")
+            with self._probe('environment'):
+                env_data = self._try_environment()
+            if env_data:
+                result.ProductName = env_data.get('ProductName', result.ProductName)
+                result.EditionID = env_data.get('EditionID', result.EditionID)
+                result.CurrentBuild = env_data.get('CurrentBuild', result.CurrentBuild)
+        
+        # Финальное сообщение
+        if not result.ProductName:
+            result.ProductName = "Windows (доступ запрещён)"
+            self.logger.error("❌ Не удалось получить данные ни из одного источника")
+    
+    def execute_task(self, task_data: Dict[str, Any], os_info: Optional[InventoryResult] = None,
+                     coalesced: bool = False) -> Dict[str, Any]:
         """Запускаем сбор информации"""
-        self.logger.info("🔍 Начинаем сбор информации о Windows...")
-        os_info = self.collect_os_info()
+        if os_info is None:
+            self.logger.info("🔍 Начинаем сбор информации о Windows...")
+            os_info = self.collect_os_info()
         
+        result = self._make_result(task_data, os_info, self.OS_NAME, coalesced)
+        # Сторож мог уже выдать за задачу отказ - тогда успех не публикуем
+        finish_task()
         if self.result_queue:
-            try:
-                result = {
-                    'status': 'success',
-                    'data': os_info.to_dict(),
-                    'timestamp': datetime.now().isoformat(),
-                    'os': 'windows'
-                }
-                
-                self.result_queue.put(result, timeout=1)
+            if self._publish_result(result):
                 self.logger.info("✅ Результат в очереди")
-            except queue.Full:
+            else:
                 self.logger.error("❌ Очередь забита!")
         
+        if coalesced:
+            # Тот же результат уже сохранён задачей, которая его собирала
+            self.logger.info("Результат общий с дубликатом, повторно не сохраняем")
+            return result
+        
         self._save_to_file(os_info)
         self.logger.info("✅ Сбор информации завершён")
+        return result
+    
+    def _build_payload(self, os_info: WindowsInventoryResult) -> Dict[str, Any]:
+        """Собираем payload с детальной информацией о правах"""
+        payload = os_info.to_dict()
+        
+        # Подробная информация о доступе к реестру
+        registry_permissions = self._check_registry_permissions()
+        
+        payload['_diagnostic'] = {
+            'timestamp': datetime.now().isoformat(),
+            'python': {
+                'version': sys.version.split()[0],
+                'bits': '64' if self.is_64bit else '32',
+                'path': sys.executable
+            },
+            'windows': {
+                'version': platform.version(),
+                'release': platform.release()
+            },
+            'permissions': {
+                'registry_access': self.registry_access,  # Реальный доступ к реестру!
+                'is_admin': self._check_admin(),  # Права администратора (отдельно)
+                'registry_hives': registry_permissions,  # Права на каждый куст
+            },
+            'data_source': 'registry' if self.registry_access else 'fallback'
+        }
+        if self.warm_cache is not None:
+            payload['_diagnostic']['warm_cache'] = self.warm_cache.stats()
+        
+        return payload
     
     def _save_to_file(self, os_info: WindowsInventoryResult):
-        """Сохраняем JSON файл с детальной информацией о правах"""
+        """Отдаём JSON файл с детальной информацией о правах единственному писателю"""
+        if self.payload_writer is None:
+            return
         try:
-            payload = os_info.to_dict()
-            
-            # Подробная информация о доступе к реестру
-            registry_permissions = self._check_registry_permissions()
-            
-            payload['_diagnostic'] = {
-                'timestamp': datetime.now().isoformat(),
-                'python': {
-                    'version': sys.version.split()[0],
-                    'bits': '64' if self.is_64bit else '32',
-                    'path': sys.executable
-                },
-                'windows': {
-                    'version': platform.version(),
-                    'release': platform.release()
-                },
-                'permissions': {
-                    'registry_access': self.registry_access,  # Реальный доступ к реестру!
-                    'is_admin': self._check_admin(),  # Права администратора (отдельно)
-                    'registry_hives': registry_permissions,  # Права на каждый куст
-                },
-                'data_source': 'registry' if self.registry_access else 'fallback'
-            }
-            
-            output_file = Path(__file__).parent / "payload.json"
-            
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(payload, f, ensure_ascii=False, indent=2)
-            self.logger.info(f"✅ Результат сохранён в {output_file}")
+            self.payload_writer.submit(self._build_payload(os_info))
             
             # Логируем статус доступа
             if self.registry_access:
@@ -295,4 +416,4 @@ class WindowsInventoryService(BaseInventoryService):
                 self.logger.warning("📊 Доступ к реестру: ЗАПРЕЩЁН (нужны права администратора)")
                 
         except Exception as e:
-            self.logger.error(f"❌ Ошибка при сохранении: {e}")
+            self.logger.error("❌ Ошибка при сохранении: %s", e)
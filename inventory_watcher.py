@@ -0,0 +1,223 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from datacls_models import InventoryResult
+from interfaces import BaseInventoryService, BaseLogService
+
+
+class InventoryWatcher:
+    """
+    Режим --watch: собираем информацию об ОС только когда поменялся один из её файлов.
+
+    Через inotify следим не за самими файлами, а за их папками: пакетный менеджер
+    заменяет файл переименованием, и подписка на старый inode потерялась бы.
+    Если файл - симлинк (/etc/os-release -> ../usr/lib/os-release), следим и за папкой цели.
+    Пачку событий (обновление пакета трогает несколько файлов) склеиваем паузой debounce,
+    раз в rescan_interval собираем заново на всякий случай. В простое процесс спит в select
+    и не делает ни одного системного вызова.
+
+    Без inotify (не Linux, исчерпан лимит подписок) - опрос раз в poll_interval.
+    Новый результат отдаём в on_change, только если он отличается от предыдущего.
+    """
+
+    def __init__(self, inventory_service: BaseInventoryService, logger: BaseLogService,
+                 on_change: Callable[[InventoryResult], None], debounce: float = 0.5,
+                 rescan_interval: float = 3600.0, poll_interval: float = 2.0):
+        self.inventory_service = inventory_service
+        self.logger = logger
+        self.on_change = on_change
+        self.debounce = debounce
+        self.rescan_interval = rescan_interval
+        self.poll_interval = poll_interval
+        self.paths = inventory_service.watched_paths()
+
+        self.events = 0
+        self.collections = 0
+        self.rescans = 0
+        self.changes = 0
+        self.last_result: Optional[InventoryResult] = None
+
+        self._stop = threading.Event()
+        self._inotify = None
+        # wd -> (папка, имена в ней, которые нас интересуют)
+        self._watches: Dict[int, Tuple[str, Set[str]]] = {}
+
+    def run(self):
+        """Крутимся, пока не позовут stop() (или не прилетит Ctrl+C)"""
+        self._inotify = self._open_inotify()
+        if self._inotify is not None:
+            mode = f"inotify, {len(self._watches)} папок"
+        else:
+            mode = f"опрос раз в {self.poll_interval} с"
+        self.logger.info("👀 Следим за файлами ОС (%s), пересбор раз в %s с", mode, self.rescan_interval or '-')
+
+        try:
+            # Первый результат - точка отсчёта, отдаём его всегда
+            self._collect('start')
+            next_rescan = self._next_rescan()
+            while not self._stop.is_set():
+                timeout = None if next_rescan is None else max(0.0, next_rescan - time.monotonic())
+                if self._inotify is None:
+                    timeout = self.poll_interval if timeout is None else min(timeout, self.poll_interval)
+
+                if self._wait_for_change(timeout):
+                    self._settle()
+                    if self._stop.is_set():
+                        break
+                    self._collect('change')
+                elif self._stop.is_set():
+                    break
+                elif self._inotify is None:
+                    # Без inotify опрос и есть пересбор: stat файлов через кэш проб почти бесплатен
+                    self._collect('poll')
+                elif next_rescan is not None and time.monotonic() >= next_rescan:
+                    self.rescans += 1
+                    self._collect('rescan')
+                else:
+                    continue
+                next_rescan = self._next_rescan()
+        finally:
+            if self._inotify is not None:
+                self._inotify.close()
+                self._inotify = None
+
+    def stop(self):
+        """Останавливаемся после текущего сбора"""
+        self._stop.set()
+        if self._inotify is not None:
+            self._inotify.wake()
+
+    def _next_rescan(self) -> Optional[float]:
+        return time.monotonic() + self.rescan_interval if self.rescan_interval > 0 else None
+
+    def _open_inotify(self):
+        if not self.paths:
+            return None
+        try:
+            from inotify import Inotify
+            inotify = Inotify()
+        except (OSError, AttributeError) as e:
+            self.logger.warning("inotify недоступен (%s), переходим на опрос", e)
+            return None
+        self._inotify = inotify
+        try:
+            self._add_watches()
+        except OSError as e:
+            self.logger.warning("Не смогли подписаться на папки (%s), переходим на опрос", e)
+            inotify.close()
+            self._watches.clear()
+            return None
+        return inotify
+
+    def _watch_targets(self) -> Dict[str, Set[str]]:
+        """
+        Папка -> имена, за которыми в ней следим. Для файла в ещё не созданной папке
+        (/etc/astra/version) следим за появлением самой папки в ближайшей существующей.
+        """
+        targets: Dict[str, Set[str]] = {}
+        for path in self.paths:
+            candidates = [Path(path)]
+            if candidates[0].is_symlink():
+                candidates.append(candidates[0].resolve())
+            for candidate in candidates:
+                directory, name = candidate.parent, candidate.name
+                while not directory.is_dir() and directory != directory.parent:
+                    directory, name = directory.parent, directory.name
+                targets.setdefault(str(directory), set()).add(name)
+        return targets
+
+    def _add_watches(self):
+        """Подписки ставим заново после каждого изменения: могла появиться папка или смениться симлинк"""
+        from inotify import (IN_ATTRIB, IN_CLOSE_WRITE, IN_CREATE, IN_DELETE, IN_MOVED_FROM, IN_MOVED_TO)
+
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_CREATE | IN_DELETE | IN_ATTRIB
+        for directory, names in self._watch_targets().items():
+            # Повторный add_watch на ту же папку вернёт тот же wd - имена просто обновятся
+            wd = self._inotify.add_watch(directory, mask)
+            self._watches[wd] = (directory, names)
+
+    def _relevant(self, events: List[Any]) -> bool:
+        from inotify import IN_IGNORED, IN_Q_OVERFLOW
+
+        relevant = False
+        for event in events:
+            if event.mask & IN_Q_OVERFLOW:
+                # События потеряны - безопаснее считать, что всё поменялось
+                relevant = True
+                continue
+            watch = self._watches.get(event.wd)
+            if event.mask & IN_IGNORED:
+                # Папку удалили или размонтировали - подписка пропала
+                self._watches.pop(event.wd, None)
+                relevant = True
+            elif watch is not None and event.name in watch[1]:
+                relevant = True
+        self.events += len(events)
+        return relevant
+
+    def _wait_for_change(self, timeout: Optional[float]) -> bool:
+        """True - пришло событие по нашим файлам; False - истёк timeout или разбудили"""
+        if self._inotify is None:
+            self._stop.wait(timeout)
+            return False
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._stop.is_set():
+            events = self._inotify.read_events(timeout)
+            if events and self._relevant(events):
+                return True
+            if not events or deadline is not None and time.monotonic() >= deadline:
+                return False
+            # Событие про чужой файл в /etc - досыпаем остаток
+            if deadline is not None:
+                timeout = max(0.0, deadline - time.monotonic())
+        return False
+
+    def _settle(self):
+        """Ждём, пока пачка событий утихнет на debounce секунд"""
+        while self.debounce > 0 and not self._stop.is_set():
+            events = self._inotify.read_events(self.debounce)
+            if not events:
+                break
+            self._relevant(events)
+        try:
+            self._add_watches()
+        except OSError as e:
+            self.logger.warning("Не смогли обновить подписки inotify: %s", e)
+
+    def _collect(self, reason: str):
+        """Собираем заново и отдаём результат, если он поменялся"""
+        collect = self.inventory_service.collect_os_info
+        if reason in ('change', 'rescan'):
+            # Кэш проб и тёплый кэш сверяют stat, но файл мог поменяться в пределах одного тика mtime:
+            # по событию и на страховочном пересборе читаем файлы заново
+            invalidate = getattr(self.inventory_service, 'invalidate_cache', None)
+            if invalidate is not None:
+                invalidate()
+            collect = self.inventory_service.collect_fresh
+        self.collections += 1
+        try:
+            result = collect()
+        except Exception as e:
+            self.logger.error("❌ Ошибка сбора (%s): %s", reason, e)
+            return
+        if result == self.last_result:
+            self.logger.debug("Сбор (%s): без изменений", reason)
+            return
+        if self.last_result is not None:
+            self.logger.info("🔄 ОС поменялась (%s): %s -> %s", reason,
+                             self.last_result.ProductName, result.ProductName)
+        self.last_result = result
+        self.changes += 1
+        self.on_change(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'events': self.events,
+            'collections': self.collections,
+            'rescans': self.rescans,
+            'changes': self.changes,
+            'watched_dirs': len(self._watches),
+        }
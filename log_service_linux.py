@@ -2,7 +2,7 @@ import logging
 import os
 from pathlib import Path
 
-from interfaces import BaseLogService
+from interfaces import BaseLogService, LOG_LEVELS
 
 class LinuxLogService(BaseLogService):
     """Логирование под Linux"""
@@ -10,14 +10,7 @@ class LinuxLogService(BaseLogService):
     def _setup_logging(self):
         """Настройка логгера для Linux"""
         try:
-            level_map = {
-                'debug': logging.DEBUG,
-                'info': logging.INFO,
-                'warning': logging.WARNING,
-                'error': logging.ERROR
-            }
-            
-            log_level = level_map.get(self.config.level.lower(), logging.INFO)
+            log_level = LOG_LEVELS.get(self.config.level.lower(), logging.INFO)
             log_dir = Path(self.config.log_path)
             
             if not log_dir.exists():
@@ -32,33 +25,13 @@ class LinuxLogService(BaseLogService):
             
             log_file = log_dir / "log.txt"
             
-            logging.basicConfig(
-                level=log_level,
-                format='%(asctime)s.%(msecs)03d [%(levelname)s] %(message)s',
-                datefmt='%Y-%m-%d %H:%M:%S',
-                handlers=[
-                    logging.FileHandler(log_file, encoding='utf-8', mode='a'),
-                    logging.StreamHandler()
-                ]
-            )
+            self._install_handlers(log_file, log_level)
             
             self.logger = logging.getLogger('LinuxCollector')
-            self.logger.info(f"Логирование поднято. Уровень: {self.config.level}")
-            self.logger.info(f"Лог-файл: {log_file}")
+            self.logger.info("Логирование поднято. Уровень: %s", self.config.level)
+            self.logger.info("Лог-файл: %s", log_file)
             
         except Exception as e:
             print(f"Не смогли настроить логирование: {e}")
             logging.basicConfig(level=logging.INFO)
             self.logger = logging.getLogger('LinuxCollector')
-    
-    def debug(self, msg: str):
-        self.logger.debug(msg)
-    
-    def info(self, msg: str):
-        self.logger.info(msg)
-    
-    def warning(self, msg: str):
-        self.logger.warning(msg)
-    
-    def error(self, msg: str):
-        self.logger.error(msg)
@@ -1,79 +1,237 @@
-import argparse
-import platform
+import contextlib
 import sys
 
 # Наши модули
 from config_loader import ConfigLoader
-from service_factory import ServiceFactory
-from dispatcher import DispatcherService
-from utils import read_commands, parse_arguments, print_banner, print_summary
+from service_factory import CURRENT_OS, ServiceFactory
+from dispatcher import DispatcherService, SHUTDOWN_CANCEL, SHUTDOWN_DRAIN
+from result_sink import create_result_sink
+from metrics import REGISTRY, MetricsExporter
+from utils import iter_commands, parse_arguments, print_banner, print_summary
 
-# Определяем ОС при старте
-CURRENT_OS = platform.system().lower()
+def _cache_stats(inventory_service):
+    """Счётчики тёплого кэша для итога; None - кэш выключен"""
+    return inventory_service.warm_cache.stats() if inventory_service.warm_cache is not None else None
+
+def run_spool(args, dispatcher: DispatcherService, logger):
+    """Режим демона: один диспетчер на все файлы из спула"""
+    from spool_watcher import SpoolWatcher
+    
+    watcher = SpoolWatcher(args.spool, dispatcher, logger, poll_interval=args.poll_interval)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        logger.warning("🛑 Прервано пользователем")
+    finally:
+        dispatcher.shutdown(SHUTDOWN_CANCEL)
+        logger.info("📊 Спул: %s", watcher.stats)
+    
+    print_summary(watcher.tasks, errors=dispatcher.failed_tasks(), latencies=REGISTRY.summary(),
+                  cache=_cache_stats(dispatcher.inventory_service))
+
+def run_daemon(args, config, dispatcher: DispatcherService, logger):
+    """Режим демона на сокете: диспетчер и сборщик прогреты, команды приходят от agent_client.py"""
+    import signal
+    from agent_daemon import AgentDaemon
+    
+    daemon = AgentDaemon(dispatcher, args.socket or config.daemon.socket_path, logger,
+                         socket_mode=config.daemon.socket_mode)
+    # SIGTERM от systemd завершает так же, как Ctrl+C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        logger.warning("🛑 Демон остановлен")
+    except (OSError, RuntimeError) as e:
+        logger.error("❌ Демон не запустился: %s", e)
+    finally:
+        dispatcher.shutdown(SHUTDOWN_DRAIN)
+        logger.info("📊 Демон: %s", daemon.stats)
+    
+    print_summary(daemon.tasks, errors=dispatcher.failed_tasks(), latencies=REGISTRY.summary(),
+                  cache=_cache_stats(dispatcher.inventory_service))
+
+def run_watch(args, inventory_service, logger):
+    """Режим --watch: результат печатаем JSON-строкой в stdout, только когда он поменялся"""
+    import json
+    import signal
+    from inventory_watcher import InventoryWatcher
+    
+    def emit(result):
+        print(json.dumps(result.to_dict(), ensure_ascii=False), flush=True)
+    
+    watcher = InventoryWatcher(inventory_service, logger, emit, debounce=args.debounce,
+                               rescan_interval=args.rescan_interval, poll_interval=args.poll_interval)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        logger.warning("🛑 Прервано пользователем")
+    finally:
+        logger.info("📊 Слежение: %s", watcher.stats)
+    
+    print_summary(watcher.collections, latencies=REGISTRY.summary(), cache=_cache_stats(inventory_service))
+
+async def run_asyncio(command_files, config, logger, inventory_service, result_sink):
+    """Файлы команд через asyncio-диспетчер; возвращаем число добавленных задач и ошибок"""
+    import asyncio
+    from async_dispatcher import AsyncDispatcherService
+    
+    dispatcher = AsyncDispatcherService(config.workers, logger, inventory_service,
+                                        result_sink, config.results)
+    await dispatcher.start_workers()
+    
+    commands_count = 0
+    inventory_count = 0
+    shutdown_mode = SHUTDOWN_DRAIN
+    try:
+        # Чтение файлов блокирующее, но короткое - команды сразу уходят в очередь
+        for cmd in iter_commands(command_files):
+            commands_count += 1
+            if cmd == 'inventory':
+                if await dispatcher.add_task(cmd):
+                    inventory_count += 1
+            else:
+                logger.info("⏭️  Команда '%s' проигнорирована (не inventory)", cmd)
+        
+        logger.info("📋 Прочитано команд: %s", commands_count)
+        logger.info("➕ Добавлено задач: %s", inventory_count)
+        
+        if inventory_count > 0:
+            logger.info("⏳ Ждём выполнения задач...")
+            await dispatcher.join()
+        else:
+            logger.warning("⚠️ Нет команд для выполнения")
+    except asyncio.CancelledError:
+        logger.warning("🛑 Прервано пользователем")
+        shutdown_mode = SHUTDOWN_CANCEL
+        raise
+    except Exception as e:
+        logger.error("❌ Ошибка при обработке команд: %s", e)
+        shutdown_mode = SHUTDOWN_CANCEL
+    finally:
+        await dispatcher.shutdown(shutdown_mode)
+    
+    return inventory_count, dispatcher.failed_tasks()
 
 def main():
     """Тут всё начинается"""
-    print_banner()
+    # Аргументы разбираем первыми: --help и ошибки в аргументах не ждут конфига и логгера
+    args = parse_arguments()
+    if not args.quiet:
+        print_banner()
     
+    exporter = None
+    profiler = None
+    tracer = None
     try:
         # Загружаем конфиг
-        log_config, workers_config = ConfigLoader.load_config()
+        config = ConfigLoader.load_config()
+        if args.no_cache:
+            config.inventory.cache_file = ""
         
         # Создаём сервисы через фабрику
-        logger = ServiceFactory.create_log_service(log_config)
-        inventory_service = ServiceFactory.create_inventory_service(logger)
+        logger = ServiceFactory.create_log_service(config.logging)
+        inventory_service = ServiceFactory.create_inventory_service(logger, config.inventory)
+        
+        # Метрики: textfile в каталоге логов и, если задан порт, /metrics на localhost
+        exporter = MetricsExporter(REGISTRY, config.metrics, config.logging.log_path, logger)
+        exporter.start()
         
         logger.info("="*50)
-        logger.info(f"🚀 Запуск на {platform.system()}")
+        logger.info("🚀 Запуск на %s", CURRENT_OS)
         logger.info("="*50)
         
-        # Парсим аргументы
-        try:
-            args = parse_arguments()
-            logger.info(f"📄 Файл с командами: {args.command_file}")
-        except SystemExit:
-            logger.error("❌ Неправильные аргументы командной строки")
-            return
-        except Exception as e:
-            logger.error(f"❌ Ошибка при разборе аргументов: {e}")
-            return
+        if args.command_files:
+            logger.info("📄 Файлы с командами: %s", lambda: ', '.join(args.command_files))
         
-        # Читаем команды
-        commands = read_commands(args.command_file)
-        logger.info(f"📋 Прочитано команд: {len(commands)}")
+        # Профилирование по флагам: отчёты пишутся в папку логов при выходе
+        if args.profile or args.trace_malloc:
+            from profiling import MemoryTracer, TaskProfiler
+        if args.profile:
+            profiler = TaskProfiler(config.logging.log_path, args.profile_every or 1, logger)
+        if args.trace_malloc:
+            tracer = MemoryTracer(config.logging.log_path, logger)
+            tracer.start()
         
-        if not commands:
-            logger.warning("⚠️ Нет команд для выполнения")
+        # Слежению диспетчер не нужен: сбор идёт только по событию, в одном потоке
+        if args.watch:
+            run_watch(args, inventory_service, logger)
+            logger.info("✅ Работа завершена")
             return
         
-        # Запускаем диспетчер
-        dispatcher = DispatcherService(workers_config, logger, inventory_service)
+        # Запускаем диспетчер заранее - команды пойдут в работу по мере чтения
+        result_sink = create_result_sink(config.results, config.logging.log_path)
+        
+        if config.workers.backend == 'asyncio':
+            if not args.spool and not args.daemon:
+                import asyncio
+                
+                try:
+                    # Все корутины в одном потоке - профилируем цикл целиком
+                    with profiler.task() if profiler else contextlib.nullcontext():
+                        inventory_count, errors = asyncio.run(
+                            run_asyncio(args.command_files, config, logger, inventory_service, result_sink)
+                        )
+                except KeyboardInterrupt:
+                    return
+                print_summary(inventory_count, errors=errors, latencies=REGISTRY.summary(),
+                              cache=_cache_stats(inventory_service))
+                logger.info("✅ Работа завершена")
+                return
+            logger.warning("Спул и демон работают на потоках, backend = asyncio для них не используется")
+        
+        process_backend = None
+        if config.workers.backend == 'processes':
+            from process_backend import ProcessPoolBackend
+            process_backend = ProcessPoolBackend(config.logging, config.inventory)
+        dispatcher = DispatcherService(config.workers, logger, inventory_service,
+                                       result_sink, config.results, process_backend, profiler)
         dispatcher.start_workers()
         
-        # Обрабатываем команды
+        if args.spool:
+            run_spool(args, dispatcher, logger)
+            logger.info("✅ Работа завершена")
+            return
+        
+        if args.daemon:
+            run_daemon(args, config, dispatcher, logger)
+            logger.info("✅ Работа завершена")
+            return
+        
+        # Потоково читаем и раздаём команды; на полной очереди читатель ждёт воркеров
+        commands_count = 0
         inventory_count = 0
-        for cmd in commands:
-            if cmd == 'inventory':
-                if dispatcher.add_task(cmd):
-                    inventory_count += 1
+        shutdown_mode = SHUTDOWN_DRAIN
+        try:
+            for cmd in iter_commands(args.command_files):
+                commands_count += 1
+                if cmd == 'inventory':
+                    if dispatcher.add_task(cmd):
+                        inventory_count += 1
+                else:
+                    logger.info("⏭️  Команда '%s' проигнорирована (не inventory)", cmd)
+            
+            logger.info("📋 Прочитано команд: %s", commands_count)
+            logger.info("➕ Добавлено задач: %s", inventory_count)
+            
+            # Ждём выполнения
+            if inventory_count > 0:
+                logger.info("⏳ Ждём выполнения задач...")
+                dispatcher.join()
             else:
-                logger.info(f"⏭️  Команда '{cmd}' проигнорирована (не inventory)")
-        
-        logger.info(f"➕ Добавлено задач: {inventory_count}")
+                logger.warning("⚠️ Нет команд для выполнения")
+        except KeyboardInterrupt:
+            logger.warning("🛑 Прервано пользователем")
+            shutdown_mode = SHUTDOWN_CANCEL
+        except Exception as e:
+            logger.error("❌ Ошибка при обработке команд: %s", e)
+            shutdown_mode = SHUTDOWN_CANCEL
+        finally:
+            dispatcher.shutdown(shutdown_mode)
         
-        # Ждём выполнения
-        if inventory_count > 0:
-            logger.info("⏳ Ждём выполнения задач...")
-            try:
-                dispatcher.task_queue.join()
-            except KeyboardInterrupt:
-                logger.warning("🛑 Прервано пользователем")
-            except Exception as e:
-                logger.error(f"❌ Ошибка при ожидании: {e}")
-            finally:
-                dispatcher.shutdown()
-        
-        print_summary(inventory_count)
+        print_summary(inventory_count, errors=dispatcher.failed_tasks(), latencies=REGISTRY.summary(),
+                      cache=_cache_stats(inventory_service))
         logger.info("✅ Работа завершена")
         
     except OSError as e:
@@ -85,6 +243,13 @@ def main():
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        if tracer is not None:
+            tracer.stop()
+        if profiler is not None:
+            profiler.dump()
+        if exporter is not None:
+            exporter.stop()
 
 if __name__ == "__main__":
     main()
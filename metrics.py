@@ -0,0 +1,324 @@
+"""
+Метрики агента: счётчики, шкалы и гистограммы в одном реестре.
+Выгрузка - текстовый файл в формате Prometheus (для node_exporter textfile collector)
+и, по желанию, HTTP /metrics только на localhost.
+"""
+import bisect
+import contextlib
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from datacls_models import MetricsConfig
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+# Границы корзин по умолчанию (секунды): от 100 мкс до 10 с
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Перцентили считаем по последним замерам, а не по всей истории
+SAMPLE_LIMIT = 10000
+SUMMARY_QUANTILES = (0.5, 0.95, 0.99)
+HTTP_HOST = '127.0.0.1'
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+        # Значение, которое считается в момент выгрузки (глубина очереди и т.п.)
+        self._functions: Dict[LabelKey, Callable[[], float]] = {}
+
+    def set_function(self, fn: Callable[[], float], **labels):
+        with self._lock:
+            self._functions[_label_key(labels)] = fn
+
+    def _function_values(self) -> List[Tuple[LabelKey, float]]:
+        with self._lock:
+            functions = list(self._functions.items())
+        values = []
+        for key, fn in functions:
+            try:
+                values.append((key, float(fn())))
+            except Exception:
+                continue
+        return values
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Только растёт"""
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0.0)
+
+    def values(self) -> Dict[LabelKey, float]:
+        with self._lock:
+            values = dict(self._values)
+        values.update(self._function_values())
+        return values
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for key, value in sorted(self.values().items()):
+            lines.append(f"{self.name}{_format_labels(key)} {value:g}")
+        return lines
+
+
+class Gauge(Counter):
+    """Текущее значение: может и расти, и падать"""
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class _HistogramSeries:
+    __slots__ = ('buckets', 'count', 'sum', 'samples')
+
+    def __init__(self, bounds: int):
+        self.buckets = [0] * bounds
+        self.count = 0
+        self.sum = 0.0
+        self.samples: deque = deque(maxlen=SAMPLE_LIMIT)
+
+
+class Histogram(_Metric):
+    """Распределение значений: корзины для Prometheus и окно замеров для перцентилей"""
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.bounds = tuple(sorted(buckets))
+        self._series: Dict[LabelKey, _HistogramSeries] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _HistogramSeries(len(self.bounds))
+            if index < len(self.bounds):
+                series.buckets[index] += 1
+            series.count += 1
+            series.sum += value
+            series.samples.append(value)
+
+    @contextlib.contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Замеряем блок кода"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """count, среднее и перцентили по каждому набору меток"""
+        with self._lock:
+            snapshot = {key: (series.count, series.sum, sorted(series.samples))
+                        for key, series in self._series.items()}
+        result = {}
+        for key, (count, total, samples) in snapshot.items():
+            if not count:
+                continue
+            label = ','.join(v for _, v in key) or '-'
+            stats = {'count': count, 'avg': total / count}
+            for q in SUMMARY_QUANTILES:
+                stats[f"p{int(q * 100)}"] = samples[min(len(samples) - 1, int(q * len(samples)))]
+            result[label] = stats
+        return result
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            snapshot = sorted((key, list(s.buckets), s.count, s.sum) for key, s in self._series.items())
+        for key, buckets, count, total in snapshot:
+            cumulative = 0
+            for bound, hits in zip(self.bounds, buckets):
+                cumulative += hits
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total:g}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Все метрики процесса; повторный запрос по имени отдаёт ту же метрику"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help_text: str, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str = '') -> Counter:
+        return self._get_or_create(Counter, name, help_text)
+
+    def gauge(self, name: str, help_text: str = '') -> Gauge:
+        return self._get_or_create(Gauge, name, help_text)
+
+    def histogram(self, name: str, help_text: str = '', buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, buckets=buckets)
+
+    def render_prometheus(self) -> str:
+        """Текстовый формат Prometheus 0.0.4"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path: Path):
+        """Атомарно: textfile collector не должен прочитать половину файла"""
+        import tempfile
+        
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(self.render_prometheus())
+            os.replace(tmp_path, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+            raise
+
+    def summary(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Перцентили всех гистограмм - для итога работы"""
+        with self._lock:
+            histograms = [m for m in self._metrics.values() if isinstance(m, Histogram)]
+        result = {}
+        for histogram in sorted(histograms, key=lambda m: m.name):
+            summary = histogram.summary()
+            if summary:
+                result[histogram.name] = summary
+        return result
+
+
+# Реестр процесса: сервисы и диспетчер пишут сюда, выгрузка читает отсюда
+REGISTRY = MetricsRegistry()
+
+
+class MetricsExporter:
+    """Периодически пишет textfile и (если включено) отдаёт /metrics на localhost"""
+
+    def __init__(self, registry: MetricsRegistry, config: MetricsConfig, log_path: str, logger=None):
+        self.registry = registry
+        self.config = config
+        self.logger = logger
+        self.textfile = Path(log_path) / config.textfile if config.textfile else None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._server: Optional['ThreadingHTTPServer'] = None
+
+    def start(self):
+        if self.textfile is not None and self.config.export_interval > 0:
+            self._thread = threading.Thread(target=self._export_loop, name="MetricsExporter", daemon=True)
+            self._thread.start()
+        if self.config.http_port:
+            self._start_http()
+
+    def _export_loop(self):
+        while not self._stop.wait(self.config.export_interval):
+            self._write_textfile()
+
+    def _write_textfile(self):
+        try:
+            self.registry.write_textfile(self.textfile)
+        except OSError as e:
+            if self.logger is not None:
+                self.logger.error("Не удалось записать метрики в %s: %s", self.textfile, e)
+
+    def _start_http(self):
+        # http.server тянет за собой email/socket - грузим только при включённом порте
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        try:
+            # Только localhost - наружу метрики не светим
+            self._server = ThreadingHTTPServer((HTTP_HOST, self.config.http_port), Handler)
+        except OSError as e:
+            if self.logger is not None:
+                self.logger.error("Не удалось поднять /metrics на порту %s: %s", self.config.http_port, e)
+            return
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="MetricsHTTP", daemon=True).start()
+        if self.logger is not None:
+            self.logger.info("📈 Метрики: http://%s:%s/metrics", HTTP_HOST, self._server.server_port)
+
+    def stop(self):
+        """Останавливаемся и пишем финальный снимок"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.config.export_interval)
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        if self.textfile is not None:
+            self._write_textfile()
@@ -0,0 +1,215 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional
+
+from interfaces import BaseLogService
+from metrics import REGISTRY
+
+PAYLOAD_FORMATS = ('pretty', 'compact', 'jsonl')
+
+# Поля диагностики, которые меняются на каждой задаче и не делают payload "новым"
+VOLATILE_DIAGNOSTIC_KEYS = ('timestamp', 'probe_cache')
+
+DEFAULT_FILE_MODE = 0o644
+
+SERIALIZE_SECONDS = REGISTRY.histogram('collector_payload_serialize_seconds', 'Сериализация payload')
+WRITE_SECONDS = REGISTRY.histogram('collector_payload_write_seconds', 'Запись payload на диск')
+
+
+class EncodedPayload(NamedTuple):
+    """Готовый к записи payload: ключ для сравнения и байты"""
+    content_key: str
+    data: bytes
+
+
+class PayloadWriter:
+    """
+    Единственный писатель payload-файла.
+    Воркеры только отдают свежий payload, пишет его один поток:
+    - ожидающий payload один - если воркеры обогнали диск, пишем только последний
+    - pretty/compact пишутся атомарно: временный файл + fsync + rename
+    - jsonl дописывает по строке на каждый изменившийся payload
+    - если содержимое не изменилось с прошлой записи, диск не трогаем
+    """
+
+    def __init__(self, output_file: Path, logger: BaseLogService, payload_format: str = 'pretty',
+                 fallback_file: Optional[Path] = None):
+        self.payload_format = payload_format if payload_format in PAYLOAD_FORMATS else 'pretty'
+        self.output_file = Path(output_file)
+        if self.payload_format == 'jsonl':
+            self.output_file = self.output_file.with_suffix('.jsonl')
+        self.fallback_file = Path(fallback_file) if fallback_file else None
+        if self.fallback_file and self.payload_format == 'jsonl':
+            self.fallback_file = self.fallback_file.with_suffix('.jsonl')
+        self.logger = logger
+
+        self.submitted = 0
+        self.coalesced = 0
+        self.written = 0
+        self.skipped_identical = 0
+        self.write_errors = 0
+        self.bytes_written = 0
+        self.write_time = 0.0
+
+        self._pending: Optional[Dict[str, Any]] = None
+        self._busy = False
+        self._closed = False
+        self._last_content: Optional[str] = None
+        self._cond = threading.Condition()
+        # Пишет либо свой поток, либо стадия persist конвейера - не одновременно
+        self._write_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._writer_loop, name="PayloadWriter", daemon=True)
+        self._thread.start()
+
+    def submit(self, payload: Dict[str, Any]):
+        """Отдаём payload на запись, не дожидаясь диска"""
+        with self._cond:
+            if self._closed:
+                return
+            self.submitted += 1
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = payload
+            self._cond.notify_all()
+
+    def flush(self, timeout: float = 5):
+        """Ждём, пока ожидающий payload окажется на диске"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._pending is not None or self._busy:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                self._cond.wait(remaining)
+
+    def close(self, timeout: float = 5):
+        """Дописываем последнее и останавливаем поток"""
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout=timeout)
+
+    def _writer_loop(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                payload, self._pending = self._pending, None
+                self._busy = True
+
+            try:
+                self._write(payload)
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    @staticmethod
+    def _content_key(payload: Dict[str, Any]) -> str:
+        """Содержимое payload без меняющихся на каждой задаче полей"""
+        import json
+
+        stable = dict(payload)
+        diagnostic = stable.get('_diagnostic')
+        if isinstance(diagnostic, dict):
+            stable['_diagnostic'] = {k: v for k, v in diagnostic.items() if k not in VOLATILE_DIAGNOSTIC_KEYS}
+        return json.dumps(stable, ensure_ascii=False, sort_keys=True)
+
+    def encode(self, payload: Dict[str, Any]) -> EncodedPayload:
+        """Сериализация отдельно от записи - её можно делать в другом потоке"""
+        import json
+
+        with SERIALIZE_SECONDS.time(format=self.payload_format):
+            if self.payload_format == 'pretty':
+                data = json.dumps(payload, ensure_ascii=False, indent=2)
+            else:
+                data = json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+            return EncodedPayload(self._content_key(payload), data.encode('utf-8'))
+
+    def _write(self, payload: Dict[str, Any]):
+        self.write_encoded(self.encode(payload))
+
+    def write_encoded(self, payload: EncodedPayload):
+        """Синхронная запись уже сериализованного payload"""
+        with self._write_lock:
+            self._write_locked(payload)
+
+    def _write_locked(self, payload: EncodedPayload):
+        content, encoded = payload
+        if content == self._last_content:
+            self.skipped_identical += 1
+            return
+
+        started = time.monotonic()
+        try:
+            target = self._write_to(self.output_file, encoded)
+        except OSError as e:
+            if self.fallback_file is None:
+                self.write_errors += 1
+                self.logger.error("Ошибка при сохранении файла: %s", e)
+                return
+            try:
+                target = self._write_to(self.fallback_file, encoded)
+                self.logger.warning("Нет прав на запись, сохранили в %s", target)
+            except OSError as fallback_error:
+                self.write_errors += 1
+                self.logger.error("Ошибка при сохранении файла: %s", fallback_error)
+                return
+        finally:
+            elapsed = time.monotonic() - started
+            self.write_time += elapsed
+            WRITE_SECONDS.observe(elapsed)
+
+        self._last_content = content
+        self.written += 1
+        self.bytes_written += len(encoded)
+        self.logger.info("Результат сохранён в %s", target)
+
+    def _write_to(self, path: Path, encoded: bytes) -> Path:
+        if self.payload_format == 'jsonl':
+            with open(path, 'ab') as f:
+                f.write(encoded + b'\n')
+            return path
+
+        # Пишем рядом во временный файл и атомарно подменяем - читатель никогда не увидит половину
+        import tempfile  # тянет shutil/random/bz2/lzma - не на старте
+        
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+        try:
+            # mkstemp создаёт 0600 - оставляем права, как у обычного файла (в Windows fchmod нет)
+            if hasattr(os, 'fchmod'):
+                try:
+                    mode = os.stat(path).st_mode & 0o777
+                except OSError:
+                    mode = DEFAULT_FILE_MODE
+                os.fchmod(fd, mode)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(encoded)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        return path
+
+    def stats(self) -> Dict[str, Any]:
+        """Сколько раз реально писали на диск и во что это обошлось"""
+        return {
+            'format': self.payload_format,
+            'submitted': self.submitted,
+            'written': self.written,
+            'coalesced': self.coalesced,
+            'skipped_identical': self.skipped_identical,
+            'write_errors': self.write_errors,
+            'bytes_written': self.bytes_written,
+            'write_time': round(self.write_time, 4),
+        }
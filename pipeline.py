@@ -0,0 +1,154 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from interfaces import BaseLogService
+from metrics import REGISTRY
+
+# Маркер остановки стадии
+_STOP = None
+
+STAGE_SECONDS = REGISTRY.histogram('collector_stage_seconds', 'Время задачи в стадии')
+STAGE_WAIT_SECONDS = REGISTRY.histogram('collector_stage_wait_seconds', 'Ожидание перед стадией')
+
+
+class StageStats:
+    """Сколько задач прошла стадия, сколько они ждали перед ней и сколько в ней работали"""
+
+    def __init__(self, name: str = ''):
+        self.name = name
+        self.processed = 0
+        self.errors = 0
+        self.busy_time = 0.0
+        self.latency_max = 0.0
+        self.wait_time = 0.0
+        self.depth_max = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, wait: float = 0.0, failed: bool = False):
+        STAGE_SECONDS.observe(latency, stage=self.name)
+        if wait:
+            STAGE_WAIT_SECONDS.observe(wait, stage=self.name)
+        with self._lock:
+            self.processed += 1
+            if failed:
+                self.errors += 1
+            self.busy_time += latency
+            self.latency_max = max(self.latency_max, latency)
+            self.wait_time += wait
+
+    def observe_depth(self, depth: int):
+        if depth > self.depth_max:
+            with self._lock:
+                self.depth_max = max(self.depth_max, depth)
+
+    def snapshot(self, depth: int, concurrency: int) -> Dict[str, Any]:
+        with self._lock:
+            processed = self.processed
+            return {
+                'concurrency': concurrency,
+                'processed': processed,
+                'errors': self.errors,
+                'depth': depth,
+                'depth_max': self.depth_max,
+                'latency_avg': round(self.busy_time / processed, 4) if processed else 0.0,
+                'latency_max': round(self.latency_max, 4),
+                'wait_avg': round(self.wait_time / processed, 4) if processed else 0.0,
+            }
+
+
+class Stage:
+    """
+    Одна стадия конвейера: своя ограниченная очередь и свои потоки.
+    handler(item) возвращает то, что уходит в следующую стадию; на полной очереди
+    следующей стадии поток ждёт - обратное давление доходит до сбора.
+    on_error(item, exc) вызывается, если handler упал; элемент дальше не идёт.
+    """
+
+    def __init__(self, name: str, handler: Callable[[Any], Any], logger: BaseLogService,
+                 concurrency: int = 1, queue_size: int = 100,
+                 on_error: Optional[Callable[[Any, BaseException], None]] = None):
+        self.name = name
+        self.handler = handler
+        self.logger = logger
+        self.concurrency = max(1, concurrency)
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.on_error = on_error
+        self.next_stage: Optional['Stage'] = None
+        self.stats = StageStats(name)
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        for i in range(self.concurrency):
+            thread = threading.Thread(target=self._loop, name=f"{self.name}-{i+1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def put(self, item: Any):
+        self.queue.put((time.monotonic(), item))
+        self.stats.observe_depth(self.queue.qsize())
+
+    def _loop(self):
+        while True:
+            entry = self.queue.get()
+            if entry is _STOP:
+                self.queue.task_done()
+                return
+
+            enqueued, item = entry
+            started = time.monotonic()
+            failed = False
+            try:
+                result = self.handler(item)
+                if self.next_stage is not None:
+                    self.next_stage.put(result)
+            except Exception as e:
+                failed = True
+                self.logger.error("Стадия %s упала: %s", self.name, e)
+                if self.on_error is not None:
+                    self.on_error(item, e)
+            finally:
+                self.stats.record(time.monotonic() - started, started - enqueued, failed)
+                self.queue.task_done()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Доделываем очередь стадии и останавливаем потоки"""
+        for _ in self._threads:
+            self.queue.put(_STOP)
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def snapshot(self) -> Dict[str, Any]:
+        return self.stats.snapshot(self.queue.qsize(), self.concurrency)
+
+
+class Pipeline:
+    """Цепочка стадий: выход каждой уходит во вход следующей"""
+
+    def __init__(self, stages: List[Stage]):
+        self.stages = stages
+        for current, following in zip(stages, stages[1:]):
+            current.next_stage = following
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def submit(self, item: Any):
+        """Отдаём элемент в первую стадию (ждём места, если она забита)"""
+        self.stages[0].put(item)
+
+    def join(self):
+        """Ждём, пока всё отданное пройдёт все стадии"""
+        for stage in self.stages:
+            stage.queue.join()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Останавливаем стадии по порядку - каждая успевает дописать в следующую"""
+        for stage in self.stages:
+            stage.stop(timeout)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {stage.name: stage.snapshot() for stage in self.stages}
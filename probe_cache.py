@@ -0,0 +1,111 @@
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class ProbeCache:
+    """
+    Кэш проб системных файлов.
+    Результат разбора файла живёт, пока у файла не поменялись
+    inode, mtime, size и ctime (ctime ловит chmod/chown без изменения содержимого).
+    Имена пользователей и групп по uid/gid запоминаем навсегда.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], Tuple[tuple, Any]] = {}
+        self._users: Dict[int, str] = {}
+        self._groups: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(st: os.stat_result) -> tuple:
+        """Отпечаток файла - по нему понимаем, что файл не менялся"""
+        return (st.st_ino, st.st_mtime_ns, st.st_size, st.st_ctime_ns)
+
+    @staticmethod
+    def stat(path: str) -> Optional[os.stat_result]:
+        """stat без исключений - None, если файла нет или он недоступен"""
+        try:
+            return os.stat(path)
+        except OSError:
+            return None
+
+    def _lookup(self, key: Tuple[str, str], fp: tuple, compute: Callable[[], Any]) -> Any:
+        """Берём значение из кэша или считаем заново"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == fp:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = (fp, value)
+        return value
+
+    def access(self, path: str, st: os.stat_result) -> bool:
+        """os.access(R_OK), пересчитываем только если файл поменялся"""
+        return self._lookup((path, 'access'), self.fingerprint(st), lambda: os.access(path, os.R_OK))
+
+    def read(self, path: str, parser: Callable[[str], Any], name: str = 'raw',
+             st: Optional[os.stat_result] = None) -> Any:
+        """
+        Читаем и разбираем файл парсером.
+        Один и тот же файл можно разбирать разными парсерами - различаем их по name.
+        Ошибки чтения (OSError, UnicodeDecodeError) пробрасываются наружу.
+        """
+        st = st or os.stat(path)
+
+        def compute():
+            with open(path, 'r', encoding='utf-8') as f:
+                return parser(f.read())
+
+        return self._lookup((path, name), self.fingerprint(st), compute)
+
+    def user_name(self, uid: int) -> str:
+        """Имя пользователя по uid - NSS дёргаем один раз"""
+        name = self._users.get(uid)
+        if name is None:
+            import pwd
+            try:
+                name = pwd.getpwuid(uid).pw_name
+            except KeyError:
+                name = str(uid)
+            self._users[uid] = name
+        return name
+
+    def group_name(self, gid: int) -> str:
+        """Имя группы по gid - NSS дёргаем один раз"""
+        name = self._groups.get(gid)
+        if name is None:
+            import grp
+            try:
+                name = grp.getgrgid(gid).gr_name
+            except KeyError:
+                name = str(gid)
+            self._groups[gid] = name
+        return name
+
+    def invalidate(self, path: Optional[str] = None):
+        """Сбрасываем кэш файла (или весь кэш, включая имена пользователей)"""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._users.clear()
+                self._groups.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == path]:
+                    del self._entries[key]
+
+    def stats(self) -> Dict[str, int]:
+        """Попадания и промахи кэша"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self._entries),
+        }
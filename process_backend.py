@@ -0,0 +1,222 @@
+import dataclasses
+import logging
+import logging.handlers
+import multiprocessing
+import queue
+import threading
+import time
+from typing import Any, List, Optional, Tuple
+
+from cancellation import CancellationToken, TaskCancelled, current_token
+from datacls_models import InventoryConfig, InventoryResult, LogConfig
+
+PROCESS_START_TIMEOUT = 30
+PROCESS_STOP_TIMEOUT = 5
+# Как часто задача с дедлайном проверяет отмену, пока ждёт процесс или его ответ
+CANCEL_CHECK_INTERVAL = 0.1
+
+
+class _PipeLogHandler(logging.handlers.QueueHandler):
+    """
+    Записи лога ребёнка едут родителю по тому же pipe, что и ответы.
+    Свой pipe у каждого процесса: убитый посреди записи ребёнок не заблокирует логи остальных
+    """
+
+    def enqueue(self, record: logging.LogRecord):
+        self.queue.send(('log', record))
+
+
+def _child_main(conn, log_config: LogConfig, inventory_config: InventoryConfig):
+    """
+    Тело дочернего процесса: один раз поднимаем логгер и сборщик
+    и дальше только отвечаем на запросы - кэши сборщика живут между задачами.
+    Ни файла, ни консоли: в log.txt пишет (и ротирует его) только родитель
+    """
+    from collector import LibraryLogService
+    from interfaces import LOG_LEVELS
+    from service_factory import ServiceFactory
+
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVELS.get(log_config.level.lower(), logging.INFO))
+    root.addHandler(_PipeLogHandler(conn))
+    logger = LibraryLogService(log_config)
+    service = ServiceFactory.create_inventory_service(logger, inventory_config)
+    conn.send(('ready', None))
+
+    try:
+        while True:
+            try:
+                request = conn.recv()
+            except EOFError:
+                break
+            if request is None:
+                break
+            try:
+                conn.send(('ok', service.collect_os_info()))
+            except Exception as e:
+                conn.send(('error', repr(e)))
+    finally:
+        service.close()
+        conn.close()
+
+
+class ProcessWorker:
+    """Прогретый процесс-сборщик и pipe к нему"""
+
+    def __init__(self, ctx, log_config: LogConfig, inventory_config: InventoryConfig):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_child_main,
+            args=(child_conn, log_config, inventory_config),
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+    def wait_ready(self, timeout: float = PROCESS_START_TIMEOUT):
+        """Ждём, пока процесс поднимет сборщик"""
+        deadline = time.monotonic() + timeout
+        while True:
+            if not self.conn.poll(max(0.0, deadline - time.monotonic())):
+                raise RuntimeError(f"Процесс {self.process.pid} не поднялся за {timeout} с")
+            status, value = self.conn.recv()
+            if status != 'log':
+                return
+            self._forward_log(value)
+
+    def collect(self, token: Optional[CancellationToken] = None) -> InventoryResult:
+        """
+        Один сбор в дочернем процессе; по pipe едет результат и записи лога.
+        С токеном ждём ответ кусками и выходим по отмене (TaskCancelled) - процесс мог зависнуть
+        """
+        self.conn.send('collect')
+        status, value = self._reply(token)
+        if status != 'ok':
+            raise RuntimeError(f"Сбор в процессе {self.process.pid} упал: {value}")
+        return value
+
+    def _reply(self, token: Optional[CancellationToken]) -> Tuple[str, Any]:
+        """Ответ процесса; записи лога, пришедшие до него, отдаём логгерам родителя"""
+        while True:
+            if token is not None and token.deadline is not None:
+                while not self.conn.poll(CANCEL_CHECK_INTERVAL):
+                    token.raise_if_cancelled()
+            status, value = self.conn.recv()
+            if status != 'log':
+                return status, value
+            self._forward_log(value)
+
+    @staticmethod
+    def _forward_log(record: logging.LogRecord):
+        # Уровень уже отфильтрован в ребёнке - handle() сразу отдаёт запись обработчикам родителя
+        logging.getLogger(record.name).handle(record)
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=PROCESS_STOP_TIMEOUT)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+
+    def kill(self):
+        """Зависший процесс вежливо не остановить - сразу SIGKILL"""
+        self.process.kill()
+        self.process.join(timeout=PROCESS_STOP_TIMEOUT)
+        self.conn.close()
+
+
+class ProcessPoolBackend:
+    """
+    Пул прогретых процессов для collect_os_info - обходим GIL на тяжёлых сборщиках.
+    Воркер-поток диспетчера берёт свободный процесс, отдаёт ему задачу и возвращает обратно.
+    """
+
+    def __init__(self, log_config: LogConfig, inventory_config: InventoryConfig):
+        # spawn - не тащим в детей потоки и блокировки родителя
+        self._ctx = multiprocessing.get_context('spawn')
+        self.log_config = log_config
+        # Дети только собирают: payload и тёплый кэш ведёт родитель, свой PayloadWriter им не нужен
+        self.inventory_config = dataclasses.replace(inventory_config, write_payload=False, cache_file="")
+        self._idle: queue.Queue = queue.Queue()
+        self._workers: List[ProcessWorker] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self.processes_killed = 0
+
+    def start(self, count: int):
+        """Поднимаем процессы разом и ждём, пока все прогреются"""
+        started = [ProcessWorker(self._ctx, self.log_config, self.inventory_config) for _ in range(count)]
+        for worker in started:
+            worker.wait_ready()
+            self._idle.put(worker)
+        with self._lock:
+            self._workers.extend(started)
+
+    def collect(self) -> InventoryResult:
+        token = current_token()
+        worker = self._borrow(token)
+        try:
+            return worker.collect(token)
+        except TaskCancelled:
+            # Задачу отменил сторож: процесс, скорее всего, завис - без замены пул бы усыхал
+            self.processes_killed += 1
+            worker = self._replace(worker, kill=True)
+            raise
+        except (EOFError, OSError) as e:
+            # Процесс умер - меняем его на свежий, задачу считаем упавшей
+            worker = self._replace(worker)
+            raise RuntimeError(f"Процесс-сборщик упал: {e!r}") from e
+        finally:
+            self._idle.put(worker)
+
+    def _borrow(self, token: Optional[CancellationToken]) -> ProcessWorker:
+        """Свободный процесс; задача с дедлайном не ждёт его дольше своего срока"""
+        if token is None or token.deadline is None:
+            return self._idle.get()
+        while True:
+            try:
+                return self._idle.get(timeout=CANCEL_CHECK_INTERVAL)
+            except queue.Empty:
+                token.raise_if_cancelled()
+
+    def shrink(self, count: int):
+        """Гасим до count свободных процессов (занятые не трогаем)"""
+        for _ in range(count):
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            with self._lock:
+                if worker in self._workers:
+                    self._workers.remove(worker)
+            worker.close()
+
+    def _replace(self, dead: ProcessWorker, kill: bool = False) -> ProcessWorker:
+        if kill:
+            dead.kill()
+        else:
+            dead.close()
+        if self._closed:
+            # Пул уже остановлен - замена не нужна
+            return dead
+        worker = ProcessWorker(self._ctx, self.log_config, self.inventory_config)
+        worker.wait_ready()
+        with self._lock:
+            if dead in self._workers:
+                self._workers.remove(dead)
+            self._workers.append(worker)
+        return worker
+
+    @property
+    def size(self) -> int:
+        return len(self._workers)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.close()
@@ -0,0 +1,194 @@
+"""
+Профилирование по флагам main.py:
+- TaskProfiler - cProfile в каждом потоке-воркере (или только на каждой N-й задаче),
+  при остановке профили потоков сливаются в один .pstats и краткий .json
+- MemoryTracer - снимки tracemalloc до и после пачки задач, топ мест выделения памяти в .json
+Файлы пишутся в папку логов.
+"""
+import contextlib
+import cProfile
+import itertools
+import json
+import pstats
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+# Сколько строк отдаём в json-отчёт
+TOP_FUNCTIONS = 50
+TOP_ALLOCATIONS = 25
+# Глубина стека tracemalloc: 1 кадр - дёшево и достаточно для топа по строкам
+TRACEMALLOC_FRAMES = 1
+
+
+def _report_path(log_path: str, prefix: str, suffix: str) -> Path:
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    path = Path(log_path) / f"{prefix}-{stamp}{suffix}"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+class TaskProfiler:
+    """
+    cProfile на каждый поток: один профиль на поток, он включается только на время задачи.
+    every = N - профилируем каждую N-ю задачу, остальные идут без накладных расходов.
+    """
+
+    def __init__(self, log_path: str, every: int = 1, logger=None):
+        self.log_path = log_path
+        self.every = max(1, every)
+        self.logger = logger
+        self._local = threading.local()
+        self._profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self.tasks_seen = 0
+        self.tasks_profiled = 0
+
+    def _thread_profile(self) -> cProfile.Profile:
+        profile = getattr(self._local, 'profile', None)
+        if profile is None:
+            profile = self._local.profile = cProfile.Profile()
+            with self._lock:
+                self._profiles.append(profile)
+        return profile
+
+    @contextlib.contextmanager
+    def task(self) -> Iterator[None]:
+        """Оборачиваем выполнение одной задачи"""
+        number = next(self._counter)
+        sampled = number % self.every == 0
+        with self._lock:
+            self.tasks_seen += 1
+            self.tasks_profiled += sampled
+        if not sampled:
+            yield
+            return
+
+        profile = self._thread_profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # В этом потоке уже работает другой профилировщик - не мешаем ему
+            yield
+            return
+        try:
+            yield
+        finally:
+            profile.disable()
+
+    def merged(self) -> Optional[pstats.Stats]:
+        """Сливаем профили всех потоков"""
+        with self._lock:
+            profiles = list(self._profiles)
+        stats = None
+        for profile in profiles:
+            try:
+                if stats is None:
+                    stats = pstats.Stats(profile)
+                else:
+                    stats.add(profile)
+            except TypeError:
+                # Поток не профилировал ни одной задачи - пустой профиль
+                continue
+        return stats
+
+    def dump(self) -> Optional[Path]:
+        """Пишем profile-*.pstats (для pstats/snakeviz) и profile-*.json с топом функций"""
+        stats = self.merged()
+        if stats is None:
+            if self.logger is not None:
+                self.logger.warning("Профиль пуст: ни одна задача не попала под профилирование")
+            return None
+
+        pstats_path = _report_path(self.log_path, 'profile', '.pstats')
+        stats.dump_stats(pstats_path)
+
+        report = {
+            'created': datetime.now().isoformat(),
+            'every': self.every,
+            'tasks_seen': self.tasks_seen,
+            'tasks_profiled': self.tasks_profiled,
+            'threads': len(self._profiles),
+            'total_time': round(stats.total_tt, 6),
+            'functions': self._top_functions(stats),
+        }
+        json_path = pstats_path.with_suffix('.json')
+        json_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+        if self.logger is not None:
+            self.logger.info("🔬 Профиль: %s (%s из %s задач)", json_path, self.tasks_profiled, self.tasks_seen)
+        return json_path
+
+    @staticmethod
+    def _top_functions(stats: pstats.Stats) -> List[Dict[str, Any]]:
+        rows = []
+        for (filename, line, name), (cc, nc, tt, ct, _) in stats.stats.items():
+            rows.append({
+                'function': name,
+                'file': filename,
+                'line': line,
+                'calls': nc,
+                'primitive_calls': cc,
+                'tottime': round(tt, 6),
+                'cumtime': round(ct, 6),
+            })
+        rows.sort(key=lambda row: row['cumtime'], reverse=True)
+        return rows[:TOP_FUNCTIONS]
+
+
+class MemoryTracer:
+    """Снимки tracemalloc до и после пачки задач"""
+
+    def __init__(self, log_path: str, logger=None):
+        self.log_path = log_path
+        self.logger = logger
+        self._before: Optional[tracemalloc.Snapshot] = None
+        self._started = 0.0
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        self._before = tracemalloc.take_snapshot()
+        self._started = time.monotonic()
+
+    def stop(self) -> Optional[Path]:
+        """Снимаем второй снимок и пишем tracemalloc-*.json: прирост по строкам и общий топ"""
+        if self._before is None:
+            return None
+        after = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # Свои же выделения tracemalloc в отчёт не тянем
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        before = self._before.filter_traces(filters)
+        after = after.filter_traces(filters)
+
+        report = {
+            'created': datetime.now().isoformat(),
+            'duration': round(time.monotonic() - self._started, 3),
+            'traced_current': current,
+            'traced_peak': peak,
+            'growth': [self._stat_row(stat, diff=True)
+                       for stat in after.compare_to(before, 'lineno')[:TOP_ALLOCATIONS]],
+            'top': [self._stat_row(stat)
+                    for stat in after.statistics('lineno')[:TOP_ALLOCATIONS]],
+        }
+        path = _report_path(self.log_path, 'tracemalloc', '.json')
+        path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+        self._before = None
+        if self.logger is not None:
+            self.logger.info("🧠 Память: %s (пик %.1f КБ)", path, peak / 1024)
+        return path
+
+    @staticmethod
+    def _stat_row(stat, diff: bool = False) -> Dict[str, Any]:
+        frame = stat.traceback[0]
+        row = {'file': frame.filename, 'line': frame.lineno, 'size': stat.size, 'count': stat.count}
+        if diff:
+            row['size_diff'] = stat.size_diff
+            row['count_diff'] = stat.count_diff
+        return row
@@ -0,0 +1,149 @@
+import queue
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from interfaces import BaseLogService, BaseResultSink
+from datacls_models import ResultsConfig
+
+# Маркер остановки - кладём в очередь, чтобы разбудить сборщик
+_STOP = object()
+
+
+class JsonlResultSink(BaseResultSink):
+    """Пишем результаты построчно в JSONL-файл"""
+
+    def __init__(self, file_path: Path):
+        self.file_path = Path(file_path)
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.file_path, 'a', encoding='utf-8')
+
+    def write_batch(self, records: List[Dict[str, Any]]):
+        import json
+
+        lines = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+        self._file.write(lines)
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class MemoryResultSink(BaseResultSink):
+    """Держим результаты в памяти - для тестов и встраивания"""
+
+    def __init__(self, max_records: Optional[int] = None):
+        self.records = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+
+    def write_batch(self, records: List[Dict[str, Any]]):
+        with self._lock:
+            self.records.extend(records)
+
+    def get_records(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self.records)
+
+
+def create_result_sink(config: ResultsConfig, log_path: str) -> BaseResultSink:
+    """Создаём приёмник результатов по настройкам из конфига"""
+    if config.sink == 'memory':
+        return MemoryResultSink()
+    return JsonlResultSink(Path(log_path) / config.file_name)
+
+
+class ResultSinkService:
+    """Отдельный поток, который вычерпывает очередь результатов и пишет их пачками"""
+
+    def __init__(self, result_queue: queue.Queue, sink: BaseResultSink, logger: BaseLogService,
+                 batch_size: int = 50, flush_interval: float = 1.0):
+        self.result_queue = result_queue
+        self.sink = sink
+        self.logger = logger
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self.records_written = 0
+        self.batches_written = 0
+        self.write_errors = 0
+        self.write_time = 0.0
+        self._started_at = None
+        self._stopped_at = None
+        self._thread = None
+
+    def start(self):
+        """Запускаем поток-сборщик"""
+        self._started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._drain_loop, name="ResultSink", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        """Дописываем всё, что осталось в очереди, и закрываем приёмник"""
+        if self._thread is None:
+            return
+
+        self.result_queue.put(_STOP)
+        self._thread.join(timeout=timeout)
+        self._thread = None
+        self._stopped_at = time.monotonic()
+        self.sink.close()
+
+    def _drain_loop(self):
+        """Копим пачку до batch_size или flush_interval, потом пишем"""
+        batch = []
+        deadline = None
+
+        while True:
+            try:
+                if batch:
+                    item = self.result_queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                else:
+                    # Пустая пачка - спим, пока не придёт результат
+                    item = self.result_queue.get()
+            except queue.Empty:
+                self._flush(batch)
+                batch = []
+                continue
+
+            if item is _STOP:
+                self._flush(batch)
+                return
+
+            if not batch:
+                deadline = time.monotonic() + self.flush_interval
+            batch.append(item)
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(batch)
+                batch = []
+
+    def _flush(self, batch: List[Dict[str, Any]]):
+        """Пишем пачку в приёмник"""
+        if not batch:
+            return
+
+        started = time.monotonic()
+        try:
+            self.sink.write_batch(batch)
+            self.records_written += len(batch)
+            self.batches_written += 1
+        except Exception as e:
+            self.write_errors += 1
+            self.logger.error("Не смогли записать пачку результатов: %s", e)
+        finally:
+            self.write_time += time.monotonic() - started
+
+    def stats(self) -> Dict[str, Any]:
+        """Сколько записали и с какой скоростью"""
+        end = self._stopped_at or time.monotonic()
+        elapsed = end - self._started_at if self._started_at else 0.0
+        return {
+            'records_written': self.records_written,
+            'batches_written': self.batches_written,
+            'write_errors': self.write_errors,
+            'write_time': round(self.write_time, 4),
+            'throughput': round(self.records_written / elapsed, 2) if elapsed > 0 else 0.0,
+        }
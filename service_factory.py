@@ -1,10 +1,12 @@
-import platform
+import sys
+from typing import Optional
 
 from interfaces import BaseLogService, BaseInventoryService
-from datacls_models import LogConfig
+from datacls_models import InventoryConfig, LogConfig
 
-# Определяем текущую ОС один раз при импорте
-CURRENT_OS = platform.system().lower()
+# Определяем текущую ОС один раз при импорте - остальные модули берут её отсюда.
+# По sys.platform, а не platform.system(): модуль platform заметно удлиняет старт
+CURRENT_OS = {'win32': 'windows'}.get(sys.platform, sys.platform)
 
 class ServiceFactory:
     """Фабрика - создаёт нужные сервисы под конкретную ОС"""
@@ -22,14 +24,15 @@ class ServiceFactory:
             raise OSError(f"ОС {CURRENT_OS} не поддерживается. Нужен Windows или Linux.")
     
     @staticmethod
-    def create_inventory_service(logger: BaseLogService) -> BaseInventoryService:
+    def create_inventory_service(logger: BaseLogService,
+                                 config: Optional[InventoryConfig] = None) -> BaseInventoryService:
         """Создаём сборщик информации под текущую ОС"""
         if CURRENT_OS == 'windows':
             from inventory_service_windows import WindowsInventoryService
-            return WindowsInventoryService(logger)
+            return WindowsInventoryService(logger, config)
         elif CURRENT_OS == 'linux':
             from inventory_service_linux import LinuxInventoryService
-            return LinuxInventoryService(logger)
+            return LinuxInventoryService(logger, config)
         else:
             raise OSError(f"ОС {CURRENT_OS} не поддерживается. Нужен Windows или Linux.")
     
@@ -0,0 +1,52 @@
+"""
+Протокол демона на Unix-сокете: каждое сообщение - 4 байта длины (big-endian)
+и JSON-объект в UTF-8 такой длины.
+
+Запрос:  {"id": 1, "command": "inventory", "priority": "normal", "ttl": 5}
+Ответ:   {"id": 1, "ok": true, "result": {...}}  или  {"id": 1, "ok": false, "error": "..."}
+
+Клиент может слать запросы пачкой, не дожидаясь ответов; ответы приходят
+по мере готовности, сопоставлять их надо по id.
+"""
+import json
+import struct
+from typing import Any, BinaryIO, Dict, Optional
+
+HEADER = struct.Struct('>I')
+# Больше мегабайта на команду не бывает - это либо ошибка, либо атака
+MAX_MESSAGE_SIZE = 1 << 20
+
+
+class ProtocolError(Exception):
+    """Битый кадр: неверная длина, не JSON или обрыв посреди сообщения"""
+
+
+def encode_message(message: Dict[str, Any]) -> bytes:
+    body = json.dumps(message, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    if len(body) > MAX_MESSAGE_SIZE:
+        raise ProtocolError(f"Сообщение {len(body)} байт больше лимита {MAX_MESSAGE_SIZE}")
+    return HEADER.pack(len(body)) + body
+
+
+def read_message(stream: BinaryIO) -> Optional[Dict[str, Any]]:
+    """Читаем одно сообщение из буферизованного потока; None - собеседник закрыл соединение"""
+    header = stream.read(HEADER.size)
+    if not header:
+        return None
+    if len(header) < HEADER.size:
+        raise ProtocolError("Соединение оборвалось посреди заголовка")
+
+    (length,) = HEADER.unpack(header)
+    if length > MAX_MESSAGE_SIZE:
+        raise ProtocolError(f"Заявлено {length} байт, лимит {MAX_MESSAGE_SIZE}")
+    body = stream.read(length)
+    if len(body) < length:
+        raise ProtocolError("Соединение оборвалось посреди сообщения")
+
+    try:
+        message = json.loads(body)
+    except ValueError as e:
+        raise ProtocolError(f"Не JSON: {e}") from e
+    if not isinstance(message, dict):
+        raise ProtocolError("Сообщение должно быть JSON-объектом")
+    return message
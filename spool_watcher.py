@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from interfaces import BaseLogService, DispatcherInterface
+from utils import iter_stream_commands
+
+# Файлы, которые ещё пишутся, класть в спул надо под такими именами и потом переименовывать
+TEMP_SUFFIXES = ('.tmp', '.part')
+
+
+class SpoolWatcher:
+    """
+    Долгоживущий режим: следим за папкой-спулом и гоним команды из новых файлов
+    в один постоянный диспетчер.
+
+    Файл забираем атомарным переименованием в processing/ - если файл успел забрать
+    другой экземпляр, rename просто не найдёт его. После обработки файл уезжает
+    в done/ или failed/.
+    """
+
+    def __init__(self, spool_dir: str, dispatcher: DispatcherInterface, logger: BaseLogService,
+                 poll_interval: float = 2.0):
+        self.spool_dir = Path(spool_dir).resolve()
+        self.processing_dir = self.spool_dir / "processing"
+        self.done_dir = self.spool_dir / "done"
+        self.failed_dir = self.spool_dir / "failed"
+        self.dispatcher = dispatcher
+        self.logger = logger
+        self.poll_interval = poll_interval
+
+        self.files_done = 0
+        self.files_failed = 0
+        self.commands = 0
+        self.tasks = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+        self._stop = threading.Event()
+        self._inotify = None
+
+        for directory in (self.spool_dir, self.processing_dir, self.done_dir, self.failed_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+
+    def run(self):
+        """Крутимся, пока не позовут stop() (или не прилетит Ctrl+C)"""
+        self._inotify = self._open_inotify()
+        mode = "inotify" if self._inotify else f"опрос раз в {self.poll_interval} с"
+        self.logger.info("📂 Следим за спулом %s (%s)", self.spool_dir, mode)
+
+        try:
+            # Файлы, брошенные упавшим прошлым запуском, доделываем первыми
+            for path in sorted(self.processing_dir.iterdir()):
+                if path.is_file():
+                    self._process(path, path.stat().st_mtime)
+
+            while not self._stop.is_set():
+                for path in self._pending_files():
+                    if self._stop.is_set():
+                        break
+                    claimed = self._claim(path)
+                    if claimed is not None:
+                        self._process(*claimed)
+                self._wait_for_files()
+        finally:
+            if self._inotify is not None:
+                self._inotify.close()
+                self._inotify = None
+
+    def stop(self):
+        """Останавливаемся после текущего файла"""
+        self._stop.set()
+        if self._inotify is not None:
+            self._inotify.wake()
+
+    def _open_inotify(self):
+        try:
+            from inotify import Inotify, IN_CLOSE_WRITE, IN_MOVED_TO
+            inotify = Inotify()
+            inotify.add_watch(str(self.spool_dir), IN_CLOSE_WRITE | IN_MOVED_TO)
+            return inotify
+        except (OSError, AttributeError) as e:
+            self.logger.warning("inotify недоступен (%s), переходим на опрос папки", e)
+            return None
+
+    def _wait_for_files(self):
+        """Спим до появления файла: inotify без таймаута или опрос по таймеру"""
+        if self._inotify is not None:
+            self._inotify.read_events()
+        else:
+            self._stop.wait(self.poll_interval)
+
+    def _pending_files(self) -> List[Path]:
+        """Готовые к обработке файлы - от старых к новым"""
+        files = []
+        with os.scandir(self.spool_dir) as entries:
+            for entry in entries:
+                if entry.name.startswith('.') or entry.name.endswith(TEMP_SUFFIXES):
+                    continue
+                if entry.is_file(follow_symlinks=False):
+                    files.append((entry.stat().st_mtime, entry.path))
+        return [Path(path) for _, path in sorted(files)]
+
+    def _claim(self, path: Path) -> Optional[tuple]:
+        """Забираем файл себе: (путь в processing/, когда файл появился)"""
+        target = self.processing_dir / path.name
+        try:
+            arrived_at = path.stat().st_mtime
+            os.rename(path, target)
+        except FileNotFoundError:
+            # Опередил другой экземпляр
+            return None
+        except OSError as e:
+            self.logger.error("Не смогли забрать файл %s: %s", path, e)
+            return None
+        return target, arrived_at
+
+    def _process(self, path: Path, arrived_at: float):
+        """Гоним команды файла в диспетчер и ждём их выполнения"""
+        started = time.monotonic()
+        commands = 0
+        tasks = 0
+        failed = False
+
+        try:
+            with open(path, 'rb') as f:
+                for cmd in iter_stream_commands(f, path.name):
+                    commands += 1
+                    if cmd == 'inventory':
+                        if self.dispatcher.add_task(cmd):
+                            tasks += 1
+                    else:
+                        self.logger.info("⏭️  Команда '%s' проигнорирована (не inventory)", cmd)
+            if tasks:
+                self.dispatcher.join()
+        except (OSError, ValueError) as e:
+            failed = True
+            self.logger.error("❌ Файл %s не обработан: %s", path.name, e)
+
+        latency = time.monotonic() - started
+        self._finish(path, failed)
+
+        self.commands += commands
+        self.tasks += tasks
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+        if failed:
+            self.files_failed += 1
+        else:
+            self.files_done += 1
+
+        self.logger.info(
+            "📄 %s: команд %s, задач %s, обработка %.1f мс, ожидание в спуле %.1f мс",
+            path.name, commands, tasks, latency * 1000, max(0.0, time.time() - arrived_at - latency) * 1000
+        )
+
+    def _finish(self, path: Path, failed: bool):
+        """Убираем файл в done/ или failed/, не затирая одноимённые"""
+        target_dir = self.failed_dir if failed else self.done_dir
+        target = target_dir / path.name
+        if target.exists():
+            target = target_dir / f"{path.stem}.{int(time.time() * 1000)}{path.suffix}"
+        try:
+            os.replace(path, target)
+        except OSError as e:
+            self.logger.error("Не смогли переместить %s: %s", path, e)
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики по файлам спула"""
+        processed = self.files_done + self.files_failed
+        return {
+            'files_done': self.files_done,
+            'files_failed': self.files_failed,
+            'commands': self.commands,
+            'tasks': self.tasks,
+            'latency_avg_ms': round(self.latency_total / processed * 1000, 2) if processed else 0.0,
+            'latency_max_ms': round(self.latency_max * 1000, 2),
+        }
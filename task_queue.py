@@ -0,0 +1,109 @@
+import heapq
+import itertools
+import queue
+import time
+from typing import Any, Dict, Optional
+
+from metrics import REGISTRY
+
+# Классы приоритета: меньше - раньше
+PRIORITIES = {'high': 0, 'normal': 1, 'low': 2}
+DEFAULT_PRIORITY = 'normal'
+
+# Служебные маркеры (остановка, сокращение пула) встают после всех задач
+_MARKER_PRIORITY = len(PRIORITIES)
+
+QUEUE_WAIT_SECONDS = REGISTRY.histogram('collector_queue_wait_seconds', 'Ожидание задачи в очереди по классам')
+
+
+class TaskQueue(queue.PriorityQueue):
+    """
+    Ограниченная очередь задач с классами приоритета.
+    Внутри лежат (приоритет, порядковый номер, время постановки, задача):
+    внутри одного класса порядок FIFO, наружу put()/get() отдают саму задачу.
+    Ожидание в очереди считается по классам под мьютексом очереди.
+    """
+
+    def __init__(self, maxsize: int = 0):
+        super().__init__(maxsize)
+        self._seq = itertools.count()
+        self._class_stats = {
+            name: {'queued': 0, 'dequeued': 0, 'expired': 0, 'shed': 0, 'wait_total': 0.0, 'wait_max': 0.0}
+            for name in PRIORITIES
+        }
+
+    @staticmethod
+    def priority_of(item: Any) -> str:
+        if isinstance(item, dict):
+            priority = item.get('priority', DEFAULT_PRIORITY)
+            return priority if priority in PRIORITIES else DEFAULT_PRIORITY
+        return ''
+
+    # _put/_get вызываются queue.Queue уже под self.mutex
+    def _put(self, item: Any):
+        priority = self.priority_of(item)
+        rank = PRIORITIES[priority] if priority else _MARKER_PRIORITY
+        if priority:
+            self._class_stats[priority]['queued'] += 1
+        super()._put((rank, next(self._seq), time.monotonic(), item))
+
+    def _get(self) -> Any:
+        _, _, enqueued, item = super()._get()
+        priority = self.priority_of(item)
+        if priority:
+            stats = self._class_stats[priority]
+            wait = time.monotonic() - enqueued
+            stats['dequeued'] += 1
+            stats['wait_total'] += wait
+            stats['wait_max'] = max(stats['wait_max'], wait)
+            QUEUE_WAIT_SECONDS.observe(wait, priority=priority)
+        return item
+
+    def put_drop_oldest(self, item: Any) -> Optional[Any]:
+        """
+        Ставим задачу, не дожидаясь места: если очередь полна, выкидываем
+        самую старую задачу самого низкого класса. Возвращаем выкинутую (или None).
+        """
+        with self.not_full:
+            dropped = None
+            if 0 < self.maxsize <= self._qsize():
+                victims = [entry for entry in self.queue if self.priority_of(entry[3])]
+                if not victims:
+                    # В очереди одни служебные маркеры - их не трогаем
+                    raise queue.Full
+                victim = max(victims, key=lambda entry: (entry[0], -entry[1]))
+                if PRIORITIES.get(self.priority_of(item), _MARKER_PRIORITY) > victim[0]:
+                    # Ради менее важной задачи более важные не выкидываем
+                    raise queue.Full
+                self.queue.remove(victim)
+                heapq.heapify(self.queue)
+                dropped = victim[3]
+                self._class_stats[self.priority_of(dropped)]['shed'] += 1
+                self.unfinished_tasks -= 1
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+            return dropped
+
+    def record_expired(self, item: Any):
+        """Задачу достали, но её срок вышел - выполнять не будем"""
+        priority = self.priority_of(item)
+        if priority:
+            with self.mutex:
+                self._class_stats[priority]['expired'] += 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Ожидание в очереди по классам приоритета"""
+        with self.mutex:
+            result = {}
+            for name, stats in self._class_stats.items():
+                dequeued = stats['dequeued']
+                result[name] = {
+                    'queued': stats['queued'],
+                    'dequeued': dequeued,
+                    'expired': stats['expired'],
+                    'shed': stats['shed'],
+                    'wait_avg': round(stats['wait_total'] / dequeued, 4) if dequeued else 0.0,
+                    'wait_max': round(stats['wait_max'], 4),
+                }
+            return result
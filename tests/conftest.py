@@ -0,0 +1,119 @@
+"""
+Общие заготовки тестов: сборщик-подделка без обращения к ОС и диспетчер,
+который пишет результаты в память и гарантированно останавливается после теста.
+"""
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cancellation import finish_task  # noqa: E402
+from collector import LibraryLogService  # noqa: E402
+from datacls_models import InventoryResult, WorkersConfig  # noqa: E402
+from dispatcher import SHUTDOWN_CANCEL, DispatcherService  # noqa: E402
+from interfaces import BaseInventoryService  # noqa: E402
+from result_sink import MemoryResultSink  # noqa: E402
+from warm_cache import WarmCache  # noqa: E402
+
+
+class FakeInventoryService(BaseInventoryService):
+    """
+    Сборщик без ОС: что делает сбор, решает тест (collect получает номер вызова, с 1).
+    execute_task устроен как у настоящих сервисов: finish_task() перед публикацией успеха.
+    """
+
+    OS_NAME = 'test'
+
+    def __init__(self, logger, collect: Optional[Callable[[int], InventoryResult]] = None,
+                 persist_delay: float = 0.0):
+        super().__init__(logger)
+        self.collect = collect or (lambda call: InventoryResult(ProductName=f'test-{call}'))
+        self.persist_delay = persist_delay
+        self.calls = 0
+        self._calls_lock = threading.Lock()
+
+    def _next_call(self) -> int:
+        with self._calls_lock:
+            self.calls += 1
+            return self.calls
+
+    def collect_os_info(self) -> InventoryResult:
+        return self.collect(self._next_call())
+
+    def execute_task(self, task_data: Dict[str, Any], os_info: Optional[InventoryResult] = None,
+                     coalesced: bool = False) -> Dict[str, Any]:
+        if os_info is None:
+            os_info = self.collect_os_info()
+        result = self._make_result(task_data, os_info, self.OS_NAME, coalesced)
+        finish_task()
+        self._publish_result(result)
+        return result
+
+    def persist_task(self, result: Dict[str, Any], payload: Any = None):
+        # Медленная стадия persist - чтобы задача успела упереться в таймаут на конвейере
+        time.sleep(self.persist_delay)
+        super().persist_task(result, payload)
+
+
+class CachedInventoryService(FakeInventoryService):
+    """Подделка с тёплым кэшем: отпечаток источников задаёт тест"""
+
+    def __init__(self, logger, cache_path, collect=None):
+        super().__init__(logger, collect)
+        self.warm_cache = WarmCache(str(cache_path), logger)
+        self.fingerprint = 'v1'
+
+    def _source_fingerprints(self):
+        return self.fingerprint
+
+    def collect_os_info(self) -> InventoryResult:
+        # Как у настоящих сервисов: сначала тёплый кэш, потом сбор
+        return self.collect_with(super().collect_os_info)
+
+
+def wait_until(predicate: Callable[[], bool], timeout: float = 5.0, interval: float = 0.01) -> bool:
+    """Ждём условия не дольше timeout; True - дождались"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(interval)
+    return predicate()
+
+
+def task_number(task_id: str) -> int:
+    """Порядковый номер из id задачи (pid-номер)"""
+    return int(task_id.rsplit('-', 1)[1])
+
+
+@pytest.fixture
+def logger():
+    return LibraryLogService()
+
+
+@pytest.fixture
+def make_dispatcher(logger):
+    """
+    make_dispatcher(collect=..., persist_delay=..., **настройки WorkersConfig)
+    -> (диспетчер, сборщик, хранилище результатов). Воркеры уже запущены.
+    """
+    created = []
+
+    def make(collect=None, persist_delay: float = 0.0, **workers):
+        workers.setdefault('coalesce_window', 0.0)
+        service = FakeInventoryService(logger, collect, persist_delay)
+        sink = MemoryResultSink()
+        dispatcher = DispatcherService(WorkersConfig(**workers), logger, service, sink)
+        dispatcher.start_workers()
+        created.append(dispatcher)
+        return dispatcher, service, sink
+
+    yield make
+    for dispatcher in created:
+        if dispatcher.is_running.is_set():
+            dispatcher.shutdown(SHUTDOWN_CANCEL, timeout=5)
@@ -0,0 +1,132 @@
+"""Очередь с классами приоритета и политики допуска"""
+import queue
+import threading
+import time
+
+from admission import AdmissionController
+from task_queue import TaskQueue
+
+
+def task(task_id: str, priority: str = 'normal'):
+    return {'id': task_id, 'command': 'inventory', 'priority': priority}
+
+
+def drain(task_queue: TaskQueue):
+    ids = []
+    while True:
+        try:
+            ids.append(task_queue.get_nowait()['id'])
+        except queue.Empty:
+            return ids
+
+
+def test_priority_classes_then_fifo():
+    task_queue = TaskQueue()
+    for item in (task('low-1', 'low'), task('normal-1'), task('high-1', 'high'),
+                 task('normal-2'), task('high-2', 'high'), task('low-2', 'low')):
+        task_queue.put(item)
+
+    assert drain(task_queue) == ['high-1', 'high-2', 'normal-1', 'normal-2', 'low-1', 'low-2']
+    stats = task_queue.stats()
+    assert {name: stats[name]['dequeued'] for name in stats} == {'high': 2, 'normal': 2, 'low': 2}
+
+
+def test_markers_go_after_all_tasks():
+    task_queue = TaskQueue()
+    task_queue.put(None)
+    task_queue.put(task('low', 'low'))
+
+    assert task_queue.get_nowait()['id'] == 'low'
+    assert task_queue.get_nowait() is None
+
+
+def test_unknown_priority_is_normal():
+    task_queue = TaskQueue()
+    task_queue.put(task('odd', 'urgent'))
+    task_queue.put(task('high', 'high'))
+
+    assert drain(task_queue) == ['high', 'odd']
+    assert task_queue.stats()['normal']['queued'] == 1
+
+
+def test_reject_does_not_wait():
+    controller = AdmissionController(TaskQueue(maxsize=1), policy='reject')
+
+    started = time.monotonic()
+    assert controller.admit(task('a'))
+    assert not controller.admit(task('b'))
+    assert time.monotonic() - started < 0.5
+    assert controller.stats()['accepted'] == 1
+    assert controller.stats()['rejected'] == 1
+
+
+def test_block_gives_up_after_timeout():
+    controller = AdmissionController(TaskQueue(maxsize=1), policy='block', timeout=0.1)
+    controller.admit(task('a'))
+
+    assert not controller.admit(task('b'))
+    assert controller.stats()['rejected'] == 1
+    assert controller.stats()['producer_stall_time'] >= 0.1
+
+
+def test_block_waits_for_consumer():
+    task_queue = TaskQueue(maxsize=1)
+    controller = AdmissionController(task_queue, policy='block')
+    controller.admit(task('a'))
+
+    threading.Timer(0.1, task_queue.get).start()
+    assert controller.admit(task('b'))
+    assert drain(task_queue) == ['b']
+
+
+def test_drop_oldest_sheds_lowest_class():
+    shed = []
+    task_queue = TaskQueue(maxsize=3)
+    controller = AdmissionController(task_queue, policy='drop_oldest', on_shed=shed.append)
+    for item in (task('low-1', 'low'), task('low-2', 'low'), task('normal')):
+        assert controller.admit(item)
+
+    assert controller.admit(task('high', 'high'))
+    assert [item['id'] for item in shed] == ['low-1']
+    assert drain(task_queue) == ['high', 'normal', 'low-2']
+    assert task_queue.stats()['low']['shed'] == 1
+
+
+def test_drop_oldest_keeps_more_important_tasks():
+    task_queue = TaskQueue(maxsize=2)
+    controller = AdmissionController(task_queue, policy='drop_oldest')
+    controller.admit(task('high', 'high'))
+    controller.admit(task('normal'))
+
+    assert not controller.admit(task('low', 'low'))
+    assert controller.stats()['rejected'] == 1
+    assert drain(task_queue) == ['high', 'normal']
+
+
+def test_token_bucket_limits_burst():
+    controller = AdmissionController(TaskQueue(), policy='token_bucket', rate=0.5, burst=3)
+
+    admitted = [controller.admit(task(str(i))) for i in range(5)]
+    assert admitted == [True, True, True, False, False]
+    assert controller.stats()['rate_limited'] == 2
+
+
+def test_concurrent_producers_are_all_counted():
+    task_queue = TaskQueue(maxsize=50)
+    controller = AdmissionController(task_queue, policy='reject')
+    barrier = threading.Barrier(8)
+
+    def produce(producer: int):
+        barrier.wait()
+        for i in range(20):
+            controller.admit(task(f'{producer}-{i}'))
+
+    producers = [threading.Thread(target=produce, args=(p,)) for p in range(8)]
+    for producer in producers:
+        producer.start()
+    for producer in producers:
+        producer.join()
+
+    stats = controller.stats()
+    assert stats['accepted'] == task_queue.qsize() == 50
+    assert stats['accepted'] + stats['rejected'] == 160
@@ -0,0 +1,79 @@
+"""Демон на Unix-сокете: запросы пачкой, ответы по id, сокет только для владельца"""
+import os
+import socket
+import stat
+import threading
+
+import pytest
+
+from agent_client import AgentClient
+from agent_daemon import AgentDaemon
+from conftest import wait_until
+from socket_protocol import HEADER
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason="нужны Unix-сокеты")
+
+
+@pytest.fixture
+def daemon(make_dispatcher, logger, tmp_path):
+    dispatcher, _, _ = make_dispatcher(inventory_workers=2)
+    daemon = AgentDaemon(dispatcher, str(tmp_path / 'agent.sock'), logger)
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+    assert wait_until(lambda: daemon._server is not None)
+    yield daemon
+    daemon.stop()
+    thread.join(5)
+
+
+def test_socket_is_owner_only(daemon):
+    mode = os.stat(daemon.socket_path).st_mode
+    assert stat.S_ISSOCK(mode)
+    assert stat.S_IMODE(mode) == 0o600
+
+
+def test_pipelined_requests_are_answered_by_id(daemon):
+    with AgentClient(str(daemon.socket_path), timeout=5) as client:
+        assert client.request('ping') == {'id': 1, 'ok': True, 'result': 'pong'}
+        responses = client.pipeline(['inventory'] * 5 + ['rm -rf /'])
+
+    assert [response['id'] for response in responses] == list(range(2, 8))
+    assert all(response['ok'] and response['result']['status'] == 'success' for response in responses[:5])
+    assert responses[5]['ok'] is False
+    assert "белого списка" in responses[5]['error']
+    assert daemon.stats == {'connections': 1, 'requests': 7, 'tasks': 5, 'errors': 1}
+
+
+def test_stats_and_bad_requests(daemon):
+    with AgentClient(str(daemon.socket_path), timeout=5) as client:
+        stats = client.request('stats')['result']
+        assert stats['daemon']['requests'] == 1
+        assert client.request('inventory', priority='urgent')['ok'] is False
+        assert client.request('inventory', ttl='soon')['ok'] is False
+        client.sock.sendall(HEADER.pack(2) + b'[]')
+        broken = client.receive()
+
+    assert broken['id'] is None and broken['ok'] is False
+
+
+def test_second_daemon_does_not_steal_live_socket(daemon, logger):
+    with pytest.raises(RuntimeError, match="уже слушает"):
+        AgentDaemon(daemon.dispatcher, str(daemon.socket_path), logger)._prepare_socket_path()
+
+
+def test_stale_socket_is_replaced(logger, tmp_path):
+    path = tmp_path / 'agent.sock'
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(str(path))
+    stale.close()
+
+    AgentDaemon(None, str(path), logger)._prepare_socket_path()
+    assert not path.exists()
+
+
+def test_regular_file_is_not_removed(logger, tmp_path):
+    path = tmp_path / 'agent.sock'
+    path.write_text('важное', encoding='utf-8')
+    with pytest.raises(RuntimeError, match="не сокет"):
+        AgentDaemon(None, str(path), logger)._prepare_socket_path()
+    assert path.exists()
@@ -0,0 +1,101 @@
+"""AsyncDispatcherService: таймауты задач, воркеры и итог каждой задачи"""
+import asyncio
+import collections
+import threading
+import time
+
+from conftest import FakeInventoryService
+from async_dispatcher import AsyncDispatcherService
+from datacls_models import InventoryResult, WorkersConfig
+from result_sink import MemoryResultSink
+
+
+class FakeAsyncInventoryService(FakeInventoryService):
+    """Первый асинхронный сбор виснет, остальные - мгновенные"""
+
+    async def collect_os_info_async(self) -> InventoryResult:
+        call = self._next_call()
+        if call == 1:
+            await asyncio.sleep(10)
+        return InventoryResult(ProductName=f'test-{call}')
+
+
+def test_leader_timeout_keeps_follower_workers(logger):
+    sink = MemoryResultSink()
+
+    async def scenario():
+        dispatcher = AsyncDispatcherService(WorkersConfig(task_timeout=0.5, async_concurrency=3),
+                                            logger, FakeAsyncInventoryService(logger), sink)
+        await dispatcher.start_workers()
+        await dispatcher.add_task('inventory')
+        await asyncio.sleep(0.2)
+        for _ in range(5):
+            await dispatcher.add_task('inventory')
+        await asyncio.wait_for(dispatcher.join(), 5)
+        alive = sum(not worker.done() for worker in dispatcher.inventory_workers)
+        await dispatcher.shutdown()
+        return alive
+
+    assert asyncio.run(scenario()) == 3
+
+    by_task = collections.Counter(record['task_id'] for record in sink.get_records())
+    assert len(by_task) == 6
+    assert set(by_task.values()) == {1}
+
+
+class SlowExecuteService(FakeInventoryService):
+    """Сбор мгновенный, а execute_task в пуле потоков - дольше таймаута задачи"""
+
+    def __init__(self, logger):
+        super().__init__(logger)
+        self.returned = threading.Event()
+
+    async def collect_os_info_async(self) -> InventoryResult:
+        return self.collect_os_info()
+
+    def execute_task(self, task_data, os_info=None, coalesced=False):
+        time.sleep(0.5)
+        self.returned.set()
+        return super().execute_task(task_data, os_info, coalesced)
+
+
+def test_timed_out_thread_does_not_publish_late_success(logger):
+    sink = MemoryResultSink()
+    service = SlowExecuteService(logger)
+
+    async def scenario():
+        dispatcher = AsyncDispatcherService(WorkersConfig(task_timeout=0.2, async_concurrency=1),
+                                            logger, service, sink)
+        await dispatcher.start_workers()
+        await dispatcher.add_task('inventory')
+        await asyncio.wait_for(dispatcher.join(), 5)
+        # Ждём, пока поток с execute_task доберётся до публикации
+        await asyncio.to_thread(service.returned.wait, 5)
+        await asyncio.sleep(0.1)
+        await dispatcher.shutdown()
+        return dispatcher.tasks_timed_out
+
+    assert asyncio.run(scenario()) == 1
+    assert [record['status'] for record in sink.get_records()] == ['timeout']
+
+
+def test_shutdown_deadline_cancels_hung_workers(logger):
+    sink = MemoryResultSink()
+
+    async def scenario():
+        dispatcher = AsyncDispatcherService(WorkersConfig(async_concurrency=2), logger,
+                                            FakeAsyncInventoryService(logger), sink)
+        await dispatcher.start_workers()
+        await dispatcher.add_task('inventory')
+        await asyncio.sleep(0.1)
+        workers = list(dispatcher.inventory_workers)
+        report = await dispatcher.shutdown(timeout=0.3)
+        return report, workers
+
+    report, workers = asyncio.run(scenario())
+    assert len(report['in_flight']) == 1
+    assert all(worker.done() for worker in workers)
+    # Свободный воркер вышел по маркеру, зависший - отменён
+    assert sum(worker.cancelled() for worker in workers) == 1
+    # Задачу прервала остановка, а не она сама - отказа за неё нет
+    assert sink.get_records() == []
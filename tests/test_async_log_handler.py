@@ -0,0 +1,138 @@
+"""AsyncLogHandler: текст записи на момент вызова, ротация и её сбои"""
+import io
+import logging
+import threading
+import time
+
+import pytest
+
+import async_log_handler
+from async_log_handler import AsyncLogHandler
+
+
+@pytest.fixture
+def make_logger(tmp_path):
+    """make_logger(**настройки хендлера) -> (логгер, хендлер); хендлер закрывается после теста"""
+    created = []
+
+    def make(stream=None, **options):
+        handler = AsyncLogHandler(tmp_path / 'log.txt', stream=stream or io.StringIO(), **options)
+        logger = logging.getLogger(f'test-async-log-{len(created)}')
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        logger.addHandler(handler)
+        created.append((logger, handler))
+        return logger, handler
+
+    yield make
+    for logger, handler in created:
+        logger.removeHandler(handler)
+        handler.close()
+
+
+def test_mutable_args_render_at_log_time(make_logger, tmp_path):
+    logger, handler = make_logger()
+    state = ['before']
+    logger.info("Состояние: %s", state)
+    state[0] = 'after'
+    handler.flush()
+
+    assert (tmp_path / 'log.txt').read_text(encoding='utf-8') == "Состояние: ['before']\n"
+
+
+def test_rotates_by_size(make_logger, tmp_path):
+    logger, handler = make_logger(max_bytes=100, backup_count=2)
+    for i in range(30):
+        logger.info("Строка номер %03d", i)
+        handler.flush()
+
+    assert handler.stats()['rotations'] > 0
+    assert (tmp_path / 'log.txt.1').exists()
+    assert not (tmp_path / 'log.txt.3').exists()
+    assert "Строка номер 029" in (tmp_path / 'log.txt').read_text(encoding='utf-8')
+
+
+def test_rotates_by_time(make_logger, tmp_path):
+    logger, handler = make_logger(max_bytes=0, rotate_interval=0.05)
+    logger.info("Старая")
+    handler.flush()
+    time.sleep(0.1)
+    logger.info("Новая")
+    handler.flush()
+
+    assert (tmp_path / 'log.txt.1').read_text(encoding='utf-8') == "Старая\n"
+    assert (tmp_path / 'log.txt').read_text(encoding='utf-8') == "Новая\n"
+
+
+def test_failed_rotation_keeps_writing(make_logger, tmp_path, monkeypatch, capsys):
+    def locked(src, dst):
+        raise PermissionError("файл занят")
+
+    # Как на Windows, где лог держит другой процесс: переименовать нельзя
+    monkeypatch.setattr(async_log_handler.os, 'replace', locked)
+    logger, handler = make_logger(max_bytes=100, backup_count=2)
+    for i in range(10):
+        logger.info("Строка номер %03d", i)
+        handler.flush()
+
+    assert handler.stats()['rotations'] == 0
+    assert "Не смогли ротировать лог" in capsys.readouterr().err
+    text = (tmp_path / 'log.txt').read_text(encoding='utf-8')
+    assert [f"Строка номер {i:03d}" for i in range(10)] == text.splitlines()
+
+
+def test_exception_is_rendered_at_log_time(make_logger, tmp_path):
+    logger, handler = make_logger()
+    try:
+        raise ValueError("сломалось")
+    except ValueError:
+        logger.exception("Задача упала")
+    handler.flush()
+
+    text = (tmp_path / 'log.txt').read_text(encoding='utf-8')
+    assert text.startswith("Задача упала\nTraceback")
+    assert "ValueError: сломалось" in text
+
+
+def test_batch_is_written_after_flush_interval(make_logger, tmp_path):
+    logger, handler = make_logger(flush_interval=0.05)
+    logger.info("Без flush")
+    deadline = time.monotonic() + 5
+    while handler.stats()['written'] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert (tmp_path / 'log.txt').read_text(encoding='utf-8') == "Без flush\n"
+
+
+class StuckStream(io.StringIO):
+    """Консоль, на которой писатель застревает, пока тест его не отпустит"""
+
+    def __init__(self):
+        super().__init__()
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def write(self, text):
+        self.entered.set()
+        self.release.wait(5)
+        return super().write(text)
+
+
+def test_full_queue_drops_instead_of_blocking(make_logger):
+    stream = StuckStream()
+    logger, handler = make_logger(stream=stream, queue_size=2, flush_interval=0.01)
+    logger.info("Первая")
+    assert stream.entered.wait(5)
+
+    started = time.monotonic()
+    for i in range(10):
+        logger.info("Запись %s", i)
+    # Воркеры не ждут застрявшего писателя
+    assert time.monotonic() - started < 1
+    stream.release.set()
+    handler.flush()
+
+    stats = handler.stats()
+    assert stats['dropped'] == 8
+    assert stats['queued'] == 3
+    assert stats['written'] == 3
@@ -0,0 +1,125 @@
+"""Склеивание одинаковых сборов: потоки и asyncio"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from coalescing import AsyncSingleFlight, CallAbandoned, SingleFlight
+from conftest import wait_until
+
+
+def run_callers(single_flight: SingleFlight, count: int, fn):
+    """count потоков зовут do() с одним ключом; итог каждого - (результат, общий) или исключение"""
+    outcomes = [None] * count
+
+    def call(i: int):
+        try:
+            outcomes[i] = single_flight.do('inventory', fn)
+        except BaseException as e:
+            outcomes[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, outcomes
+
+
+def test_concurrent_callers_share_one_call():
+    single_flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def collect():
+        calls.append(1)
+        release.wait(5)
+        return object()
+
+    threads, outcomes = run_callers(single_flight, 8, collect)
+    assert wait_until(lambda: single_flight.shared_inflight == 7)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert len({id(result) for result, _ in outcomes}) == 1
+    assert sorted(shared for _, shared in outcomes) == [False] + [True] * 7
+    assert single_flight.stats() == {'executed': 1, 'shared_inflight': 7, 'shared_recent': 0}
+
+
+def test_error_reaches_followers_and_is_not_remembered():
+    single_flight = SingleFlight(fresh_window=60)
+    release = threading.Event()
+
+    def broken():
+        release.wait(5)
+        raise OSError('нет доступа')
+
+    threads, outcomes = run_callers(single_flight, 3, broken)
+    assert wait_until(lambda: single_flight.shared_inflight == 2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert all(isinstance(outcome, OSError) for outcome in outcomes)
+    # Ошибку не держим как свежий результат - следующий вызов собирает заново
+    assert single_flight.do('inventory', lambda: 'ok') == ('ok', False)
+
+
+def test_fresh_window():
+    single_flight = SingleFlight(fresh_window=0.2)
+    assert single_flight.do('inventory', lambda: 1) == (1, False)
+    assert single_flight.do('inventory', lambda: 2) == (1, True)
+    time.sleep(0.25)
+    assert single_flight.do('inventory', lambda: 3) == (3, False)
+    assert single_flight.stats()['shared_recent'] == 1
+
+
+def test_abandon_is_final():
+    single_flight = SingleFlight(fresh_window=60)
+    release = threading.Event()
+
+    def hung():
+        release.wait(5)
+        return 'late'
+
+    threads, outcomes = run_callers(single_flight, 3, hung)
+    assert wait_until(lambda: single_flight.shared_inflight == 2)
+    single_flight.abandon('inventory', CallAbandoned('завис'))
+    assert wait_until(lambda: sum(isinstance(outcome, CallAbandoned) for outcome in outcomes) == 2)
+
+    # Новый вызов не ждёт зависшего лидера
+    assert single_flight.do('inventory', lambda: 'fresh') == ('fresh', False)
+
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    # Вернувшийся лидер получает свой результат, но дубликатам его уже не раздаёт
+    assert ('late', False) in outcomes
+    assert single_flight.do('inventory', lambda: 'other') == ('fresh', True)
+
+
+def test_async_leader_cancel_gives_followers_an_error():
+    async def scenario():
+        single_flight = AsyncSingleFlight()
+        started = asyncio.Event()
+
+        async def hung():
+            started.set()
+            await asyncio.sleep(10)
+
+        leader = asyncio.create_task(single_flight.do('inventory', hung))
+        await started.wait()
+        followers = [asyncio.create_task(single_flight.do('inventory', hung)) for _ in range(3)]
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        outcomes = await asyncio.gather(*followers, return_exceptions=True)
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return outcomes, single_flight
+
+    outcomes, single_flight = asyncio.run(scenario())
+    # Дубликаты получают обычную ошибку, а не CancelledError - иначе их воркеры бы завершились
+    assert all(type(outcome) is TimeoutError for outcome in outcomes)
+    assert single_flight.stats()['shared_inflight'] == 3
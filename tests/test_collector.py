@@ -0,0 +1,59 @@
+"""Встраиваемый API collect(): без файлов, без настройки logging, без вывода"""
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import collector
+from collector import collect, collect_async, get_collector
+from datacls_models import InventoryConfig, InventoryResult
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_collect_has_no_side_effects(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    root_handlers = list(logging.getLogger().handlers)
+    payload_existed = os.path.exists(os.path.join(ROOT, 'payload.json'))
+
+    # write_payload и cache_file из настроек библиотека игнорирует
+    info = collect(InventoryConfig(write_payload=True, cache_file=str(tmp_path / 'cache.json')))
+
+    assert isinstance(info, InventoryResult) and info.ProductName
+    assert capsys.readouterr() == ('', '')
+    assert logging.getLogger().handlers == root_handlers
+    assert list(tmp_path.iterdir()) == []
+    assert os.path.exists(os.path.join(ROOT, 'payload.json')) == payload_existed
+
+
+def test_collector_is_shared_per_config():
+    fast = InventoryConfig(collector_mode='fast')
+    assert get_collector() is get_collector(InventoryConfig())
+    assert get_collector(fast) is get_collector(InventoryConfig(collector_mode='fast'))
+    assert get_collector(fast) is not get_collector()
+    assert get_collector(fast).config.write_payload is False
+
+
+def test_collect_from_many_threads():
+    expected = collect()
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: collect(), range(32)))
+    assert all(result == expected for result in results)
+
+
+def test_collect_async_matches_sync():
+    assert asyncio.run(collect_async()) == collect()
+
+
+def test_payload_adds_diagnostics():
+    shared = get_collector()
+    info = shared.collect()
+    payload = shared.payload(info)
+    assert list(payload) == ['os', '_diagnostic']
+    assert payload['os']['ProductName'] == info.ProductName
+
+
+def test_library_logger_is_silent_by_default():
+    logger = logging.getLogger(collector.LIBRARY_LOGGER)
+    collect()
+    assert any(isinstance(handler, logging.NullHandler) for handler in logger.handlers)
@@ -0,0 +1,58 @@
+"""Потоковое чтение команд: кодировка, комментарии, длинные строки"""
+import codecs
+import io
+
+import utils
+from utils import iter_commands, iter_stream_commands
+
+
+def commands(data: bytes):
+    return list(iter_stream_commands(io.BufferedReader(io.BytesIO(data)), 'test'))
+
+
+def test_comments_and_blank_lines_are_skipped():
+    assert commands(b"# header\nInventory\n\n  INVENTORY  \n#inventory\ninventory") == ['inventory'] * 3
+
+
+def test_utf8_with_bom_and_crlf():
+    data = codecs.BOM_UTF8 + "инвентаризация\r\ninventory\r\n".encode('utf-8')
+    assert commands(data) == ['инвентаризация', 'inventory']
+
+
+def test_cp1251_is_detected():
+    assert commands("Привет\ninventory\n".encode('cp1251')) == ['привет', 'inventory']
+
+
+def test_utf8_character_split_between_chunks(monkeypatch):
+    monkeypatch.setattr(utils, 'STREAM_CHUNK_SIZE', 3)
+    # 'ж' - два байта, граница порции приходится на середину символа
+    assert commands("аж\ninventory\n".encode('utf-8')) == ['аж', 'inventory']
+
+
+def test_overlong_line_is_dropped(monkeypatch):
+    monkeypatch.setattr(utils, 'STREAM_CHUNK_SIZE', 16)
+    monkeypatch.setattr(utils, 'MAX_COMMAND_LENGTH', 32)
+    data = b"inventory\n" + b"x" * 100 + b"\ninventory\n"
+    assert commands(data) == ['inventory', 'inventory']
+
+
+def test_binary_file_is_rejected(tmp_path, capsys):
+    binary = tmp_path / 'binary.bin'
+    binary.write_bytes(b"inventory\x00\x01\x02")
+    text = tmp_path / 'commands.txt'
+    text.write_text("inventory\n", encoding='utf-8')
+
+    # Битый файл не мешает следующему
+    assert list(iter_commands([str(binary), str(tmp_path / 'missing.txt'), str(text)])) == ['inventory']
+    out = capsys.readouterr().out
+    assert "не является текстовым" in out
+    assert "не найден" in out
+
+
+def test_commands_are_yielded_lazily(tmp_path):
+    path = tmp_path / 'commands.txt'
+    path.write_text("inventory\n" * 3, encoding='utf-8')
+    stream = iter_commands([str(path)])
+
+    assert next(stream) == 'inventory'
+    assert len(list(stream)) == 2
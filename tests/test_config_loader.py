@@ -0,0 +1,44 @@
+"""Чтение config.ini"""
+import pytest
+
+import config_loader
+from config_loader import ConfigLoader
+
+
+@pytest.fixture
+def write_config(tmp_path, monkeypatch):
+    """config.ini во временной папке вместо папки агента; без вызова - конфига нет"""
+    monkeypatch.setattr(config_loader, '__file__', str(tmp_path / 'config_loader.py'))
+
+    def write(text: str):
+        (tmp_path / 'config.ini').write_text(text, encoding='utf-8')
+    return write
+
+
+def test_warm_cache_is_off_without_config(write_config):
+    assert ConfigLoader.load_config().inventory.cache_file == ''
+
+
+def test_warm_cache_is_off_unless_configured(write_config, tmp_path):
+    write_config("[inventory]\nmode = fast\n")
+    assert ConfigLoader.load_config().inventory.cache_file == ''
+
+    write_config(f"[logging]\nlog_path = {tmp_path}\n[inventory]\ncache_file = cache.json\n")
+    assert ConfigLoader.load_config().inventory.cache_file == str(tmp_path / 'cache.json')
+
+
+def test_fixed_pool_is_clamped_to_worker_limit(write_config, caplog):
+    write_config("[workers]\nInventoryWorkers = 5000\nAutoscale = false\nWorkerLimit = 16\n")
+    workers = ConfigLoader.load_config().workers
+
+    assert workers.inventory_workers == 16
+    assert workers.max_workers <= 16
+    assert "WorkerLimit" in caplog.text
+
+
+def test_fixed_pool_below_limit_is_taken_as_is(write_config, caplog):
+    write_config("[workers]\nInventoryWorkers = 12\n")
+    workers = ConfigLoader.load_config().workers
+
+    assert workers.inventory_workers == 12
+    assert "WorkerLimit" not in caplog.text
@@ -0,0 +1,262 @@
+"""DispatcherService под конкурентной нагрузкой: приоритеты, submit/map, сторож, конвейер, остановка"""
+import collections
+import random
+import threading
+import time
+from concurrent.futures import CancelledError, TimeoutError as FutureTimeoutError
+
+import pytest
+
+from coalescing import CallAbandoned
+from conftest import task_number, wait_until
+from datacls_models import InventoryResult
+from dispatcher import SHUTDOWN_CANCEL, SHUTDOWN_DRAIN
+
+
+def gated(gate: threading.Event, first_only: bool = True):
+    """Сбор, который ждёт gate (только первый вызов или все)"""
+    def collect(call: int) -> InventoryResult:
+        if call == 1 or not first_only:
+            gate.wait(5)
+        return InventoryResult(ProductName=f'test-{call}')
+    return collect
+
+
+def hung_first(seconds: float, returned: threading.Event):
+    """Первый сбор виснет на seconds (не реагируя на отмену), остальные - мгновенные"""
+    def collect(call: int) -> InventoryResult:
+        if call == 1:
+            time.sleep(seconds)
+            returned.set()
+        return InventoryResult(ProductName=f'test-{call}')
+    return collect
+
+
+def records_by_task(sink):
+    by_task = collections.defaultdict(list)
+    for record in sink.get_records():
+        by_task[record['task_id']].append(record['status'])
+    return by_task
+
+
+def test_submit_returns_record_with_id_and_timestamps(make_dispatcher):
+    dispatcher, _, sink = make_dispatcher()
+
+    record = dispatcher.submit('inventory').result(5)
+
+    assert record['status'] == 'success'
+    assert record['data']['os']['ProductName'] == 'test-1'
+    assert record['task_id']
+    assert record['enqueued_at'] <= record['started_at'] <= record['finished_at']
+    dispatcher.shutdown()
+    assert [r['task_id'] for r in sink.get_records()] == [record['task_id']]
+
+
+def test_submit_rejects_unknown_command_and_priority(make_dispatcher):
+    dispatcher, _, _ = make_dispatcher()
+
+    with pytest.raises(ValueError):
+        dispatcher.submit('rm -rf').result(1)
+    with pytest.raises(ValueError):
+        dispatcher.submit('inventory', priority='urgent').result(1)
+
+
+def test_priority_order_behind_busy_worker(make_dispatcher):
+    gate = threading.Event()
+    dispatcher, service, _ = make_dispatcher(gated(gate))
+    blocker = dispatcher.submit('inventory')
+    assert wait_until(lambda: service.calls == 1)
+
+    futures = {priority: dispatcher.submit('inventory', priority=priority)
+               for priority in ('low', 'normal', 'high')}
+    gate.set()
+
+    blocker.result(5)
+    started = {priority: future.result(5)['started_at'] for priority, future in futures.items()}
+    assert started['high'] < started['normal'] < started['low']
+
+
+def test_ttl_expires_in_queue(make_dispatcher):
+    gate = threading.Event()
+    dispatcher, service, sink = make_dispatcher(gated(gate))
+    dispatcher.submit('inventory')
+    assert wait_until(lambda: service.calls == 1)
+
+    expiring = dispatcher.submit('inventory', ttl=0.05)
+    lasting = dispatcher.submit('inventory', ttl=30)
+    time.sleep(0.1)
+    gate.set()
+
+    with pytest.raises(TimeoutError):
+        expiring.result(5)
+    assert lasting.result(5)['status'] == 'success'
+    assert service.calls == 2
+    assert dispatcher.task_queue.stats()['normal']['expired'] == 1
+    assert dispatcher.get_stats()['tasks']['expired'] == 1
+
+
+def test_task_ids_unique_across_threads(make_dispatcher):
+    dispatcher, _, _ = make_dispatcher(inventory_workers=4)
+    futures = []
+    futures_lock = threading.Lock()
+
+    def produce():
+        for _ in range(25):
+            future = dispatcher.submit('inventory')
+            with futures_lock:
+                futures.append(future)
+
+    producers = [threading.Thread(target=produce) for _ in range(4)]
+    for producer in producers:
+        producer.start()
+    for producer in producers:
+        producer.join()
+
+    ids = [future.result(10)['task_id'] for future in futures]
+    assert len(set(ids)) == 100
+
+
+def test_map_keeps_order_with_concurrent_producers(make_dispatcher):
+    def jittery(call: int) -> InventoryResult:
+        # Задачи заканчиваются не в том порядке, в каком их поставили
+        time.sleep(random.uniform(0, 0.01))
+        return InventoryResult(ProductName=f'test-{call}')
+
+    dispatcher, _, _ = make_dispatcher(jittery, inventory_workers=4)
+    results = {}
+
+    def produce(producer: int):
+        results[producer] = list(dispatcher.map(['inventory'] * 20, timeout=10))
+
+    producers = [threading.Thread(target=produce, args=(p,)) for p in range(4)]
+    for producer in producers:
+        producer.start()
+    for producer in producers:
+        producer.join()
+
+    for records in results.values():
+        assert len(records) == 20
+        assert all(record['status'] == 'success' for record in records)
+        # id растут в порядке submit - результаты map идут в порядке команд
+        numbers = [task_number(record['task_id']) for record in records]
+        assert numbers == sorted(numbers)
+    all_ids = [record['task_id'] for records in results.values() for record in records]
+    assert len(set(all_ids)) == 80
+
+
+def test_map_timeout_cancels_the_rest(make_dispatcher):
+    gate = threading.Event()
+    dispatcher, _, _ = make_dispatcher(gated(gate))
+
+    results = dispatcher.map(['inventory'] * 3, timeout=0.1)
+    with pytest.raises(FutureTimeoutError):
+        next(results)
+    results.close()
+    gate.set()
+
+    dispatcher.join()
+    assert dispatcher.get_stats()['tasks'].get('cancelled', 0) == 2
+
+
+def test_watchdog_times_out_leader_and_followers(make_dispatcher):
+    returned = threading.Event()
+    dispatcher, service, sink = make_dispatcher(hung_first(1.5, returned),
+                                                inventory_workers=4, task_timeout=0.5)
+    leader = dispatcher.submit('inventory')
+    assert wait_until(lambda: service.calls == 1)
+    # Дубликаты встают позже лидера - их собственный срок ещё не вышел, когда бросают лидера
+    time.sleep(0.2)
+    followers = [dispatcher.submit('inventory') for _ in range(3)]
+    assert wait_until(lambda: dispatcher.single_flight.shared_inflight == 3)
+
+    with pytest.raises(TimeoutError):
+        leader.result(5)
+    for follower in followers:
+        with pytest.raises(CallAbandoned):
+            follower.result(5)
+
+    # Отвиснувший лидер не публикует поздний успех
+    assert returned.wait(5)
+    time.sleep(0.1)
+    dispatcher.shutdown()
+    by_task = records_by_task(sink)
+    assert len(by_task) == 4
+    assert all(statuses == ['timeout'] for statuses in by_task.values())
+    assert dispatcher.tasks_timed_out == 4
+    assert dispatcher.workers_replaced == 1
+
+
+def test_pool_recovers_after_timeout(make_dispatcher):
+    returned = threading.Event()
+    dispatcher, _, _ = make_dispatcher(hung_first(0.6, returned), task_timeout=0.2)
+
+    with pytest.raises(TimeoutError):
+        dispatcher.submit('inventory').result(5)
+    # Замена зависшего воркера уже берёт задачи
+    assert dispatcher.submit('inventory').result(5)['status'] == 'success'
+    assert returned.wait(5)
+
+
+def test_pipeline_publishes_one_record_per_task(make_dispatcher):
+    dispatcher, _, sink = make_dispatcher(inventory_workers=3, pipeline=True, stage_queue_size=1,
+                                          task_timeout=0.5, persist_delay=0.3)
+    futures = [dispatcher.submit('inventory') for _ in range(8)]
+    dispatcher.join()
+    for future in futures:
+        future.exception(10)
+    # Задачи, брошенные сторожем, дописывает стадия persist - ждём её
+    time.sleep(1)
+    report = dispatcher.shutdown()
+
+    by_task = records_by_task(sink)
+    assert len(by_task) == 8
+    assert all(len(statuses) == 1 for statuses in by_task.values())
+    tasks = dispatcher.get_stats()['tasks']
+    assert tasks.get('success', 0) + tasks.get('timeout', 0) == 8
+    assert report['timed_out'] == tasks.get('timeout', 0)
+
+
+def test_shutdown_drain_finishes_queue(make_dispatcher):
+    gate = threading.Event()
+    dispatcher, _, sink = make_dispatcher(gated(gate))
+    futures = [dispatcher.submit('inventory') for _ in range(5)]
+    threading.Timer(0.1, gate.set).start()
+
+    report = dispatcher.shutdown(SHUTDOWN_DRAIN)
+
+    assert report['cancelled'] == [] and report['in_flight'] == []
+    assert all(future.result(0)['status'] == 'success' for future in futures)
+    assert len(sink.get_records()) == 5
+
+
+def test_shutdown_cancel_reports_dropped_tasks(make_dispatcher):
+    gate = threading.Event()
+    dispatcher, service, sink = make_dispatcher(gated(gate))
+    running = dispatcher.submit('inventory')
+    assert wait_until(lambda: service.calls == 1)
+    queued = [dispatcher.submit('inventory') for _ in range(4)]
+    threading.Timer(0.1, gate.set).start()
+
+    report = dispatcher.shutdown(SHUTDOWN_CANCEL)
+
+    assert len(report['cancelled']) == 4
+    assert all(future.cancelled() for future in queued)
+    # Уже выполнявшуюся задачу дождались
+    assert running.result(0)['status'] == 'success'
+    assert report['in_flight'] == []
+    assert len(sink.get_records()) == 1
+    with pytest.raises(CancelledError):
+        queued[0].result(0)
+
+
+def test_shutdown_deadline_reports_in_flight(make_dispatcher):
+    gate = threading.Event()
+    dispatcher, service, _ = make_dispatcher(gated(gate))
+    running = dispatcher.submit('inventory')
+    assert wait_until(lambda: service.calls == 1)
+
+    report = dispatcher.shutdown(SHUTDOWN_CANCEL, timeout=0.2)
+    gate.set()
+
+    assert report['in_flight'] == [running.result(5)['task_id']]
+    assert report['workers_alive'] == ['Worker-1']
@@ -0,0 +1,56 @@
+"""Сборщик Linux на настоящей системе"""
+import asyncio
+import sys
+import time
+
+import pytest
+
+from datacls_models import InventoryConfig
+from inventory_service_linux import LinuxInventoryService
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith('linux'), reason="сборщик Linux")
+
+
+@pytest.fixture
+def service(logger):
+    return LinuxInventoryService(logger, InventoryConfig(write_payload=False))
+
+
+def test_async_collect_does_not_block_event_loop(service, monkeypatch):
+    check_file_permissions = service._check_file_permissions
+
+    def stuck():
+        # Как чтение с зависшего NFS: поток спит, event loop должен крутиться дальше
+        time.sleep(0.3)
+        return check_file_permissions()
+
+    monkeypatch.setattr(service, '_check_file_permissions', stuck)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        result = await service.collect_os_info_async()
+        ticking.cancel()
+        return result, ticks
+
+    result, ticks = asyncio.run(scenario())
+    assert result == service.collect_os_info()
+    assert ticks >= 10
+
+
+def test_repeated_collect_hits_probe_cache(service):
+    first = service.collect_os_info()
+    misses = service.probe_cache.stats()['misses']
+
+    assert service.collect_os_info() == first
+    stats = service.probe_cache.stats()
+    # Файлы не менялись - второй сбор ничего не пересчитывает
+    assert stats['misses'] == misses
+    assert stats['hits'] > 0
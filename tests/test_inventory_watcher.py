@@ -0,0 +1,122 @@
+"""Режим --watch: пересбор по событиям и по таймеру"""
+import os
+import threading
+
+import pytest
+
+from conftest import CachedInventoryService, FakeInventoryService, wait_until
+from datacls_models import InventoryResult
+from inotify import inotify_available
+from inventory_watcher import InventoryWatcher
+
+
+class FileInventoryService(FakeInventoryService):
+    """Результат - содержимое файла; за ним --watch и следит"""
+
+    def __init__(self, logger, path):
+        super().__init__(logger, lambda call: InventoryResult(ProductName=path.read_text(encoding='utf-8')))
+        self.path = path
+
+    def watched_paths(self):
+        return [str(self.path)]
+
+
+@pytest.fixture
+def run_watcher(logger):
+    """run_watcher(сервис, **настройки) -> (наблюдатель, полученные результаты); крутится в потоке"""
+    started = []
+
+    def run(service, **options):
+        changes = []
+        watcher = InventoryWatcher(service, logger, changes.append, **options)
+        thread = threading.Thread(target=watcher.run, daemon=True)
+        thread.start()
+        started.append((watcher, thread))
+        assert wait_until(lambda: len(changes) == 1)
+        return watcher, changes
+
+    yield run
+    for watcher, thread in started:
+        watcher.stop()
+        thread.join(5)
+        assert not thread.is_alive()
+
+
+def names(changes):
+    return [result.ProductName for result in changes]
+
+
+def test_change_and_rescan_bypass_warm_cache(logger, tmp_path):
+    # Файл поменялся в пределах тика mtime: отпечаток тот же, содержимое - новое
+    service = CachedInventoryService(logger, tmp_path / 'cache.json',
+                                     collect=lambda call: InventoryResult(ProductName=f'os-{call}'))
+    changes = []
+    watcher = InventoryWatcher(service, logger, changes.append, rescan_interval=0)
+
+    watcher._collect('start')
+    watcher._collect('poll')
+    assert [result.ProductName for result in changes] == ['os-1']
+
+    watcher._collect('change')
+    watcher._collect('rescan')
+    assert [result.ProductName for result in changes] == ['os-1', 'os-2', 'os-3']
+    # Свежий результат заменил запись в кэше
+    assert service.collect_os_info().ProductName == 'os-3'
+
+
+def test_unchanged_rescan_does_not_rewrite_warm_cache(logger, tmp_path):
+    service = CachedInventoryService(logger, tmp_path / 'cache.json',
+                                     collect=lambda call: InventoryResult(ProductName='same'))
+    watcher = InventoryWatcher(service, logger, lambda result: None, rescan_interval=0)
+
+    watcher._collect('start')
+    for _ in range(3):
+        watcher._collect('rescan')
+
+    assert service.calls == 4
+    assert service.warm_cache.stats()['writes'] == 1
+    assert watcher.stats()['changes'] == 1
+
+
+@pytest.mark.skipif(not inotify_available(), reason="нужен inotify")
+def test_burst_of_writes_is_collected_once(run_watcher, logger, tmp_path):
+    path = tmp_path / 'os-release'
+    path.write_text('v1', encoding='utf-8')
+    service = FileInventoryService(logger, path)
+    watcher, changes = run_watcher(service, debounce=0.2, rescan_interval=0)
+    assert watcher.stats()['watched_dirs'] == 1
+
+    # Пакетный менеджер: несколько записей и замена файла переименованием
+    for version in ('v2', 'v3'):
+        path.write_text(version, encoding='utf-8')
+    (tmp_path / 'os-release.new').write_text('v4', encoding='utf-8')
+    os.replace(tmp_path / 'os-release.new', path)
+
+    assert wait_until(lambda: names(changes) == ['v1', 'v4'])
+    assert service.calls == 2
+    # Чужой файл в той же папке сбор не будит
+    (tmp_path / 'unrelated').write_text('x', encoding='utf-8')
+    path.write_text('v5', encoding='utf-8')
+    assert wait_until(lambda: names(changes) == ['v1', 'v4', 'v5'])
+    assert service.calls == 3
+
+
+@pytest.mark.skipif(not inotify_available(), reason="нужен inotify")
+def test_rescan_without_events(run_watcher, logger, tmp_path):
+    path = tmp_path / 'os-release'
+    path.write_text('v1', encoding='utf-8')
+    service = FileInventoryService(logger, path)
+    watcher, changes = run_watcher(service, debounce=0, rescan_interval=0.1)
+
+    assert wait_until(lambda: watcher.stats()['rescans'] >= 2)
+    assert names(changes) == ['v1']
+
+
+def test_polling_without_watched_paths(run_watcher, logger):
+    state = {'name': 'v1'}
+    service = FakeInventoryService(logger, lambda call: InventoryResult(ProductName=state['name']))
+    watcher, changes = run_watcher(service, rescan_interval=0, poll_interval=0.05)
+
+    assert watcher.stats()['watched_dirs'] == 0
+    state['name'] = 'v2'
+    assert wait_until(lambda: names(changes) == ['v1', 'v2'])
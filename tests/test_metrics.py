@@ -0,0 +1,114 @@
+"""Метрики: формат Prometheus, перцентили, выгрузка"""
+import socket
+import urllib.error
+import urllib.request
+
+import pytest
+
+from datacls_models import MetricsConfig
+from metrics import MetricsExporter, MetricsRegistry
+
+
+def test_counter_and_gauge_render_with_labels():
+    registry = MetricsRegistry()
+    tasks = registry.counter('collector_tasks_total', 'Задачи')
+    tasks.inc(status='success')
+    tasks.inc(2, status='success')
+    tasks.inc(status='error "quoted"')
+    depth = registry.gauge('collector_queue_depth', 'Очередь')
+    depth.set_function(lambda: 7)
+    broken = registry.gauge('collector_broken', 'Падает при выгрузке')
+    broken.set_function(lambda: 1 / 0)
+
+    assert registry.render_prometheus().splitlines() == [
+        '# HELP collector_broken Падает при выгрузке',
+        '# TYPE collector_broken gauge',
+        '# HELP collector_queue_depth Очередь',
+        '# TYPE collector_queue_depth gauge',
+        'collector_queue_depth 7',
+        '# HELP collector_tasks_total Задачи',
+        '# TYPE collector_tasks_total counter',
+        'collector_tasks_total{status="error \\"quoted\\""} 1',
+        'collector_tasks_total{status="success"} 3',
+    ]
+    # Повторный запрос по имени - та же метрика
+    assert registry.counter('collector_tasks_total') is tasks
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram('collector_stage_seconds', 'Стадии', buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, stage='collect')
+
+    lines = registry.render_prometheus().splitlines()
+    assert lines[2:] == [
+        'collector_stage_seconds_bucket{stage="collect",le="0.1"} 2',
+        'collector_stage_seconds_bucket{stage="collect",le="1"} 3',
+        'collector_stage_seconds_bucket{stage="collect",le="+Inf"} 4',
+        'collector_stage_seconds_sum{stage="collect"} 3.65',
+        'collector_stage_seconds_count{stage="collect"} 4',
+    ]
+
+
+def test_summary_percentiles():
+    registry = MetricsRegistry()
+    latency = registry.histogram('collector_task_seconds')
+    for ms in range(1, 101):
+        latency.observe(ms / 1000, status='success')
+    registry.histogram('collector_unused_seconds')
+
+    summary = registry.summary()
+    assert list(summary) == ['collector_task_seconds']
+    stats = summary['collector_task_seconds']['success']
+    assert stats['count'] == 100
+    assert stats['p50'] == pytest.approx(0.051)
+    assert stats['p99'] == pytest.approx(0.1)
+
+
+def test_textfile_is_written_atomically(tmp_path):
+    registry = MetricsRegistry()
+    registry.counter('collector_tasks_total').inc()
+    path = tmp_path / 'nested' / 'metrics.prom'
+    registry.write_textfile(path)
+
+    assert path.read_text(encoding='utf-8') == registry.render_prometheus()
+    assert [p.name for p in path.parent.iterdir()] == ['metrics.prom']
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def test_http_exporter_serves_metrics_and_final_textfile(tmp_path):
+    registry = MetricsRegistry()
+    registry.counter('collector_tasks_total').inc()
+    port = free_port()
+    exporter = MetricsExporter(registry, MetricsConfig(export_interval=0.05, http_port=port), str(tmp_path))
+    exporter.start()
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics', timeout=5) as response:
+            assert response.read().decode('utf-8') == registry.render_prometheus()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/other', timeout=5)
+    finally:
+        exporter.stop()
+
+    assert (tmp_path / 'metrics.prom').read_text(encoding='utf-8') == registry.render_prometheus()
+
+
+def test_dispatcher_feeds_global_registry(make_dispatcher):
+    from dispatcher import TASKS_TOTAL
+    from metrics import REGISTRY
+
+    before = TASKS_TOTAL.value(status='success')
+    dispatcher, _, _ = make_dispatcher(inventory_workers=2)
+    for _ in range(3):
+        dispatcher.submit('inventory').result(5)
+
+    assert TASKS_TOTAL.value(status='success') == before + 3
+    text = REGISTRY.render_prometheus()
+    assert 'collector_workers 2' in text
+    assert 'collector_queue_wait_seconds_count' in text
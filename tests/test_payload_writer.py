@@ -0,0 +1,120 @@
+"""PayloadWriter: один писатель, атомарная подмена файла, пропуск одинакового содержимого"""
+import json
+import os
+import threading
+
+import pytest
+
+import payload_writer
+from payload_writer import PayloadWriter
+
+
+@pytest.fixture
+def make_writer(logger):
+    created = []
+
+    def make(path, **options):
+        writer = PayloadWriter(path, logger, **options)
+        created.append(writer)
+        return writer
+
+    yield make
+    for writer in created:
+        writer.close()
+
+
+def payload(n: int, timestamp: float = 0.0):
+    return {'os': {'ProductName': f'test-{n}'}, '_diagnostic': {'timestamp': timestamp}}
+
+
+def test_pretty_payload_is_replaced_atomically(make_writer, tmp_path):
+    path = tmp_path / 'payload.json'
+    writer = make_writer(path)
+    writer.submit(payload(1))
+    writer.flush()
+
+    assert json.loads(path.read_text(encoding='utf-8')) == payload(1)
+    assert os.stat(path).st_mode & 0o777 == payload_writer.DEFAULT_FILE_MODE
+    # Временные файлы не остаются рядом
+    assert [p.name for p in tmp_path.iterdir()] == ['payload.json']
+
+
+def test_same_content_is_not_rewritten(make_writer, tmp_path):
+    writer = make_writer(tmp_path / 'payload.json')
+    for timestamp in (1.0, 2.0):
+        writer.submit(payload(1, timestamp))
+        writer.flush()
+
+    stats = writer.stats()
+    assert stats['written'] == 1
+    assert stats['skipped_identical'] == 1
+
+
+def test_readers_never_see_half_written_file(make_writer, tmp_path):
+    path = tmp_path / 'payload.json'
+    writer = make_writer(path)
+    writer.submit(payload(0))
+    writer.flush()
+    stop = threading.Event()
+    broken = []
+
+    def reader():
+        while not stop.is_set():
+            try:
+                json.loads(path.read_text(encoding='utf-8'))
+            except ValueError as e:
+                broken.append(e)
+
+    readers = [threading.Thread(target=reader) for _ in range(2)]
+    for thread in readers:
+        thread.start()
+    for n in range(1, 200):
+        writer.submit({'os': {'ProductName': 'x' * (n * 50)}})
+    writer.flush()
+    stop.set()
+    for thread in readers:
+        thread.join()
+
+    assert broken == []
+    assert json.loads(path.read_text(encoding='utf-8')) == {'os': {'ProductName': 'x' * (199 * 50)}}
+    # Воркеры обгоняли диск - промежуточные payload схлопнулись
+    stats = writer.stats()
+    assert stats['written'] + stats['coalesced'] == stats['submitted'] == 200
+
+
+def test_failed_replace_keeps_previous_file(make_writer, tmp_path, monkeypatch):
+    path = tmp_path / 'payload.json'
+    writer = make_writer(path)
+    writer.submit(payload(1))
+    writer.flush()
+
+    def denied(src, dst):
+        raise PermissionError("нет прав")
+
+    monkeypatch.setattr(payload_writer.os, 'replace', denied)
+    writer.submit(payload(2))
+    writer.flush()
+
+    assert json.loads(path.read_text(encoding='utf-8')) == payload(1)
+    assert writer.stats()['write_errors'] == 1
+    assert [p.name for p in tmp_path.iterdir()] == ['payload.json']
+
+
+def test_fallback_file_when_target_is_not_writable(make_writer, tmp_path):
+    fallback = tmp_path / 'fallback.json'
+    writer = make_writer(tmp_path / 'missing' / 'payload.json', fallback_file=fallback)
+    writer.submit(payload(1))
+    writer.flush()
+
+    assert json.loads(fallback.read_text(encoding='utf-8')) == payload(1)
+    assert writer.stats()['write_errors'] == 0
+
+
+def test_jsonl_appends_changed_payloads(make_writer, tmp_path):
+    writer = make_writer(tmp_path / 'payload.json', payload_format='jsonl')
+    for n in (1, 1, 2):
+        writer.submit(payload(n))
+        writer.flush()
+
+    lines = (tmp_path / 'payload.jsonl').read_text(encoding='utf-8').splitlines()
+    assert [json.loads(line) for line in lines] == [payload(1), payload(2)]
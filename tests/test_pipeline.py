@@ -0,0 +1,88 @@
+"""Конвейер стадий: передача между стадиями, обратное давление, ошибки"""
+import threading
+import time
+
+from pipeline import Pipeline, Stage
+
+
+def test_items_pass_through_all_stages(logger):
+    done = []
+    done_lock = threading.Lock()
+
+    def persist(item):
+        with done_lock:
+            done.append(item)
+
+    pipeline = Pipeline([
+        Stage('collect', lambda n: n * 10, logger, concurrency=3),
+        Stage('serialize', str, logger, concurrency=2),
+        Stage('persist', persist, logger),
+    ])
+    pipeline.start()
+    for n in range(20):
+        pipeline.submit(n)
+    pipeline.join()
+    pipeline.stop(5)
+
+    assert sorted(done, key=int) == [str(n * 10) for n in range(20)]
+    stats = pipeline.stats()
+    assert [stats[name]['processed'] for name in ('collect', 'serialize', 'persist')] == [20, 20, 20]
+    assert stats['collect']['concurrency'] == 3
+
+
+def test_full_next_stage_blocks_previous(logger):
+    gate = threading.Event()
+    collected = []
+    pipeline = Pipeline([
+        Stage('collect', lambda n: collected.append(n) or n, logger, queue_size=1),
+        Stage('persist', lambda n: gate.wait(5), logger, queue_size=1),
+    ])
+    pipeline.start()
+    submitter = threading.Thread(target=lambda: [pipeline.submit(n) for n in range(10)])
+    submitter.start()
+    time.sleep(0.2)
+
+    # persist держит одну, в его очереди одна, collect ждёт места с третьей, ещё одна в очереди collect
+    assert len(collected) == 3
+    assert submitter.is_alive()
+    gate.set()
+    submitter.join(5)
+    pipeline.join()
+    pipeline.stop(5)
+    assert len(collected) == 10
+
+
+def test_failed_item_goes_to_on_error_and_stops(logger):
+    failed = []
+    persisted = []
+
+    def serialize(n):
+        if n == 2:
+            raise ValueError("не сериализуется")
+        return n
+
+    pipeline = Pipeline([
+        Stage('serialize', serialize, logger, on_error=lambda item, e: failed.append((item, str(e)))),
+        Stage('persist', persisted.append, logger),
+    ])
+    pipeline.start()
+    for n in range(4):
+        pipeline.submit(n)
+    pipeline.join()
+    pipeline.stop(5)
+
+    assert failed == [(2, "не сериализуется")]
+    assert persisted == [0, 1, 3]
+    assert pipeline.stats()['serialize']['errors'] == 1
+
+
+def test_stop_finishes_queued_items(logger):
+    handled = []
+    stage = Stage('persist', lambda n: (time.sleep(0.01), handled.append(n)), logger)
+    pipeline = Pipeline([stage])
+    pipeline.start()
+    for n in range(5):
+        pipeline.submit(n)
+    pipeline.stop(5)
+
+    assert handled == list(range(5))
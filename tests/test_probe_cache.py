@@ -0,0 +1,61 @@
+"""ProbeCache: разбор файла живёт, пока файл не поменялся"""
+import os
+
+from probe_cache import ProbeCache
+
+
+def test_read_is_parsed_once_until_file_changes(tmp_path):
+    path = tmp_path / 'os-release'
+    path.write_text('NAME=first\n', encoding='utf-8')
+    cache = ProbeCache()
+    parsed = []
+
+    def parser(text):
+        parsed.append(text)
+        return text.strip()
+
+    assert cache.read(str(path), parser) == 'NAME=first'
+    assert cache.read(str(path), parser) == 'NAME=first'
+    assert len(parsed) == 1
+
+    path.write_text('NAME=second-release\n', encoding='utf-8')
+    assert cache.read(str(path), parser) == 'NAME=second-release'
+    assert len(parsed) == 2
+    assert cache.stats() == {'hits': 1, 'misses': 2, 'entries': 1}
+
+
+def test_parsers_of_one_file_are_cached_separately(tmp_path):
+    path = tmp_path / 'version'
+    path.write_text('Linux 6.1\n', encoding='utf-8')
+    cache = ProbeCache()
+
+    assert cache.read(str(path), str.split, name='words') == ['Linux', '6.1']
+    assert cache.read(str(path), len, name='length') == 10
+    assert cache.stats()['entries'] == 2
+
+
+def test_chmod_changes_fingerprint(tmp_path):
+    path = tmp_path / 'passwd'
+    path.write_text('root\n', encoding='utf-8')
+    before = ProbeCache.fingerprint(os.stat(path))
+    os.chmod(path, 0o600)
+    # Содержимое и mtime те же - поменялся только ctime
+    assert ProbeCache.fingerprint(os.stat(path)) != before
+
+
+def test_invalidate_forgets_one_file(tmp_path):
+    first, second = tmp_path / 'a', tmp_path / 'b'
+    first.write_text('a', encoding='utf-8')
+    second.write_text('b', encoding='utf-8')
+    cache = ProbeCache()
+    for path in (first, second):
+        cache.read(str(path), str.upper)
+
+    cache.invalidate(str(first))
+    assert cache.stats()['entries'] == 1
+    cache.read(str(second), str.upper)
+    assert cache.stats()['hits'] == 1
+
+
+def test_stat_of_missing_file_is_none(tmp_path):
+    assert ProbeCache.stat(str(tmp_path / 'missing')) is None
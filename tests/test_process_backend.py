@@ -0,0 +1,78 @@
+"""Прогретые процессы: логи детей через родителя, замена зависшего ребёнка"""
+import logging
+import os
+import signal
+import sys
+import threading
+
+import pytest
+
+from cancellation import CancellationToken, TaskCancelled, bind
+from datacls_models import InventoryConfig, LogConfig
+from process_backend import ProcessPoolBackend
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith('linux') or not hasattr(signal, 'SIGSTOP'),
+                                reason="нужен Linux: сбор в ребёнке настоящий, зависание - через SIGSTOP")
+
+
+def test_child_logs_go_through_parent(tmp_path, caplog):
+    backend = ProcessPoolBackend(LogConfig(level='info', log_path=str(tmp_path)), InventoryConfig())
+    with caplog.at_level(logging.INFO):
+        backend.start(2)
+        try:
+            assert backend.collect().ProductName
+        finally:
+            backend.close()
+
+    child_records = [record for record in caplog.records if record.process != os.getpid()]
+    assert child_records
+    # Общий log.txt пишет только родитель: у детей нет ни файла, ни своей ротации
+    assert not (tmp_path / 'log.txt').exists()
+
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = ProcessPoolBackend(LogConfig(level='warning', log_path=str(tmp_path)), InventoryConfig())
+    backend.start(1)
+    yield backend
+    backend.close()
+
+
+def collect_with_timeout(backend: ProcessPoolBackend, timeout: float):
+    """
+    Сбор с токеном, который отменяется через timeout - как это делает сторож диспетчера.
+    Сам сбор идёт в отдельном потоке: если отмена не сработает, тест упадёт, а не повиснет
+    """
+    token = CancellationToken(timeout)
+    outcome = []
+
+    def collect():
+        try:
+            with bind(token):
+                outcome.append(backend.collect())
+        except BaseException as e:
+            outcome.append(e)
+
+    collector = threading.Thread(target=collect, daemon=True)
+    collector.start()
+    collector.join(timeout)
+    token.cancel('timeout')
+    collector.join(timeout + 2)
+    assert outcome, "сбор не вернулся после отмены"
+    if isinstance(outcome[0], BaseException):
+        raise outcome[0]
+    return outcome[0]
+
+
+def test_hung_child_is_killed_and_replaced(backend):
+    hung = backend._workers[0].process
+    os.kill(hung.pid, signal.SIGSTOP)
+
+    with pytest.raises(TaskCancelled):
+        collect_with_timeout(backend, 0.3)
+
+    assert backend.processes_killed == 1
+    assert backend.size == 1
+    assert not hung.is_alive()
+    # Замена прогрета и собирает
+    assert collect_with_timeout(backend, 10).ProductName
@@ -0,0 +1,48 @@
+"""--profile и --trace-malloc: профили воркеров и снимки памяти"""
+import json
+
+from conftest import FakeInventoryService
+from datacls_models import InventoryResult, WorkersConfig
+from dispatcher import DispatcherService
+from profiling import MemoryTracer, TaskProfiler
+
+
+def busy_collect(call):
+    sum(i * i for i in range(20000))
+    return InventoryResult(ProductName=f'test-{call}')
+
+
+def test_dispatcher_workers_are_profiled(logger, tmp_path):
+    profiler = TaskProfiler(str(tmp_path), every=2, logger=logger)
+    dispatcher = DispatcherService(WorkersConfig(inventory_workers=2, coalesce_window=0), logger,
+                                   FakeInventoryService(logger, busy_collect), profiler=profiler)
+    dispatcher.start_workers()
+    for _ in range(6):
+        dispatcher.submit('inventory').result(5)
+    dispatcher.shutdown()
+
+    report = json.loads(profiler.dump().read_text(encoding='utf-8'))
+    assert (report['tasks_seen'], report['tasks_profiled'], report['every']) == (6, 3, 2)
+    assert 'busy_collect' in {row['function'] for row in report['functions']}
+    assert len(list(tmp_path.glob('profile-*.pstats'))) == 1
+
+
+def test_empty_profile_is_not_written(logger, tmp_path):
+    profiler = TaskProfiler(str(tmp_path), logger=logger)
+    assert profiler.dump() is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_memory_growth_points_at_allocation(tmp_path):
+    tracer = MemoryTracer(str(tmp_path))
+    tracer.start()
+    kept = [bytearray(1024) for _ in range(1000)]
+    report = json.loads(tracer.stop().read_text(encoding='utf-8'))
+
+    assert kept
+    assert report['traced_peak'] >= 1000 * 1024
+    top = report['growth'][0]
+    assert top['file'] == __file__
+    assert top['size_diff'] >= 1000 * 1024
+    # Повторная остановка - без второго отчёта
+    assert tracer.stop() is None
@@ -0,0 +1,34 @@
+"""Кадры протокола демона: длина + JSON"""
+import io
+
+import pytest
+
+import socket_protocol
+from socket_protocol import HEADER, ProtocolError, encode_message, read_message
+
+
+def test_messages_round_trip_back_to_back():
+    stream = io.BytesIO(encode_message({'id': 1, 'command': 'inventory'})
+                        + encode_message({'id': 2, 'command': 'пинг'}))
+
+    assert read_message(stream) == {'id': 1, 'command': 'inventory'}
+    assert read_message(stream) == {'id': 2, 'command': 'пинг'}
+    assert read_message(stream) is None
+
+
+@pytest.mark.parametrize('data, error', [
+    (b'\x00\x00', "посреди заголовка"),
+    (HEADER.pack(10) + b'{}', "посреди сообщения"),
+    (HEADER.pack(3) + b'abc', "Не JSON"),
+    (HEADER.pack(2) + b'[]', "JSON-объектом"),
+    (HEADER.pack(socket_protocol.MAX_MESSAGE_SIZE + 1), "лимит"),
+])
+def test_broken_frames_are_rejected(data, error):
+    with pytest.raises(ProtocolError, match=error):
+        read_message(io.BytesIO(data))
+
+
+def test_oversized_message_is_not_encoded(monkeypatch):
+    monkeypatch.setattr(socket_protocol, 'MAX_MESSAGE_SIZE', 16)
+    with pytest.raises(ProtocolError):
+        encode_message({'result': 'x' * 100})
@@ -0,0 +1,81 @@
+"""SpoolWatcher: файлы забираются переименованием, команды идут в общий диспетчер"""
+import threading
+
+import pytest
+
+from conftest import wait_until
+from spool_watcher import SpoolWatcher
+
+
+@pytest.fixture
+def run_watcher(make_dispatcher, logger, tmp_path):
+    """run_watcher() -> (наблюдатель, хранилище результатов); наблюдатель крутится в потоке до конца теста"""
+    started = []
+
+    def run():
+        dispatcher, _, sink = make_dispatcher(inventory_workers=2)
+        watcher = SpoolWatcher(str(tmp_path / 'spool'), dispatcher, logger, poll_interval=0.05)
+        thread = threading.Thread(target=watcher.run, daemon=True)
+        thread.start()
+        started.append((watcher, thread))
+        return watcher, sink
+
+    yield run
+    for watcher, thread in started:
+        watcher.stop()
+        thread.join(5)
+
+
+def test_files_are_processed_and_moved_to_done(run_watcher, tmp_path):
+    spool = tmp_path / 'spool'
+    spool.mkdir()
+    (spool / 'first.txt').write_text("inventory\ninventory\n", encoding='utf-8')
+    # Недописанный файл не трогаем, пока его не переименуют
+    (spool / 'second.txt.part').write_text("inventory\n", encoding='utf-8')
+    watcher, sink = run_watcher()
+
+    assert wait_until(lambda: watcher.stats()['files_done'] == 1)
+    assert (spool / 'second.txt.part').exists()
+    (spool / 'second.txt.part').rename(spool / 'second.txt')
+    assert wait_until(lambda: watcher.stats()['files_done'] == 2)
+
+    assert sorted(path.name for path in (spool / 'done').iterdir()) == ['first.txt', 'second.txt']
+    assert not any((spool / 'processing').iterdir())
+    assert watcher.stats()['tasks'] == 3
+    assert wait_until(lambda: len(sink.get_records()) == 3)
+
+
+def test_binary_file_goes_to_failed(run_watcher, tmp_path):
+    spool = tmp_path / 'spool'
+    spool.mkdir()
+    (spool / 'broken.bin').write_bytes(b"\x00\x01inventory")
+    watcher, sink = run_watcher()
+
+    assert wait_until(lambda: watcher.stats()['files_failed'] == 1)
+    assert (spool / 'failed' / 'broken.bin').exists()
+    assert sink.get_records() == []
+
+
+def test_file_left_in_processing_is_finished_on_start(run_watcher, tmp_path):
+    processing = tmp_path / 'spool' / 'processing'
+    processing.mkdir(parents=True)
+    (processing / 'left.txt').write_text("inventory\n", encoding='utf-8')
+    watcher, sink = run_watcher()
+
+    assert wait_until(lambda: watcher.stats()['files_done'] == 1)
+    assert (tmp_path / 'spool' / 'done' / 'left.txt').exists()
+    assert wait_until(lambda: len(sink.get_records()) == 1)
+
+
+def test_only_one_instance_claims_a_file(make_dispatcher, logger, tmp_path):
+    dispatcher, _, _ = make_dispatcher()
+    first = SpoolWatcher(str(tmp_path), dispatcher, logger)
+    second = SpoolWatcher(str(tmp_path), dispatcher, logger)
+    path = tmp_path / 'commands.txt'
+    path.write_text("inventory\n", encoding='utf-8')
+
+    claimed = first._claim(path)
+    assert claimed is not None
+    assert claimed[0] == tmp_path / 'processing' / 'commands.txt'
+    # Второй экземпляр опоздал: файла на месте уже нет
+    assert second._claim(path) is None
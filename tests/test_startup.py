@@ -0,0 +1,33 @@
+"""Холодный старт: тяжёлые модули не грузятся при импорте, замер importtime разбирается"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+import benchmark
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def loaded_after_import(module: str, candidates):
+    """Какие из candidates оказались в sys.modules после import module в чистом интерпретаторе"""
+    code = f"import sys, {module}; print(' '.join(m for m in {list(candidates)!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return result.stdout.split()
+
+
+@pytest.mark.parametrize('module, deferred', [
+    ('main', ('argparse', 'subprocess', 'pwd', 'grp', 'shutil', 'json', 'platform', 'tempfile',
+              'asyncio', 'multiprocessing', 'http.server', 'cProfile', 'tracemalloc')),
+    ('utils', ('argparse', 'subprocess', 'platform', 'json')),
+    ('inventory_service_linux', ('subprocess', 'pwd', 'grp', 'shutil', 'tempfile')),
+])
+def test_heavy_modules_are_imported_on_demand(module, deferred):
+    assert loaded_after_import(module, deferred) == []
+
+
+def test_import_times_are_parsed():
+    times = benchmark._import_times('utils')
+    self_us, cumulative_us = times['utils']
+    assert 0 < self_us <= cumulative_us
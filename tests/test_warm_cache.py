@@ -0,0 +1,106 @@
+"""Тёплый кэш между запусками"""
+import json
+import sys
+import threading
+
+import pytest
+
+import warm_cache
+from conftest import CachedInventoryService
+from datacls_models import InventoryConfig, InventoryResult, WorkersConfig
+from dispatcher import DispatcherService
+
+
+class FakeProcessBackend:
+    """Вместо прогретых процессов - счётчик сборов (как у детей, без своего кэша)"""
+
+    def __init__(self):
+        self.collects = 0
+        self._lock = threading.Lock()
+
+    def start(self, count):
+        pass
+
+    def close(self):
+        pass
+
+    def collect(self):
+        with self._lock:
+            self.collects += 1
+            return InventoryResult(ProductName=f'process-{self.collects}')
+
+
+def test_process_backend_goes_through_parent_cache(logger, tmp_path):
+    cache_path = tmp_path / 'cache.json'
+    records = []
+    for run in range(2):
+        # Два запуска подряд: второй берёт результат из файла, процесс не трогает
+        service = CachedInventoryService(logger, cache_path)
+        backend = FakeProcessBackend()
+        dispatcher = DispatcherService(WorkersConfig(coalesce_window=0), logger, service,
+                                       process_backend=backend)
+        dispatcher.start_workers()
+        records.append(dispatcher.submit('inventory').result(5))
+        dispatcher.shutdown()
+        assert backend.collects == (1 if run == 0 else 0)
+
+    assert records[1]['data'] == records[0]['data']
+    assert service.warm_cache.stats()['hits'] == 1
+
+
+def test_next_run_hits_until_sources_change(logger, tmp_path):
+    cache_path = tmp_path / 'cache.json'
+    first = CachedInventoryService(logger, cache_path)
+    assert first.collect_os_info().ProductName == 'test-1'
+
+    second = CachedInventoryService(logger, cache_path)
+    assert second.collect_os_info().ProductName == 'test-1'
+    assert second.calls == 0
+
+    second.fingerprint = 'v2'
+    assert second.collect_os_info().ProductName == 'test-1'
+    assert second.calls == 1
+    assert second.warm_cache.stats() == {'hits': 1, 'misses': 1, 'corrupted': 0, 'writes': 1}
+    assert json.loads(cache_path.read_text(encoding='utf-8'))['fingerprints'] == 'v2'
+
+
+@pytest.mark.parametrize('content', [
+    'не json',
+    '[]',
+    json.dumps({'version': warm_cache.CACHE_VERSION - 1, 'os': 'test', 'fingerprints': 'v1',
+                'result': {'ProductName': 'старый'}}),
+    json.dumps({'version': warm_cache.CACHE_VERSION, 'os': 'test', 'fingerprints': 'v1', 'result': 'строка'}),
+    json.dumps({'version': warm_cache.CACHE_VERSION, 'os': 'test', 'fingerprints': 'v1',
+                'result': {'ProductName': 'x', 'NoSuchField': 1}}),
+])
+def test_corrupted_cache_is_a_miss_and_gets_rewritten(logger, tmp_path, content):
+    cache_path = tmp_path / 'cache.json'
+    cache_path.write_text(content, encoding='utf-8')
+    service = CachedInventoryService(logger, cache_path)
+
+    assert service.collect_os_info().ProductName == 'test-1'
+    stats = service.warm_cache.stats()
+    assert (stats['hits'], stats['corrupted'], stats['writes']) == (0, 1, 1)
+    assert CachedInventoryService(logger, cache_path).collect_os_info().ProductName == 'test-1'
+
+
+def test_unchanged_result_is_not_rewritten(logger, tmp_path):
+    service = CachedInventoryService(logger, tmp_path / 'cache.json')
+    result = service.collect_os_info()
+    # Тот же результат с теми же отпечатками - файл не трогаем
+    service._warm_store(service.fingerprint, result)
+
+    assert service.warm_cache.stats()['writes'] == 1
+    assert [p.name for p in tmp_path.iterdir()] == ['cache.json']
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason="сборщик Linux")
+def test_linux_service_second_start_uses_cache(logger, tmp_path):
+    from inventory_service_linux import LinuxInventoryService
+
+    config = InventoryConfig(write_payload=False, cache_file=str(tmp_path / 'cache.json'))
+    cold = LinuxInventoryService(logger, config).collect_os_info()
+    warm_service = LinuxInventoryService(logger, config)
+
+    assert warm_service.collect_os_info() == cold
+    assert warm_service.warm_cache.stats()['hits'] == 1
@@ -1,74 +1,258 @@
-import argparse
+import codecs
+import math
+import os
 from pathlib import Path
-from typing import List
+from typing import BinaryIO, Dict, Iterable, Iterator, Optional
 import sys
 
+# Потоковое чтение команд: размер порции и защита от бесконечной строки
+STREAM_CHUNK_SIZE = 64 * 1024
+MAX_COMMAND_LENGTH = 4096
+
+CGROUP_ROOT = Path('/sys/fs/cgroup')
+
 def parse_arguments():
     """Разбираем аргументы командной строки"""
+    import argparse
+    
     parser = argparse.ArgumentParser(
         description='Сбор информации об ОС (Windows/Linux)',
         epilog=f'Запуск: python {sys.argv[0]} файл_с_командами.txt'
     )
     
     parser.add_argument(
-        'command_file',
+        'command_files',
+        type=str,
+        nargs='*',
+        metavar='command_file',
+        help='Файлы со списком команд ("-" - читать из stdin)'
+    )
+    
+    parser.add_argument(
+        '--spool',
         type=str,
-        help='Файл со списком команд'
+        metavar='DIR',
+        help='Режим демона: следим за папкой и выполняем команды из новых файлов'
+    )
+    
+    parser.add_argument(
+        '--poll-interval',
+        type=float,
+        default=2.0,
+        help='Период опроса папки (или файлов ОС для --watch), если inotify недоступен (сек)'
+    )
+    
+    parser.add_argument(
+        '--daemon',
+        action='store_true',
+        help='Постоянный агент: команды принимаются через Unix-сокет (клиент - agent_client.py)'
+    )
+    
+    parser.add_argument(
+        '--socket',
+        type=str,
+        metavar='PATH',
+        help='Сокет демона (по умолчанию - [daemon] socket_path или agent.sock в папке логов)'
+    )
+    
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='Следим за файлами ОС и печатаем результат (JSON-строкой) только когда он поменялся'
+    )
+    
+    parser.add_argument(
+        '--debounce',
+        type=float,
+        default=0.5,
+        help='Для --watch: сколько секунд ждать тишины после пачки изменений'
+    )
+    
+    parser.add_argument(
+        '--rescan-interval',
+        type=float,
+        default=3600.0,
+        help='Для --watch: страховочный пересбор раз в N секунд (0 - выключен)'
+    )
+    
+    parser.add_argument(
+        '-q', '--quiet',
+        action='store_true',
+        help='Без баннера: не опрашиваем platform ради приветствия'
+    )
+    
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Не брать результат из тёплого кэша прошлого запуска и не сохранять его'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='cProfile задач в потоках-воркерах, профиль пишется в папку логов'
+    )
+    
+    parser.add_argument(
+        '--profile-every',
+        type=int,
+        default=0,
+        metavar='N',
+        help='Профилировать только каждую N-ю задачу (включает --profile)'
     )
     
-    return parser.parse_args()
+    parser.add_argument(
+        '--trace-malloc',
+        action='store_true',
+        help='Снимки tracemalloc до и после пачки задач, топ выделений - в папку логов'
+    )
+    
+    args = parser.parse_args()
+    if args.profile_every < 0:
+        parser.error('--profile-every должен быть положительным')
+    if args.profile_every:
+        args.profile = True
+    if args.debounce < 0 or args.rescan_interval < 0:
+        parser.error('--debounce и --rescan-interval не могут быть отрицательными')
+    if not args.command_files and not args.spool and not args.daemon and not args.watch:
+        parser.error('нужен файл с командами, --spool, --daemon или --watch')
+    if sum(map(bool, (args.spool, args.daemon, args.watch))) > 1:
+        parser.error('--spool, --daemon и --watch вместе не работают')
+    
+    return args
 
-def read_commands(file_path: str) -> List[str]:
+def _normalize_command(line: str) -> Optional[str]:
+    """Команда в нижнем регистре; пустые строки и комментарии - None"""
+    cmd = line.strip().lower()
+    if cmd and not cmd.startswith('#'):
+        return cmd
+    return None
+
+def _detect_encoding(chunk: bytes) -> Optional[str]:
     """
-    Безопасно читаем команды из файла.
-    Защита от:
-    - path traversal
-    - огромных файлов
-    - бинарных файлов
-    - отсутствия прав
+    Определяем кодировку по первой порции: UTF-8 (с BOM или без), иначе cp1251.
+    Нулевые байты - признак бинарного файла, тогда None.
     """
-    commands = []
-    
+    if b'\x00' in chunk:
+        return None
+    if chunk.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
     try:
-        # Защита от path traversal
-        safe_path = Path(file_path).resolve()
-        
-        if not safe_path.exists():
-            print(f"❌ Файл {safe_path} не найден!")
-            return commands
-        
-        # Защита от огромных файлов (больше 10MB)
-        MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
-        if safe_path.stat().st_size > MAX_FILE_SIZE:
-            print(f"❌ Файл слишком большой! Максимум 10MB")
-            return commands
-        
-        # Пробуем прочитать как текст
+        # final=False - порция могла оборваться посреди многобайтного символа
+        codecs.getincrementaldecoder('utf-8')().decode(chunk, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'cp1251'
+
+def iter_stream_commands(stream: BinaryIO, source: str) -> Iterator[str]:
+    """
+    Читаем поток порциями и сразу отдаём команды - файл целиком в память не грузим.
+    Бинарные данные - ValueError.
+    """
+    # read1 отдаёт то, что уже есть в буфере, и не ждёт заполнения всей порции (важно для stdin)
+    chunk = stream.read1(STREAM_CHUNK_SIZE)
+    encoding = _detect_encoding(chunk)
+    if encoding is None:
+        raise ValueError(f"Файл {source} не является текстовым!")
+
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    pending = ''
+    skipping = False
+
+    while chunk:
+        pending += decoder.decode(chunk)
+        lines = pending.split('\n')
+        pending = lines.pop()
+        for line in lines:
+            if skipping:
+                # Хвост слишком длинной строки - это точно не команда
+                skipping = False
+                continue
+            cmd = _normalize_command(line)
+            if cmd:
+                yield cmd
+
+        if len(pending) > MAX_COMMAND_LENGTH:
+            pending = ''
+            skipping = True
+
+        chunk = stream.read1(STREAM_CHUNK_SIZE)
+
+    pending += decoder.decode(b'', final=True)
+    cmd = None if skipping else _normalize_command(pending)
+    if cmd:
+        yield cmd
+
+def iter_commands(file_paths: Iterable[str]) -> Iterator[str]:
+    """
+    Потоково читаем команды из нескольких файлов подряд ("-" - stdin).
+    Ограничения на размер нет: команды отдаются по мере чтения.
+    """
+    for file_path in file_paths:
         try:
-            with open(safe_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    cmd = line.strip().lower()
-                    # Игнорируем пустые строки и комментарии
-                    if cmd and not cmd.startswith('#'):
-                        commands.append(cmd)
-        except UnicodeDecodeError:
-            # Если не UTF-8, пробуем другую кодировку
-            try:
-                with open(safe_path, 'r', encoding='cp1251') as f:
-                    for line in f:
-                        cmd = line.strip().lower()
-                        if cmd and not cmd.startswith('#'):
-                            commands.append(cmd)
-            except UnicodeDecodeError:
-                print(f"❌ Файл {file_path} не является текстовым!")
-                return commands
-                    
-    except PermissionError:
-        print(f"❌ Нет прав на чтение файла {file_path}")
-    except Exception as e:
-        print(f"❌ Ошибка при чтении файла: {e}")
+            if file_path == '-':
+                yield from iter_stream_commands(sys.stdin.buffer, 'stdin')
+                continue
+
+            # Защита от path traversal
+            safe_path = Path(file_path).resolve()
+
+            if not safe_path.is_file():
+                print(f"❌ Файл {safe_path} не найден!")
+                continue
+
+            with open(safe_path, 'rb') as f:
+                yield from iter_stream_commands(f, file_path)
+
+        except PermissionError:
+            print(f"❌ Нет прав на чтение файла {file_path}")
+        except ValueError as e:
+            print(f"❌ {e}")
+        except OSError as e:
+            print(f"❌ Ошибка при чтении файла: {e}")
+
+def cgroup_cpu_limit() -> Optional[float]:
+    """
+    Квота CPU из cgroup v2 (cpu.max: "<quota> <period>" или "max <period>").
+    None - квоты нет или cgroup v2 не смонтирована.
+    """
+    cgroup_path = ''
+    try:
+        with open('/proc/self/cgroup', encoding='utf-8') as f:
+            for line in f:
+                # В cgroup v2 одна строка вида "0::/путь"
+                if line.startswith('0::'):
+                    cgroup_path = line[3:].strip().lstrip('/')
+                    break
+    except OSError:
+        pass
+    
+    # Внутри контейнера своя cgroup обычно видна как корень - смотрим оба места
+    candidates = [CGROUP_ROOT / cgroup_path / 'cpu.max', CGROUP_ROOT / 'cpu.max']
+    for path in candidates:
+        try:
+            quota, period = path.read_text(encoding='utf-8').split()[:2]
+        except (OSError, ValueError):
+            continue
+        if quota == 'max':
+            return None
+        try:
+            return int(quota) / int(period)
+        except (ValueError, ZeroDivisionError):
+            return None
+    return None
+
+def available_cpus() -> int:
+    """Сколько CPU реально доступно процессу: affinity и квота cgroup v2"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        cpus = os.cpu_count() or 1
     
-    return commands
+    quota = cgroup_cpu_limit()
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
 
 def safe_write_file(file_path: Path, content: str) -> bool:
     """
@@ -209,8 +393,10 @@ def print_banner():
     print(f"🐍 Python: {sys.version.split()[0]}")
     print("=" * 60)
 
-def print_summary(inventory_count: int, errors: int = 0):
-    """Выводит краткий итог работы"""
+def print_summary(inventory_count: int, errors: int = 0,
+                  latencies: Optional[Dict[str, Dict[str, Dict[str, float]]]] = None,
+                  cache: Optional[Dict[str, int]] = None):
+    """Выводит краткий итог работы; latencies - перцентили из REGISTRY.summary(), cache - WarmCache.stats()"""
     print("\n" + "=" * 60)
     print("📊 ИТОГ РАБОТЫ:")
     print(f"   ✅ Выполнено инвентаризаций: {inventory_count}")
@@ -218,15 +404,24 @@ def print_summary(inventory_count: int, errors: int = 0):
         print(f"   ❌ Ошибок: {errors}")
     else:
         print(f"   ✅ Ошибок: 0")
+    if latencies:
+        print("   ⏱️  Задержки, мс (p50 / p95 / p99):")
+        for name, series in latencies.items():
+            for labels, stats in series.items():
+                print(f"      {name}[{labels}]: {stats['p50'] * 1000:.2f} / "
+                      f"{stats['p95'] * 1000:.2f} / {stats['p99'] * 1000:.2f} (n={stats['count']})")
+    if cache:
+        print(f"   💾 Тёплый кэш: попаданий {cache['hits']}, промахов {cache['misses']}"
+              + (f", битых записей {cache['corrupted']}" if cache['corrupted'] else ""))
     print("=" * 60)
 
 if __name__ == "__main__":
     # Если файл запущен напрямую - показываем справку
     print("📚 Это вспомогательный модуль с функциями:")
     print("   - parse_arguments() - разбор аргументов командной строки")
-    print("   - read_commands() - безопасное чтение команд из файла")
+    print("   - iter_commands() - потоковое чтение команд из файлов")
     print("   - safe_write_file() - безопасная запись файлов")
     print("   - validate_file_path() - проверка путей")
     print("   - и другие полезные функции")
     print("\n   Используйте этот модуль в своих скриптах:")
-    print("   from utils import read_commands, parse_arguments")
+    print("   from utils import iter_commands, parse_arguments")
@@ -0,0 +1,117 @@
+"""
+Тёплый кэш на диске: последний результат сбора плюс отпечатки его источников
+(файлы в Linux, ключ реестра в Windows). Следующий запуск CLI, пока отпечатки
+те же, отдаёт результат из кэша и ничего не разбирает заново.
+
+Файл маленький и версионированный; битый, чужой или старой версии файл
+считается промахом и перезаписывается при следующем сохранении.
+"""
+import contextlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from interfaces import BaseLogService
+
+# Меняем, когда меняется формат файла или состав результата
+CACHE_VERSION = 2
+
+
+class WarmCache:
+    """Одна запись на файл: ОС, отпечатки источников и результат в виде словаря"""
+
+    def __init__(self, path: str, logger: BaseLogService):
+        self.path = Path(path)
+        self.logger = logger
+        self._entry: Optional[Dict[str, Any]] = None
+        self._loaded = False
+        # Следующий lookup - промах; запись при этом помним, чтобы не переписывать файл тем же
+        self._bypass = False
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.corrupted = 0
+        self.writes = 0
+
+    def _load(self) -> Optional[Dict[str, Any]]:
+        """Читаем файл один раз за процесс; дальше запись живёт в памяти"""
+        if self._loaded:
+            return self._entry
+        self._loaded = True
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            self.corrupted += 1
+            self.logger.warning("Кэш %s не читается, соберём заново: %s", self.path, e)
+            return None
+
+        if (not isinstance(entry, dict) or entry.get('version') != CACHE_VERSION
+                or not isinstance(entry.get('result'), dict) or 'fingerprints' not in entry):
+            self.corrupted += 1
+            self.logger.warning("Кэш %s другой версии или битый, соберём заново", self.path)
+            return None
+        self._entry = entry
+        return entry
+
+    def lookup(self, os_name: str, fingerprints: Any, build: Callable[[Dict[str, Any]], Any]) -> Optional[Any]:
+        """Результат из кэша, если источники не менялись; build собирает его из словаря"""
+        with self._lock:
+            entry = self._load()
+            bypass, self._bypass = self._bypass, False
+            if not bypass and entry is not None and entry.get('os') == os_name and entry['fingerprints'] == fingerprints:
+                try:
+                    result = build(entry['result'])
+                except (TypeError, ValueError) as e:
+                    self.corrupted += 1
+                    self.logger.warning("Запись кэша не подходит к результату: %s", e)
+                    self._entry = None
+                else:
+                    self.hits += 1
+                    return result
+            self.misses += 1
+            return None
+
+    def store(self, os_name: str, fingerprints: Any, result: Dict[str, Any]):
+        """Сохраняем результат; если он и отпечатки не поменялись - на диск не ходим"""
+        entry = {'version': CACHE_VERSION, 'os': os_name, 'fingerprints': fingerprints, 'result': result}
+        with self._lock:
+            self._load()
+            if entry == self._entry:
+                return
+            try:
+                self._write(entry)
+            except (OSError, TypeError, ValueError) as e:
+                self.logger.warning("Не смогли сохранить кэш %s: %s", self.path, e)
+                return
+            self._entry = entry
+            self.writes += 1
+
+    def _write(self, entry: Dict[str, Any]):
+        """Атомарно: параллельный запуск не прочитает половину файла"""
+        import tempfile
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{self.path.name}.", suffix=".tmp", dir=self.path.parent)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+            raise
+
+    def forget(self):
+        """Следующий lookup - промах: источник мог поменяться, не поменяв отпечатка (тот же тик mtime)"""
+        with self._lock:
+            self._bypass = True
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'corrupted': self.corrupted, 'writes': self.writes}